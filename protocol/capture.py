@@ -0,0 +1,77 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# capture file format: the 8-byte magic below, followed by a record for each
+# datagram sent or received, consisting of a fixed-size record header (see
+# record_header below) followed by the datagram itself, all little-endian
+
+import socket
+import struct
+import time
+
+MAGIC = b'LIFXCAP\x01'
+
+DIRECTION_RX = 0
+DIRECTION_TX = 1
+
+# timestamp (seconds since epoch), direction, IPv4 address, port, length
+record_header = struct.Struct('<dB4sHH')
+
+class CaptureWriter:
+  # fout is a file opened in binary mode, the magic is written immediately
+  def __init__(self, fout):
+    self.fout = fout
+    self.fout.write(MAGIC)
+
+  def write(self, direction, addr, data, timestamp = None):
+    self.fout.write(
+      record_header.pack(
+        time.time() if timestamp is None else timestamp,
+        direction,
+        socket.inet_aton(addr[0]),
+        addr[1],
+        len(data)
+      )
+    )
+    self.fout.write(data)
+
+  def flush(self):
+    self.fout.flush()
+
+class CaptureReader:
+  # fin is a file opened in binary mode, the magic is checked immediately
+  def __init__(self, fin):
+    self.fin = fin
+    if self.fin.read(len(MAGIC)) != MAGIC:
+      raise ValueError('not a capture file')
+
+  # yields (timestamp, direction, addr, data) for each record
+  def __iter__(self):
+    while True:
+      header = self.fin.read(record_header.size)
+      if len(header) == 0:
+        break
+      if len(header) < record_header.size:
+        raise ValueError('truncated capture file')
+      timestamp, direction, ip, port, length = record_header.unpack(header)
+      data = self.fin.read(length)
+      if len(data) < length:
+        raise ValueError('truncated capture file')
+      yield timestamp, direction, (socket.inet_ntoa(ip), port), data
@@ -0,0 +1,190 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import numpy
+import protocol
+from udp import encode_set_color
+
+# per-device message rate ceiling, the LIFX documentation recommends sending
+# no more than 20 messages per second to a device, the burst allows a short
+# drag to be sent immediately before the rate limit applies
+SEND_RATE = 20.
+SEND_BURST = 4.
+
+# initial timeout before resending, later resends back off exponentially,
+# once the device's round trip time is known its estimated timeout is used
+SET_COLOR_TIMEOUT = .1
+
+# the backoff is capped by rtt.RTO_MAX well before this many tries
+MAX_BACKOFF_TRIES = 16
+
+class TokenBucket:
+  def __init__(self, rate, burst):
+    self.rate = rate
+    self.burst = burst
+    self.tokens = burst
+    self.time = None
+
+  # takes a token at time now and returns 0., or if there is none, returns
+  # the time to wait before trying again (without taking anything)
+  def take(self, now):
+    if self.time is not None:
+      self.tokens = min(
+        self.tokens + (now - self.time) * self.rate,
+        self.burst
+      )
+    self.time = now
+    if self.tokens >= 1.:
+      self.tokens -= 1.
+      return 0.
+    return (1. - self.tokens) / self.rate
+
+# sends colours to a device as fast as its rate limit allows, keeping only
+# the latest colour, so that a fast stream of updates (e.g. from dragging
+# or animation) never builds a backlog, each colour sent is resent until
+# acknowledged unless a newer one replaces it, must be used on the event
+# loop thread of udp (an AsyncUDP), from UDP use udp.call_soon(...), if
+# perceptual_filter (a perceptual.PerceptualFilter) is given then colours
+# that cannot be told apart from the last one accepted are dropped
+class CoalescingSender:
+  def __init__(
+    self,
+    udp,
+    mac,
+    addr,
+    rate = SEND_RATE,
+    burst = SEND_BURST,
+    perceptual_filter = None
+  ):
+    self.udp = udp
+    self.mac = mac
+    self.addr = addr
+    self.perceptual_filter = perceptual_filter
+    self.accepted = None # last colour accepted, if perceptual_filter given
+    self.target = (bytes.fromhex(mac) + bytes(8))[:8]
+    self.bucket = TokenBucket(rate, burst)
+
+    self.hsbk = None # if not None, latest colour which is not yet sent
+    self.duration = 0.
+    self.sequence = None
+    self.out_data = None # if not None, frame awaiting acknowledgement
+    self.tries = 0 # number of times out_data was resent
+    self.sent = None # time out_data was first sent
+    self.deadline = None # time to resend out_data
+    self.timer = None # scheduler.Timer to call service()
+    self.idle = asyncio.Event()
+    self.idle.set()
+
+  # hsbk is (N_HSBK,) in the same units as AsyncUDP.set_color(), it must
+  # not be changed by the caller afterwards (pass a copy if necessary)
+  def set_color(self, hsbk, duration = 0.):
+    if self.perceptual_filter is not None:
+      if (
+        self.accepted is not None and
+          not self.perceptual_filter.visible(self.accepted, hsbk)
+      ):
+        return
+      self.accepted = hsbk
+    self.hsbk = hsbk
+    self.duration = duration
+    self.idle.clear()
+    if self.timer is not None:
+      self.timer.cancel()
+    self.service()
+
+  # waits until the latest colour has been acknowledged
+  async def wait(self):
+    await self.idle.wait()
+
+  # abandons any colour that is not yet acknowledged
+  def close(self):
+    if self.timer is not None:
+      self.timer.cancel()
+      self.timer = None
+    if self.out_data is not None:
+      self.udp.remove_handler(self.target, self.sequence, self.rx_frame)
+      self.out_data = None
+    self.hsbk = None
+    self.idle.set()
+
+  def service(self):
+    self.timer = None
+    scheduler = self.udp.scheduler
+    now = scheduler.time()
+    if self.hsbk is None:
+      if self.out_data is None:
+        return
+      if now < self.deadline:
+        self.timer = scheduler.call_at(self.deadline, self.service)
+        return
+
+    delay = self.bucket.take(now)
+    if delay > 0.:
+      self.timer = scheduler.call_later(delay, self.service)
+      return
+
+    if self.hsbk is not None:
+      # the newer colour supersedes any frame awaiting acknowledgement
+      if self.out_data is not None:
+        self.udp.remove_handler(self.target, self.sequence, self.rx_frame)
+      self.sequence = self.udp.next_sequence(self.target)
+      self.out_data = encode_set_color(
+        self.udp.source,
+        [self.target],
+        [self.sequence],
+        self.hsbk[numpy.newaxis, :],
+        self.duration,
+        ack_required = True
+      )[0]
+      self.udp.add_handler(self.target, self.sequence, self.rx_frame)
+      self.hsbk = None
+      self.tries = 0
+    else:
+      self.tries = min(self.tries + 1, MAX_BACKOFF_TRIES)
+    if self.tries == 0:
+      self.sent = now
+    self.udp.sendto(self.out_data, self.addr)
+    self.deadline = now + self.udp.rtt(self.target).timeout(
+      self.tries,
+      SET_COLOR_TIMEOUT
+    )
+    self.timer = scheduler.call_at(self.deadline, self.service)
+
+  def rx_frame(self, frame, addr):
+    if (
+      self.out_data is not None and
+        addr == self.addr and
+        frame.frame_address.sequence == self.sequence and
+        frame.protocol_header.type ==
+          protocol.PacketType.DEVICE_ACKNOWLEDGEMENT
+    ):
+      self.udp.remove_handler(self.target, self.sequence, self.rx_frame)
+      if self.tries == 0:
+        self.udp.rtt(self.target).sample(
+          self.udp.scheduler.time() - self.sent
+        )
+      self.out_data = None
+      if self.hsbk is None:
+        # otherwise the timer is waiting for the rate limit
+        if self.timer is not None:
+          self.timer.cancel()
+          self.timer = None
+        self.idle.set()
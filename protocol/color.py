@@ -30,9 +30,10 @@ sys.path.append(os.path.join(dirname, '../python'))
 import numpy
 import ctypes
 import protocol
-import random
 import sdl2
 import time
+from coalesce import CoalescingSender
+from discovery import DiscoveryCache
 from gamma_decode_rec2020 import gamma_decode_rec2020
 from gamma_decode_srgb import gamma_decode_srgb
 from gamma_encode_rec2020 import gamma_encode_rec2020
@@ -41,6 +42,10 @@ from hsbk_to_rgb_display_p3 import hsbk_to_rgb_display_p3
 from hsbk_to_rgb_rec2020 import hsbk_to_rgb_rec2020
 from hsbk_to_rgb_srgb import hsbk_to_rgb_srgb
 from hue_wheel import HueWheel
+from perceptual import BR_JND, UV_JND, PerceptualFilter
+from rgb_to_uv_display_p3 import rgb_to_uv_display_p3
+from rgb_to_uv_rec2020 import rgb_to_uv_rec2020
+from rgb_to_uv_srgb import rgb_to_uv_srgb
 from udp import UDP
 
 EXIT_SUCCESS = 0
@@ -62,37 +67,48 @@ XY_x = 0
 XY_y = 1
 N_XY = 2
 
-SET_COLOR_TIMEOUT = .1
-
 ZOOM = 1 # reduce this for draft rendering
 
 device = 'srgb'
+jnd = 1.
+cache = None
 mac = None
 hsbk = None
 if len(sys.argv) >= 3 and sys.argv[1] == '--device':
   device = sys.argv[2]
   del sys.argv[1:3]
+# scales the thresholds of colour changes that are not sent since they
+# could not be seen, 0 sends every change
+if len(sys.argv) >= 3 and sys.argv[1] == '--jnd':
+  jnd = float(sys.argv[2])
+  del sys.argv[1:3]
+if len(sys.argv) >= 3 and sys.argv[1] == '--cache':
+  cache = DiscoveryCache(sys.argv[2])
+  del sys.argv[1:3]
 if len(sys.argv) >= 3 and sys.argv[1] == '--mac':
   mac = sys.argv[2]
   del sys.argv[1:3]
 if len(sys.argv) >= 5:
   hsbk = numpy.array([float(i) for i in sys.argv[1:5]], numpy.double)
 
-gamma_decode, gamma_encode, hsbk_to_rgb = {
+gamma_decode, gamma_encode, hsbk_to_rgb, rgb_to_uv = {
   'display_p3': (
     gamma_decode_srgb,
     gamma_encode_srgb,
-    hsbk_to_rgb_display_p3
+    hsbk_to_rgb_display_p3,
+    rgb_to_uv_display_p3
   ),
   'rec2020': (
     gamma_decode_rec2020,
     gamma_encode_rec2020,
-    hsbk_to_rgb_rec2020
+    hsbk_to_rgb_rec2020,
+    rgb_to_uv_rec2020
   ),
   'srgb': (
     gamma_decode_srgb,
     gamma_encode_srgb,
-    hsbk_to_rgb_srgb
+    hsbk_to_rgb_srgb,
+    rgb_to_uv_srgb
   )
 }[device]
 
@@ -104,66 +120,26 @@ hue_wheel = HueWheel(
   15
 )
 
-class Light:
-  def __init__(self, mac, addr):
-    self.mac = mac
-    self.addr = addr
-    self.sequence = random.randint(0, 0xff)
-    self.timeout = None # if not None, send out_data when time reaches this
-    self.out_data = None # if not None, indicates light is dirty and how to set
-
-  def rx_frame(self, data):
-    frame = protocol.Frame()
-    frame.deserialize(data)
-    if (
-      frame.frame_header.protocol == 1024 and
-        frame.frame_header.addressable and
-        frame.frame_header.source == udp.source and
-        frame.frame_address.target ==
-          (bytes.fromhex(self.mac) + bytes(8))[:8] and
-        frame.frame_address.sequence == self.sequence and
-        frame.protocol_header.type ==
-          protocol.PacketType.DEVICE_ACKNOWLEDGEMENT
-    ):
-      self.timeout = None
-      self.out_data = None
-
-  def timer_service(self, now):
-    if self.timeout is not None and now >= self.timeout:
-      self.timeout += SET_COLOR_TIMEOUT
-      udp.socket.sendto(self.out_data, self.addr)
-
-  def set_color(self, hsbk, now):
-    target = (bytes.fromhex(self.mac) + bytes(8))[:8]
-    self.sequence = (self.sequence + 1) & 0xff
-    self.out_data = protocol.Frame(
-      frame_header = protocol.FrameHeader(
-        source = udp.source
-      ),
-      frame_address = protocol.FrameAddress(
-        target = target,
-        ack_required = True,
-        sequence = self.sequence
-      ),
-      protocol_header = protocol.ProtocolHeader(
-        _type = protocol.PacketType.LIGHT_SET_COLOR
-      ),
-      payload = protocol.LightSetColor(
-        color = protocol.LightHsbk(
-          hue = int(round((hsbk[HSBK_HUE] % 360.) * (0xffff / 360.))),
-          saturation = int(round(hsbk[HSBK_SAT] * 0xffff)),
-          brightness = int(round(hsbk[HSBK_BR] * 0xffff)),
-          kelvin = int(round(hsbk[HSBK_KELV]))
-        )
-      )
-    ).serialize()
-    if self.timeout is None:
-      self.timeout = now
+perceptual_filter = (
+  PerceptualFilter(hsbk_to_rgb, rgb_to_uv, UV_JND * jnd, BR_JND * jnd)
+if jnd > 0. else
+  None
+)
 
 udp = UDP()
+# the senders run on the UDP event loop thread, see udp.call_soon() below
 lights = {
-  addr: Light(mac, addr)
-  for mac, (addr, services) in udp.get_service(mac).items() # mac may be None
+  addr: CoalescingSender(
+    udp.async_udp,
+    mac,
+    addr,
+    perceptual_filter = perceptual_filter
+  )
+  for mac, (addr, services) in (
+    udp.get_service(mac) # mac may be None
+  if cache is None else
+    udp.run(cache.discover(udp.async_udp, None if mac is None else [mac]))
+  ).items()
   if protocol.DeviceService.UDP in services
 }
 
@@ -229,7 +205,7 @@ def process_click_or_drag(x, y, now):
   if dist < 60. * ZOOM: # arbitrary extra space around wheel
     hsbk[:HSBK_BR] = hs
     for light in lights.values():
-      light.set_color(hsbk, now)
+      udp.call_soon(light.set_color, hsbk.copy())
     return True # redraw
   return False
 
@@ -303,14 +279,3 @@ while True:
           redraw_timeout is None
       ):
         redraw_timeout = now + .001
-
-  try:
-    in_data, in_addr = udp.socket.recvfrom(0x1000)
-    light = lights.get(in_addr)
-    if light is not None:
-      light.rx_frame(in_data)
-  except BlockingIOError:
-    pass
-
-  for light in lights.values():
-    light.timer_service(now)
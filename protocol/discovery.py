@@ -0,0 +1,223 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import os
+import protocol
+import time
+import yaml
+from metadata import MetadataIndex
+from udp import UDPException
+
+# entries not seen for this many seconds are dropped from the cache
+DISCOVERY_TTL = 7. * 86400.
+
+# labels, groups and locations older than this many seconds are queried
+# again at the next discovery, renames of groups and locations reach the
+# index sooner, since any member reporting a newer updated_at relabels all
+METADATA_TTL = 86400.
+
+# persistent cache of discovered devices, so that a controller can start by
+# verifying the known devices by unicast (in parallel) rather than running
+# a broadcast sweep, the file is YAML as follows:
+#   d073d5010203:
+#     addr: [192.168.1.10, 56700]
+#     services: {1: 56700}
+#     vendor: 1
+#     product: 27
+#     seen: 1634567890.0
+#     label: Kitchen bench
+#     group: {id: 8c1f..., label: Kitchen, updated_at: 1634567800000000000}
+#     location: {id: 0f2a..., label: Home, updated_at: 1634567000000000000}
+#     metadata_seen: 1634567890.0
+# the group and location ids are hex, and the updated_at fields are in
+# nanoseconds since the epoch as reported by the devices, the metadata is
+# also kept in index (a MetadataIndex) for selecting devices by it
+class DiscoveryCache:
+  def __init__(self, path, ttl = DISCOVERY_TTL, metadata_ttl = METADATA_TTL):
+    self.path = path
+    self.ttl = ttl
+    self.metadata_ttl = metadata_ttl
+    self.devices = {}
+    self.index = MetadataIndex()
+    self.load()
+
+  def load(self):
+    self.devices = {}
+    self.index = MetadataIndex()
+    if os.path.exists(self.path):
+      with open(self.path) as fin:
+        devices = yaml.safe_load(fin)
+      now = time.time()
+      if devices is not None:
+        for mac, device in devices.items():
+          if now - device['seen'] < self.ttl:
+            device['addr'] = tuple(device['addr'])
+            self.devices[mac] = device
+            self.index.update(mac, device)
+
+  def save(self):
+    devices = {
+      mac: dict(device, addr = list(device['addr']))
+      for mac, device in self.devices.items()
+    }
+    # write and rename so that the cache is never seen half-written
+    with open(self.path + '.tmp', 'w') as fout:
+      yaml.safe_dump(devices, fout)
+    os.replace(self.path + '.tmp', self.path)
+
+  def update(self, mac, addr, services):
+    device = self.devices.get(mac)
+    if device is None:
+      device = {}
+      self.devices[mac] = device
+    elif device['addr'] != addr:
+      device.pop('vendor', None) # may be a different device at the address
+      device.pop('product', None)
+      device.pop('metadata_seen', None) # so that it is checked again
+    device['addr'] = addr
+    device['services'] = services
+    device['seen'] = time.time()
+
+  # queries the label, group and location of a cached device concurrently
+  # and updates the index, leaves the device as it was if any query fails
+  async def get_metadata(self, udp, mac):
+    device = self.devices[mac]
+    results = await asyncio.gather(
+      udp.get_label(mac, device['addr']),
+      udp.get_group(mac, device['addr']),
+      udp.get_location(mac, device['addr']),
+      return_exceptions = True
+    )
+    for result in results:
+      if isinstance(result, UDPException):
+        return
+      if isinstance(result, BaseException):
+        raise result
+    label, group, location = results
+    device['label'] = label
+    device['group'] = {
+      'id': group.group.hex(),
+      'label': group.label.rstrip(b'\0').decode('utf-8', 'replace'),
+      'updated_at': group.updated_at
+    }
+    device['location'] = {
+      'id': location.location.hex(),
+      'label': location.label.rstrip(b'\0').decode('utf-8', 'replace'),
+      'updated_at': location.updated_at
+    }
+    device['metadata_seen'] = time.time()
+    self.index.update(mac, device)
+
+  # returns a list of (mac, addr) for the cached devices with the given
+  # label, group label and location label, any that are None match all
+  def select(self, label = None, group = None, location = None):
+    macs = None
+    for find, value in [
+      (self.index.find_label, label),
+      (self.index.find_group, group),
+      (self.index.find_location, location)
+    ]:
+      if value is not None:
+        found = set(find(value))
+        macs = found if macs is None else macs & found
+    return [
+      (mac, self.devices[mac]['addr'])
+      for mac in (self.devices if macs is None else macs)
+    ]
+
+  # udp is an AsyncUDP, macs is None for all devices or a list of MACs that
+  # are expected to be found, broadcast is True to force a broadcast sweep,
+  # otherwise there is only a broadcast if the cache is empty or a cached
+  # or expected device did not respond, returns the same format as
+  # AsyncUDP.get_service(), with the version also filled in for each device
+  async def discover(self, udp, macs = None, broadcast = False):
+    cached = [
+      (mac, device['addr'])
+      for mac, device in self.devices.items()
+      if macs is None or mac in macs
+    ]
+    found = {}
+    for result in await asyncio.gather(
+      *[udp.get_service(mac, addr) for mac, addr in cached]
+    ):
+      found.update(result)
+
+    if (
+      broadcast or
+        len(cached) == 0 or
+        any([mac not in found for mac, _ in cached]) or
+        (macs is not None and any([mac not in found for mac in macs]))
+    ):
+      found.update(
+        await udp.get_service(
+          macs[0] if macs is not None and len(macs) == 1 else None
+        )
+      )
+
+    # devices that were cached but did not respond are kept (they may just
+    # have missed this sweep) until they have not been seen for ttl
+    now = time.time()
+    for mac, _ in cached:
+      if mac not in found and now - self.devices[mac]['seen'] >= self.ttl:
+        del self.devices[mac]
+        self.index.remove(mac)
+
+    for mac, (addr, services) in found.items():
+      self.update(mac, addr, services)
+
+    async def get_version(mac):
+      device = self.devices[mac]
+      try:
+        version = await udp.get_version(mac, device['addr'])
+      except UDPException:
+        return
+      device['vendor'] = version.vendor
+      device['product'] = version.product
+    await asyncio.gather(
+      *[
+        get_version(mac)
+        for mac, (_, services) in found.items()
+        if (
+          'product' not in self.devices[mac] and
+            protocol.DeviceService.UDP in services
+        )
+      ]
+    )
+
+    now = time.time()
+    await asyncio.gather(
+      *[
+        self.get_metadata(udp, mac)
+        for mac, (_, services) in found.items()
+        if (
+          now - self.devices[mac].get('metadata_seen', 0.) >=
+            self.metadata_ttl and
+            protocol.DeviceService.UDP in services
+        )
+      ]
+    )
+
+    self.save()
+    return {
+      mac: (addr, services)
+      for mac, (addr, services) in found.items()
+      if macs is None or mac in macs
+    }
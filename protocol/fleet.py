@@ -0,0 +1,180 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy
+import protocol
+import time
+from light_hsbk import hsbk_to_light_hsbk, light_hsbk_from_struct
+from light_hsbk import light_hsbk_to_hsbk
+from udp import GET_COLOR_TIMEOUT, GET_COLOR_TRIES, UDPException
+
+# seconds between polls of each device, the polls of different devices are
+# spread evenly over the interval so that the traffic is smooth
+POLL_INTERVAL = 30.
+
+# mirror of the last known LightState of every device in a fleet, kept in
+# numpy arrays indexed by device (see index), refreshed by LightGet polls
+# on a schedule and by our own acknowledged sets through set_colors(), so
+# that reads are O(1) with no round trip and writes can skip devices that
+# are already in the requested state, must be used on the event loop thread
+# of udp (an AsyncUDP), devices is a list of (mac, addr), if
+# perceptual_filter (a perceptual.PerceptualFilter) is given then writes
+# also skip devices whose state cannot be told apart from the requested one
+class FleetState:
+  def __init__(
+    self,
+    udp,
+    devices,
+    interval = POLL_INTERVAL,
+    perceptual_filter = None
+  ):
+    self.udp = udp
+    self.interval = interval
+    self.perceptual_filter = perceptual_filter
+    self.macs = [mac for mac, _ in devices]
+    self.addrs = [addr for _, addr in devices]
+    self.index = {self.macs[i]: i for i in range(len(devices))}
+
+    n_devices = len(devices)
+    self.light_hsbk = numpy.zeros((n_devices,), protocol.LightHsbk.dtype)
+    self.power = numpy.zeros((n_devices,), numpy.uint16)
+    self.label = numpy.zeros((n_devices,), 'S32')
+    # time.time() of the last update, nan if state not known yet
+    self.updated = numpy.full((n_devices,), numpy.nan, numpy.double)
+    # count of sets, so that a poll overtaken by a set can be discarded
+    self.versions = numpy.zeros((n_devices,), numpy.int64)
+
+    self.timers = [None] * n_devices # scheduler.Timer for each next poll
+    self.tasks = set()
+    self.n_polls = 0
+    self.n_poll_failures = 0
+
+  # starts polling, the first poll of each device is within one interval
+  def start(self):
+    scheduler = self.udp.scheduler
+    now = scheduler.time()
+    n_devices = len(self.macs)
+    for i in range(n_devices):
+      when = now + self.interval * i / n_devices
+      self.timers[i] = scheduler.call_at(when, self.poll_due, i, when)
+
+  def close(self):
+    for timer in self.timers:
+      if timer is not None:
+        timer.cancel()
+    self.timers = [None] * len(self.macs)
+    for task in list(self.tasks):
+      task.cancel()
+
+  # when is the time the poll was due, to keep polls evenly spaced
+  def poll_due(self, i, when):
+    task = self.udp.loop.create_task(self.poll(i))
+    self.tasks.add(task)
+    task.add_done_callback(self.tasks.discard)
+
+    # if the loop fell behind, skip missed polls rather than bunching up
+    scheduler = self.udp.scheduler
+    when += self.interval
+    now = scheduler.time()
+    if when < now:
+      when += (now - when) // self.interval * self.interval + self.interval
+    self.timers[i] = scheduler.call_at(when, self.poll_due, i, when)
+
+  async def poll(self, i):
+    version = self.versions[i]
+    self.n_polls += 1
+    try:
+      payload = await self.udp.get(
+        self.macs[i],
+        self.addrs[i],
+        protocol.PacketType.LIGHT_GET,
+        protocol.PacketType.LIGHT_STATE,
+        GET_COLOR_TRIES,
+        GET_COLOR_TIMEOUT
+      )
+    except UDPException:
+      self.n_poll_failures += 1
+      return
+    if self.versions[i] == version:
+      self.update(i, payload)
+
+  # payload is a protocol.LightState, e.g. from a poll
+  def update(self, i, payload):
+    self.light_hsbk[i] = light_hsbk_from_struct(payload.color)
+    self.power[i] = payload.power
+    self.label[i] = payload.label
+    self.updated[i] = time.time()
+
+  def known(self, mac):
+    return not numpy.isnan(self.updated[self.index[mac]])
+
+  # returns (N_HSBK,) in the same units as AsyncUDP.get_color()
+  def get_color(self, mac):
+    return light_hsbk_to_hsbk(self.light_hsbk[self.index[mac]])
+
+  def get_power(self, mac):
+    return int(self.power[self.index[mac]])
+
+  def get_label(self, mac):
+    return self.label[self.index[mac]].decode()
+
+  # hsbk is (n_devices, N_HSBK) for all devices, or (len(macs), N_HSBK) if
+  # macs is given to select devices, devices whose known state is already
+  # hsbk (or looks the same, see perceptual_filter) are skipped, the rest
+  # are set by AsyncUDP.set_colors() and the mirror is updated for those
+  # that acknowledge, returns an array of bool aligned with hsbk which is
+  # True for devices now known to be in hsbk
+  async def set_colors(self, hsbk, duration = 0., macs = None):
+    indices = (
+      numpy.arange(len(self.macs))
+    if macs is None else
+      numpy.array([self.index[mac] for mac in macs], numpy.int64)
+    )
+    light_hsbk = hsbk_to_light_hsbk(hsbk)
+    changed = numpy.logical_or(
+      (
+        self.light_hsbk[indices] != light_hsbk
+      if self.perceptual_filter is None else
+        self.perceptual_filter.visible(
+          light_hsbk_to_hsbk(self.light_hsbk[indices]),
+          hsbk
+        )
+      ),
+      numpy.isnan(self.updated[indices])
+    )
+    results = numpy.logical_not(changed)
+    if not numpy.any(changed):
+      return results
+
+    changed_indices = indices[changed]
+    self.versions[changed_indices] += 1
+    acked = numpy.array(
+      await self.udp.set_colors(
+        [(self.macs[i], self.addrs[i]) for i in changed_indices],
+        hsbk[changed],
+        duration
+      ),
+      bool
+    )
+    acked_indices = changed_indices[acked]
+    self.light_hsbk[acked_indices] = light_hsbk[changed][acked]
+    self.updated[acked_indices] = time.time()
+    results[changed] = acked
+    return results
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import json
+import numpy
+import os.path
+import subprocess
+import sys
+import time
+from capture import DIRECTION_RX, DIRECTION_TX
+from simulator import MAX_DEFAULT_SOCKETS
+from udp import AsyncUDP, UDPException
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+PERCENTILES = [50, 90, 99]
+
+if len(sys.argv) < 2:
+  print(f'usage: {sys.argv[0]:s} json_out [device_counts] [loss_rates] [rounds]')
+  print('json_out = name of JSON file to write the results to (- for stdout)')
+  print('device_counts = comma separated numbers of devices (default 10,100,1000)')
+  print('loss_rates = comma separated simulated loss rates (default 0,.01,.1)')
+  print('rounds = number of get_color and set_color calls per device (default 5)')
+  print('runs simulator.py in a subprocess for each combination, and measures')
+  print('discovery time, request latency percentiles, messages per second')
+  print('of client CPU time and the fraction of frames that were resent')
+  sys.exit(EXIT_FAILURE)
+json_out = sys.argv[1]
+device_counts = [
+  int(i)
+  for i in (sys.argv[2] if len(sys.argv) >= 3 else '10,100,1000').split(',')
+]
+loss_rates = [
+  float(i)
+  for i in (sys.argv[3] if len(sys.argv) >= 4 else '0,.01,.1').split(',')
+]
+rounds = int(sys.argv[4]) if len(sys.argv) >= 5 else 5
+
+# passed to AsyncUDP in place of a capture.CaptureWriter, to count frames
+# and find resends (identical frames sent again to the same address), and
+# to timestamp the first response from each address for discovery time
+class Recorder:
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    self.n_tx = 0
+    self.n_rx = 0
+    self.n_resent = 0
+    self.sent = set()
+    self.first_rx = {} # addr -> time of first frame received
+
+  def write(self, direction, addr, data, timestamp = None):
+    if direction == DIRECTION_TX:
+      self.n_tx += 1
+      if (addr, data) in self.sent:
+        self.n_resent += 1
+      else:
+        self.sent.add((addr, data))
+    elif direction == DIRECTION_RX:
+      self.n_rx += 1
+      if addr not in self.first_rx:
+        self.first_rx[addr] = time.monotonic()
+
+  def flush(self):
+    pass
+
+def percentiles(latencies):
+  if len(latencies) == 0:
+    return None
+  latencies = numpy.array(latencies, numpy.double)
+  result = {
+    f'p{i:d}': float(numpy.percentile(latencies, i))
+    for i in PERCENTILES
+  }
+  result['max'] = float(numpy.max(latencies))
+  return result
+
+# formats the median of a result from percentiles() in milliseconds, which
+# is n/a if nothing succeeded (e.g. no devices found, or very high loss)
+def format_p50(latency):
+  return 'n/a' if latency is None else f'{latency["p50"] * 1000.:.2f} ms'
+
+# runs each call() concurrently, rounds times, returns a dict of results
+async def phase(recorder, calls):
+  latencies = []
+  failures = [0]
+  async def timed(call):
+    t0 = time.monotonic()
+    try:
+      await call()
+    except UDPException:
+      failures[0] += 1
+      return
+    latencies.append(time.monotonic() - t0)
+
+  recorder.reset()
+  wall0 = time.monotonic()
+  cpu0 = time.process_time()
+  for i in range(rounds):
+    await asyncio.gather(*[timed(call) for call in calls])
+  wall = time.monotonic() - wall0
+  cpu = time.process_time() - cpu0
+  n_messages = recorder.n_tx + recorder.n_rx
+  return {
+    'requests': len(calls) * rounds,
+    'failures': failures[0],
+    'latency': percentiles(latencies),
+    'messages': n_messages,
+    'messages_per_second': n_messages / wall,
+    'messages_per_cpu_second': n_messages / cpu if cpu > 0. else None,
+    'resent_fraction': recorder.n_resent / max(recorder.n_tx, 1)
+  }
+
+async def bench(n_devices, loss):
+  simulator = subprocess.Popen(
+    [
+      sys.executable,
+      os.path.join(os.path.dirname(__file__), 'simulator.py'),
+      '--loss',
+      str(loss),
+      '--port',
+      '0',
+      '--sockets',
+      str(min(max(n_devices, 1), MAX_DEFAULT_SOCKETS)),
+      str(n_devices)
+    ],
+    stdout = subprocess.PIPE,
+    text = True
+  )
+  try:
+    # e.g. '10 devices on 10 sockets, discovery address 127.0.0.1:56700',
+    # or an error message (or nothing) if the simulator could not start
+    line = simulator.stdout.readline()
+    if 'discovery address' not in line:
+      return {
+        'devices': n_devices,
+        'loss': loss,
+        'error': line.strip() or 'simulator exited'
+      }
+    host, port = line.split()[-1].split(':')
+    recorder = Recorder()
+    udp = AsyncUDP(recorder, broadcast = (host, int(port)))
+    await udp.open()
+
+    t0 = time.monotonic()
+    devices = await udp.get_service()
+    elapsed = time.monotonic() - t0
+    discovery = {
+      'devices_found': len(devices),
+      'time_to_last_device': (
+        max(recorder.first_rx.values()) - t0
+      if len(recorder.first_rx) else
+        None
+      ),
+      'elapsed': elapsed,
+      'resent_fraction': recorder.n_resent / max(recorder.n_tx, 1)
+    }
+
+    hsbk = numpy.array([120., 1., 1., 3500.], numpy.double)
+    get_color = await phase(
+      recorder,
+      [
+        lambda mac = mac, addr = addr: udp.get_color(mac, addr)
+        for mac, (addr, _) in devices.items()
+      ]
+    )
+    set_color = await phase(
+      recorder,
+      [
+        lambda mac = mac, addr = addr: udp.set_color(mac, addr, hsbk)
+        for mac, (addr, _) in devices.items()
+      ]
+    )
+    udp.close()
+  finally:
+    simulator.terminate()
+    simulator.wait()
+
+  return {
+    'devices': n_devices,
+    'loss': loss,
+    'discovery': discovery,
+    'get_color': get_color,
+    'set_color': set_color
+  }
+
+results = []
+for n_devices in device_counts:
+  for loss in loss_rates:
+    result = asyncio.run(bench(n_devices, loss))
+    if 'error' in result:
+      print(
+        f'devices {n_devices:d} loss {loss:.3f} error {result["error"]:s}',
+        file = sys.stderr
+      )
+      results.append(result)
+      continue
+    print(
+      f'devices {n_devices:d} loss {loss:.3f} found {result["discovery"]["devices_found"]:d} get_color p50 {format_p50(result["get_color"]["latency"]):s} set_color p50 {format_p50(result["set_color"]["latency"]):s}',
+      file = sys.stderr
+    )
+    results.append(result)
+
+results = {
+  'time': time.time(),
+  'rounds': rounds,
+  'results': results
+}
+if json_out == '-':
+  json.dump(results, sys.stdout, indent = 2)
+  print()
+else:
+  with open(json_out, 'w') as fout:
+    json.dump(results, fout, indent = 2)
@@ -0,0 +1,98 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy
+import protocol
+
+HSBK_HUE = 0
+HSBK_SAT = 1
+HSBK_BR = 2
+HSBK_KELV = 3
+N_HSBK = 4
+
+# largest difference in protocol units for colours to count as the same,
+# since devices may round the colour they are sent (or clip the Kelvin)
+HSBK_TOLERANCE = 0x100
+KELV_TOLERANCE = 50
+
+# converts a (..., N_HSBK) array of hue in degrees, saturation and brightness
+# as fractions and Kelvin, to a (...) array of protocol.LightHsbk.dtype, in a
+# single vectorised step, if out is given then it is filled in and returned
+def hsbk_to_light_hsbk(hsbk, out = None):
+  assert hsbk.shape[-1] == N_HSBK
+  if out is None:
+    out = numpy.zeros(hsbk.shape[:-1], protocol.LightHsbk.dtype)
+  out['hue'] = numpy.round((hsbk[..., HSBK_HUE] % 360.) * (0xffff / 360.))
+  out['saturation'] = numpy.round(
+    numpy.clip(hsbk[..., HSBK_SAT], 0., 1.) * 0xffff
+  )
+  out['brightness'] = numpy.round(
+    numpy.clip(hsbk[..., HSBK_BR], 0., 1.) * 0xffff
+  )
+  out['kelvin'] = numpy.round(numpy.clip(hsbk[..., HSBK_KELV], 0., 0xffff))
+  return out
+
+# opposite of hsbk_to_light_hsbk(), returns (..., N_HSBK) array of double
+def light_hsbk_to_hsbk(light_hsbk):
+  hsbk = numpy.zeros(light_hsbk.shape + (N_HSBK,), numpy.double)
+  hsbk[..., HSBK_HUE] = light_hsbk['hue'] * (360. / 0xffff)
+  hsbk[..., HSBK_SAT] = light_hsbk['saturation'] * (1. / 0xffff)
+  hsbk[..., HSBK_BR] = light_hsbk['brightness'] * (1. / 0xffff)
+  hsbk[..., HSBK_KELV] = light_hsbk['kelvin']
+  return hsbk
+
+# converts a protocol.LightHsbk object (e.g. from a decoded LightState) to
+# a () array of protocol.LightHsbk.dtype
+def light_hsbk_from_struct(color):
+  return numpy.array(
+    (color.hue, color.saturation, color.brightness, color.kelvin),
+    protocol.LightHsbk.dtype
+  )
+
+# converts an (N_HSBK,) array in the same units as hsbk_to_light_hsbk() to
+# a protocol.LightHsbk object, the opposite of light_hsbk_from_struct()
+def light_hsbk_to_struct(hsbk):
+  light_hsbk = hsbk_to_light_hsbk(numpy.asarray(hsbk, numpy.double))
+  return protocol.LightHsbk(
+    hue = int(light_hsbk['hue']),
+    saturation = int(light_hsbk['saturation']),
+    brightness = int(light_hsbk['brightness']),
+    kelvin = int(light_hsbk['kelvin'])
+  )
+
+# compares (...) arrays of protocol.LightHsbk.dtype, returns a (...) array
+# of bool which is True where they are the same colour within tolerance
+def light_hsbk_close(a, b):
+  hue_diff = numpy.abs(a['hue'].astype(numpy.int32) - b['hue'])
+  return (
+    (numpy.minimum(hue_diff, 0x10000 - hue_diff) <= HSBK_TOLERANCE) &
+      (
+        numpy.abs(a['saturation'].astype(numpy.int32) - b['saturation']) <=
+          HSBK_TOLERANCE
+      ) &
+      (
+        numpy.abs(a['brightness'].astype(numpy.int32) - b['brightness']) <=
+          HSBK_TOLERANCE
+      ) &
+      (
+        numpy.abs(a['kelvin'].astype(numpy.int32) - b['kelvin']) <=
+          KELV_TOLERANCE
+      )
+  )
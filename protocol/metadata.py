@@ -0,0 +1,111 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# devices grouped by an id that has a label, for the groups and locations
+# of devices the id is a UUID and devices report the label along with the
+# time it was last changed (updated_at), so a device that was offline may
+# report an old label for the same id, and the newest label wins, for the
+# labels of devices the id is just the label, each lookup is a dict access
+class LabelledSets:
+  def __init__(self):
+    self.ids = {} # mac -> id
+    self.members = {} # id -> set of mac
+    self.labels = {} # id -> (label, updated_at)
+    self.by_label = {} # label -> set of id
+
+  def add(self, mac, _id, label, updated_at = 0):
+    self.remove(mac)
+    self.ids[mac] = _id
+    self.members.setdefault(_id, set()).add(mac)
+    old = self.labels.get(_id)
+    if old is None or updated_at > old[1]:
+      if old is not None:
+        self.discard_label(_id, old[0])
+      self.labels[_id] = (label, updated_at)
+      self.by_label.setdefault(label, set()).add(_id)
+
+  def remove(self, mac):
+    _id = self.ids.pop(mac, None)
+    if _id is None:
+      return
+    members = self.members[_id]
+    members.discard(mac)
+    if len(members) == 0:
+      del self.members[_id]
+      label, _ = self.labels.pop(_id)
+      self.discard_label(_id, label)
+
+  def discard_label(self, _id, label):
+    ids = self.by_label[label]
+    ids.discard(_id)
+    if len(ids) == 0:
+      del self.by_label[label]
+
+  # returns the label of the set containing mac, or None
+  def label(self, mac):
+    _id = self.ids.get(mac)
+    return None if _id is None else self.labels[_id][0]
+
+  # returns a list of the macs in the sets with the given label
+  def find(self, label):
+    return [
+      mac
+      for _id in self.by_label.get(label, ())
+      for mac in self.members[_id]
+    ]
+
+# index of device labels, groups and locations, so that e.g. all devices in
+# group "Kitchen" are found without querying any devices, it is filled in
+# from the entries of a discovery.DiscoveryCache, see there for the format
+class MetadataIndex:
+  def __init__(self):
+    self.labels = LabelledSets()
+    self.groups = LabelledSets()
+    self.locations = LabelledSets()
+
+  def update(self, mac, device):
+    if 'label' in device:
+      self.labels.add(mac, device['label'], device['label'])
+    if 'group' in device:
+      group = device['group']
+      self.groups.add(mac, group['id'], group['label'], group['updated_at'])
+    if 'location' in device:
+      location = device['location']
+      self.locations.add(
+        mac,
+        location['id'],
+        location['label'],
+        location['updated_at']
+      )
+
+  def remove(self, mac):
+    self.labels.remove(mac)
+    self.groups.remove(mac)
+    self.locations.remove(mac)
+
+  # each returns a list of macs
+  def find_label(self, label):
+    return self.labels.find(label)
+
+  def find_group(self, label):
+    return self.groups.find(label)
+
+  def find_location(self, label):
+    return self.locations.find(label)
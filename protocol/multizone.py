@@ -0,0 +1,234 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy
+import protocol
+from light_hsbk import hsbk_to_light_hsbk
+
+# maximum zones carried by one MultiZoneExtendedSetColorZones message
+EXTENDED_ZONES = protocol.MultiZoneExtendedSetColorZones.dtype['colors'].shape[0]
+
+class ExtendedSetColorZonesEncoder:
+  # n_zones is the number of zones to set, starting at zone index, and the
+  # frames are preallocated so that each encode() is a few vectorised steps
+  def __init__(self, n_zones, index = 0):
+    self.n_zones = n_zones
+    self.index = index
+    self.n_frames = (n_zones + EXTENDED_ZONES - 1) // EXTENDED_ZONES
+
+    self.frames = numpy.zeros(
+      (self.n_frames,),
+      protocol.frame_dtype(protocol.MultiZoneExtendedSetColorZones)
+    )
+    self.frames['frame_header']['length'] = self.frames.dtype.itemsize
+    self.frames['frame_header']['protocol'] = 1024 | (1 << 12) # addressable
+    self.frames['protocol_header']['type'] = (
+      protocol.PacketType.MULTI_ZONE_EXTENDED_SET_COLOR_ZONES
+    )
+
+    # each frame covers a window of EXTENDED_ZONES zones, the last may be
+    # partial, and every frame applies its zones, since the frames are
+    # retried separately, so an earlier NO_APPLY frame could arrive after
+    # the APPLY frame and then stay buffered at the device indefinitely
+    payload = self.frames['payload']
+    payload['index'] = index + numpy.arange(self.n_frames) * EXTENDED_ZONES
+    payload['colors_count'] = numpy.minimum(
+      n_zones - numpy.arange(self.n_frames) * EXTENDED_ZONES,
+      EXTENDED_ZONES
+    )
+    payload['apply'] = protocol.MultiZoneExtendedApplicationRequest.APPLY
+
+    # the colours are quantised into a contiguous buffer, then copied into
+    # the frames (the frames are not contiguous in colours so we cannot use
+    # a flat view), unused entries of the last frame stay zero
+    self.colors = numpy.zeros(
+      (self.n_frames, EXTENDED_ZONES),
+      protocol.LightHsbk.dtype
+    )
+
+  # hsbk is (n_zones, N_HSBK) in the same units as UDP.set_color(), duration
+  # is in seconds, frame i uses sequence number (sequence + i) & 0xff, returns
+  # a list of n_frames serialized frames that are ready to send
+  def encode(
+    self,
+    source,
+    target,
+    sequence,
+    hsbk,
+    duration = 0.,
+    ack_required = False,
+    res_required = False
+  ):
+    assert hsbk.shape[0] == self.n_zones
+    self.frames['frame_header']['source'] = source
+    self.frames['frame_address']['target'] = target
+    self.frames['frame_address']['flags'] = (
+      int(res_required) | (int(ack_required) << 1)
+    )
+    self.frames['frame_address']['sequence'] = (
+      (sequence + numpy.arange(self.n_frames)) & 0xff
+    )
+    self.frames['payload']['duration'] = int(round(duration * 1000.))
+    hsbk_to_light_hsbk(
+      hsbk,
+      self.colors.reshape((self.n_frames * EXTENDED_ZONES,))[:self.n_zones]
+    )
+    self.frames['payload']['colors'] = self.colors
+
+    data = self.frames.tobytes()
+    size = self.frames.dtype.itemsize
+    return [data[i * size:(i + 1) * size] for i in range(self.n_frames)]
+
+# bytes on the wire per datagram besides the frame itself (IPv4 and UDP
+# headers), counted so that many small messages are not undercosted
+DATAGRAM_OVERHEAD = 28
+
+# cost in bytes of setting one range of zones to one colour, and of setting
+# one window of up to EXTENDED_ZONES zones to individual colours
+SET_COLOR_ZONES_COST = (
+  protocol.frame_dtype(protocol.MultiZoneSetColorZones).itemsize +
+    DATAGRAM_OVERHEAD
+)
+EXTENDED_SET_COLOR_ZONES_COST = (
+  protocol.frame_dtype(protocol.MultiZoneExtendedSetColorZones).itemsize +
+    DATAGRAM_OVERHEAD
+)
+
+# sends only what changed since the last colours sent to a device, each
+# update is diffed against them (after quantising, so that changes too
+# small to be seen by the device are not sent) and becomes either a
+# MultiZoneSetColorZones message per run of zones with the same new colour
+# that contains a change, or the MultiZoneExtendedSetColorZones messages for
+# all zones, whichever costs fewer bytes, use prepare() then encode(), and
+# commit() once the frames are acknowledged (or reset() if they were not)
+class SetColorZonesDeltaEncoder:
+  def __init__(self, n_zones):
+    assert n_zones <= 0x100 # start_index and end_index are 8 bits
+    self.n_zones = n_zones
+    self.extended = ExtendedSetColorZonesEncoder(n_zones)
+
+    # enough range frames for every zone to be its own run, the first
+    # n_frames are used by each encode(), unless extended is used instead
+    self.frames = numpy.zeros(
+      (n_zones,),
+      protocol.frame_dtype(protocol.MultiZoneSetColorZones)
+    )
+    self.frames['frame_header']['length'] = self.frames.dtype.itemsize
+    self.frames['frame_header']['protocol'] = 1024 | (1 << 12) # addressable
+    self.frames['protocol_header']['type'] = (
+      protocol.PacketType.MULTI_ZONE_SET_COLOR_ZONES
+    )
+    # each range applies itself, like the windows of extended, since a
+    # NO_APPLY range retried after the APPLY one would stay buffered
+    self.frames['payload']['apply'] = (
+      protocol.MultiZoneApplicationRequest.APPLY
+    )
+
+    self.colors = numpy.zeros((n_zones,), protocol.LightHsbk.dtype)
+    self.sent = None # colours the device is known to have, or None
+    self.hsbk = None
+    self.use_extended = False
+    self.n_frames = 0
+
+  # hsbk is (n_zones, N_HSBK) in the same units as UDP.set_color(), returns
+  # the number of frames that encode() will return, 0 if nothing changed
+  def prepare(self, hsbk):
+    assert hsbk.shape[0] == self.n_zones
+    self.hsbk = hsbk
+    hsbk_to_light_hsbk(hsbk, self.colors)
+    if self.sent is None:
+      self.use_extended = True
+      self.n_frames = self.extended.n_frames
+      return self.n_frames
+
+    # split into runs of the same new colour and keep runs with a change,
+    # a run can include unchanged zones since they are set to what they were
+    changed = self.colors != self.sent
+    starts = numpy.flatnonzero(
+      numpy.concatenate([[True], self.colors[1:] != self.colors[:-1]])
+    )
+    ends = numpy.concatenate([starts[1:], [self.n_zones]]) - 1
+    keep = numpy.logical_or.reduceat(changed, starts)
+    self.starts = starts[keep]
+    self.ends = ends[keep]
+
+    self.use_extended = (
+      self.starts.shape[0] * SET_COLOR_ZONES_COST >
+        self.extended.n_frames * EXTENDED_SET_COLOR_ZONES_COST
+    )
+    self.n_frames = (
+      self.extended.n_frames
+    if self.use_extended else
+      self.starts.shape[0]
+    )
+    return self.n_frames
+
+  # frame i uses sequence number (sequence + i) & 0xff, returns a list of
+  # n_frames serialized frames that are ready to send
+  def encode(
+    self,
+    source,
+    target,
+    sequence,
+    duration = 0.,
+    ack_required = False,
+    res_required = False
+  ):
+    if self.use_extended:
+      return self.extended.encode(
+        source,
+        target,
+        sequence,
+        self.hsbk,
+        duration,
+        ack_required,
+        res_required
+      )
+    if self.n_frames == 0:
+      return []
+
+    frames = self.frames[:self.n_frames]
+    frames['frame_header']['source'] = source
+    frames['frame_address']['target'] = target
+    frames['frame_address']['flags'] = (
+      int(res_required) | (int(ack_required) << 1)
+    )
+    frames['frame_address']['sequence'] = (
+      (sequence + numpy.arange(self.n_frames)) & 0xff
+    )
+    payload = frames['payload']
+    payload['start_index'] = self.starts
+    payload['end_index'] = self.ends
+    payload['color'] = self.colors[self.starts]
+    payload['duration'] = int(round(duration * 1000.))
+
+    data = frames.tobytes()
+    size = frames.dtype.itemsize
+    return [data[i * size:(i + 1) * size] for i in range(self.n_frames)]
+
+  # the frames from encode() were delivered, later updates are diffed
+  # against the colours they carried, colors is a copy of self.colors taken
+  # at encode() in case a later update was prepared while awaiting delivery
+  def commit(self, colors):
+    self.sent = colors
+
+  # the device's colours are unknown, so the next update sends all zones
+  def reset(self):
+    self.sent = None
@@ -0,0 +1,137 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy
+from light_hsbk import HSBK_HUE, HSBK_SAT, HSBK_BR, HSBK_KELV
+
+UV_u = 0
+UV_v = 1
+N_UV = 2
+
+# Kelvin range accepted by the converters, see ../python/hsbk_to_rgb.py
+KELV_MIN = 1500
+KELV_MAX = 9000
+
+# smallest changes counted as visible, the chromaticity difference is a
+# distance in CIE 1976 u'v' (around 1 step of a MacAdam ellipse is .001 to
+# .002 side by side, changes over time on the same light are harder to see)
+# and the brightness difference is in the brightness field, which is gamma
+# encoded so that equal steps look roughly equal at any brightness
+UV_JND = .004
+BR_JND = .01
+
+# resolution of the chromaticity table, hue is tabulated every 5 degrees,
+# Kelvin evenly in mireds, this keeps the interpolation error well under
+# UV_JND, and the table takes a fraction of a second to compute
+HUE_STEPS = 72
+SAT_STEPS = 16
+MIRED_STEPS = 16
+
+# decides whether changes of colour are visible, using a table of the
+# chromaticity at full brightness over hue, saturation and Kelvin, which is
+# computed by the given converters (e.g. hsbk_to_rgb_srgb and rgb_to_uv_srgb
+# from ../python) at construction, and then interpolated in vectorised form
+# so that many devices are checked at once
+class PerceptualFilter:
+  def __init__(
+    self,
+    hsbk_to_rgb,
+    rgb_to_uv,
+    uv_jnd = UV_JND,
+    br_jnd = BR_JND
+  ):
+    self.uv_jnd = uv_jnd
+    self.br_jnd = br_jnd
+
+    self.mired_min = 1e6 / KELV_MAX
+    self.mired_max = 1e6 / KELV_MIN
+    self.table = numpy.zeros(
+      (HUE_STEPS + 1, SAT_STEPS + 1, MIRED_STEPS + 1, N_UV),
+      numpy.double
+    )
+    for i in range(HUE_STEPS + 1):
+      for j in range(SAT_STEPS + 1):
+        for k in range(MIRED_STEPS + 1):
+          mired = (
+            self.mired_min +
+              (self.mired_max - self.mired_min) * k / MIRED_STEPS
+          )
+          self.table[i, j, k, :] = rgb_to_uv.convert(
+            hsbk_to_rgb.convert(
+              numpy.array(
+                [i * 360. / HUE_STEPS, j / SAT_STEPS, 1., 1e6 / mired],
+                numpy.double
+              )
+            )
+          )
+
+  # hsbk is (..., N_HSBK) in the same units as UDP.set_color(), returns
+  # (..., N_UV) chromaticity, which does not depend on the brightness
+  def uv(self, hsbk):
+    hsbk = numpy.asarray(hsbk, numpy.double)
+    mired = 1e6 / numpy.clip(hsbk[..., HSBK_KELV], KELV_MIN, KELV_MAX)
+    indices = []
+    fractions = []
+    for x, n in [
+      ((hsbk[..., HSBK_HUE] % 360.) * (HUE_STEPS / 360.), HUE_STEPS),
+      (numpy.clip(hsbk[..., HSBK_SAT], 0., 1.) * SAT_STEPS, SAT_STEPS),
+      (
+        (mired - self.mired_min) *
+          (MIRED_STEPS / (self.mired_max - self.mired_min)),
+        MIRED_STEPS
+      )
+    ]:
+      i = numpy.clip(numpy.floor(x).astype(numpy.int64), 0, n - 1)
+      indices.append(i)
+      fractions.append(x - i)
+
+    # trilinear interpolation from the 8 surrounding table entries
+    uv = numpy.zeros(hsbk.shape[:-1] + (N_UV,), numpy.double)
+    for corner in range(8):
+      weight = numpy.ones(hsbk.shape[:-1], numpy.double)
+      index = []
+      for axis in range(3):
+        if (corner >> axis) & 1:
+          weight = weight * fractions[axis]
+          index.append(indices[axis] + 1)
+        else:
+          weight = weight * (1. - fractions[axis])
+          index.append(indices[axis])
+      uv += weight[..., numpy.newaxis] * self.table[tuple(index)]
+    return uv
+
+  # old and new are (..., N_HSBK), returns a (...) array of bool which is
+  # True where the change from old to new would be visible, the difference
+  # in chromaticity is scaled by brightness, as it cannot be seen when dim
+  def visible(self, old, new):
+    old = numpy.asarray(old, numpy.double)
+    new = numpy.asarray(new, numpy.double)
+    uv_diff = numpy.sqrt(
+      numpy.sum(numpy.square(self.uv(new) - self.uv(old)), axis = -1)
+    )
+    br = numpy.clip(
+      numpy.maximum(old[..., HSBK_BR], new[..., HSBK_BR]),
+      0.,
+      1.
+    )
+    return (
+      (numpy.abs(new[..., HSBK_BR] - old[..., HSBK_BR]) >= self.br_jnd) |
+        (uv_diff * br >= self.uv_jnd)
+    )
@@ -0,0 +1,236 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import numpy
+import os
+import protocol
+import time
+
+# seconds between probes of each device, the probes of different devices
+# are spread evenly over the interval so that the traffic is smooth
+PROBE_INTERVAL = 10.
+
+# a probe not answered within this many seconds is counted as lost
+PROBE_TIMEOUT = 1.
+
+# upper edges of the round trip time histogram bins in seconds, there is
+# a further bin for anything slower (up to PROBE_TIMEOUT)
+RTT_BINS = numpy.array(
+  [.001, .002, .005, .01, .02, .05, .1, .2, .5],
+  numpy.double
+)
+
+# probe payload is our prefix then a probe number, to match each response
+PAYLOAD_PREFIX = b'probe'
+
+class ProbeStats:
+  def __init__(self, mac, addr):
+    self.mac = mac
+    self.addr = addr
+    self.n_sent = 0
+    self.n_received = 0
+    self.n_lost = 0
+    self.rtt_sum = 0.
+    self.rtt_max = 0.
+    self.histogram = numpy.zeros((RTT_BINS.shape[0] + 1,), numpy.int64)
+
+  def sample(self, rtt):
+    self.n_received += 1
+    self.rtt_sum += rtt
+    self.rtt_max = max(self.rtt_max, rtt)
+    self.histogram[numpy.searchsorted(RTT_BINS, rtt)] += 1
+
+  # fraction of completed probes (not those still in flight) that were lost
+  @property
+  def loss_rate(self):
+    n = self.n_received + self.n_lost
+    return self.n_lost / n if n else None
+
+  @property
+  def rtt_mean(self):
+    return self.rtt_sum / self.n_received if self.n_received else None
+
+  def to_dict(self):
+    return {
+      'addr': list(self.addr),
+      'sent': self.n_sent,
+      'received': self.n_received,
+      'lost': self.n_lost,
+      'loss_rate': self.loss_rate,
+      'rtt_mean': self.rtt_mean,
+      'rtt_max': self.rtt_max if self.n_received else None,
+      'histogram': [int(i) for i in self.histogram]
+    }
+
+# sends a DeviceEchoRequest to each device every interval, with one probe
+# in flight per device and no resends, and keeps per-device round trip time
+# histograms and loss rates, the round trip times also feed the timeouts
+# used by AsyncUDP (each probe is sent once, so it is a clean sample), must
+# be used on the event loop thread of udp (an AsyncUDP), if path is given
+# then a JSON snapshot is written there every snapshot_interval seconds
+class Prober:
+  def __init__(
+    self,
+    udp,
+    interval = PROBE_INTERVAL,
+    timeout = PROBE_TIMEOUT,
+    path = None,
+    snapshot_interval = PROBE_INTERVAL
+  ):
+    self.udp = udp
+    self.interval = interval
+    self.timeout = min(timeout, interval)
+    self.path = path
+    self.snapshot_interval = snapshot_interval
+    self.stats = {} # mac -> ProbeStats
+    self.timers = {} # mac -> scheduler.Timer for the next probe
+    # mac -> (target, sequence, handler, scheduler.Timer for its loss) of
+    # the probe in flight, if any
+    self.in_flight = {}
+    self.probe_number = 0
+    self.snapshot_timer = None
+
+  # devices is a dict of {mac: addr}, or a list of (mac, addr), devices can
+  # also be added or removed while running by add_device(), remove_device()
+  def start(self, devices):
+    if isinstance(devices, dict):
+      devices = list(devices.items())
+    for i in range(len(devices)):
+      mac, addr = devices[i]
+      self.add_device(mac, addr, self.interval * i / len(devices))
+    if self.path is not None:
+      self.snapshot_timer = self.udp.scheduler.call_later(
+        self.snapshot_interval,
+        self.write_snapshot
+      )
+
+  def close(self):
+    for mac in list(self.timers.keys()):
+      self.remove_device(mac)
+    if self.snapshot_timer is not None:
+      self.snapshot_timer.cancel()
+      self.snapshot_timer = None
+
+  # delay is the time to the first probe, so as to spread out the probes
+  def add_device(self, mac, addr, delay = 0.):
+    self.remove_device(mac)
+    stats = self.stats.get(mac)
+    if stats is None or stats.addr != addr:
+      stats = ProbeStats(mac, addr)
+      self.stats[mac] = stats
+    self.timers[mac] = self.udp.scheduler.call_later(
+      delay,
+      self.probe,
+      stats,
+      self.udp.scheduler.time() + delay
+    )
+
+  # stops probing the device, but keeps its statistics, any probe in flight
+  # is abandoned, so it counts as neither received nor lost
+  def remove_device(self, mac):
+    timer = self.timers.pop(mac, None)
+    if timer is not None:
+      timer.cancel()
+    in_flight = self.in_flight.pop(mac, None)
+    if in_flight is not None:
+      target, sequence, handler, timer = in_flight
+      self.udp.remove_handler(target, sequence, handler)
+      timer.cancel()
+
+  # when is the time the probe was due, to keep probes evenly spaced
+  def probe(self, stats, when):
+    udp = self.udp
+    scheduler = udp.scheduler
+    target = (bytes.fromhex(stats.mac) + bytes(8))[:8]
+    sequence = udp.next_sequence(target)
+    payload = PAYLOAD_PREFIX + self.probe_number.to_bytes(8, 'little')
+    self.probe_number += 1
+    out_data = protocol.Frame(
+      frame_header = protocol.FrameHeader(
+        source = udp.source
+      ),
+      frame_address = protocol.FrameAddress(
+        target = target,
+        sequence = sequence
+      ),
+      protocol_header = protocol.ProtocolHeader(
+        _type = protocol.PacketType.DEVICE_ECHO_REQUEST
+      ),
+      payload = protocol.DeviceEchoRequest(
+        payload = (payload + bytes(64))[:64]
+      )
+    ).serialize()
+
+    sent = scheduler.time()
+    # a late loop can start the next probe before this one is lost
+    def done():
+      if self.in_flight.get(stats.mac, (None,) * 4)[2] is handler:
+        del self.in_flight[stats.mac]
+    def handler(frame, addr):
+      if (
+        addr == stats.addr and
+          frame.protocol_header.type ==
+            protocol.PacketType.DEVICE_ECHO_RESPONSE and
+          frame.payload.payload[:len(payload)] == payload
+      ):
+        udp.remove_handler(target, sequence, handler)
+        timer.cancel()
+        done()
+        rtt = scheduler.time() - sent
+        stats.sample(rtt)
+        udp.rtt(target).sample(rtt)
+    def lost():
+      udp.remove_handler(target, sequence, handler)
+      done()
+      stats.n_lost += 1
+    udp.add_handler(target, sequence, handler)
+    timer = scheduler.call_later(self.timeout, lost)
+    self.in_flight[stats.mac] = (target, sequence, handler, timer)
+    stats.n_sent += 1
+    udp.sendto(out_data, stats.addr)
+
+    # if the loop fell behind, skip missed probes rather than bunching up
+    when += self.interval
+    now = scheduler.time()
+    if when < now:
+      when += (now - when) // self.interval * self.interval + self.interval
+    self.timers[stats.mac] = scheduler.call_at(when, self.probe, stats, when)
+
+  # returns the statistics of all devices, as written to the JSON snapshot
+  def snapshot(self):
+    return {
+      'time': time.time(),
+      'rtt_bins': [float(i) for i in RTT_BINS],
+      'devices': {
+        mac: stats.to_dict()
+        for mac, stats in self.stats.items()
+      }
+    }
+
+  def write_snapshot(self):
+    # write and rename so that the snapshot is never seen half-written
+    with open(self.path + '.tmp', 'w') as fout:
+      json.dump(self.snapshot(), fout, indent = 2)
+    os.replace(self.path + '.tmp', self.path)
+    self.snapshot_timer = self.udp.scheduler.call_later(
+      self.snapshot_interval,
+      self.write_snapshot
+    )
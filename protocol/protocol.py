@@ -0,0 +1,2242 @@
+# generated file, do not edit!
+
+import numpy
+import struct
+
+class Enum:
+  pass
+
+# each Struct subclass also has a class attribute dtype, which is a numpy
+# structured dtype with the same layout as the serialized data, so that many
+# payloads can be decoded by numpy.frombuffer() or encoded by .tobytes(),
+# deserialize() accepts bytes or a memoryview (e.g. of a receive buffer that
+# is reused), and copies out any bytes fields so they do not refer to it
+class Struct:
+  dtype = None
+  def serialize(self):
+    raise NotImplementedError
+  def deserialize(self, data):
+    raise NotImplementedError
+
+class Empty(Struct):
+  dtype = numpy.dtype([])
+  def serialize(self):
+    return b''
+  def deserialize(self, data):
+    pass
+
+# returns the payload type (a Struct subclass) for a packet type, by one
+# index into the generated dispatch table, Empty for unknown packet types
+def payload_type(_type):
+  entry = dispatch[_type] if _type < len(dispatch) else None
+  return Empty if entry is None else entry[0]
+
+# the below FrameHeader, FrameAddress, Protocolheader will be defined in a
+# fairly dumb way, similarly to the automatically generated ones but allowing
+# bit-fields (which conceptually can be done in the automatically generated
+# ones as well, but has not been so far), however, this container class is a
+# bit smarter, as it will deal with the length and type fields automatically
+class Frame(Struct):
+  def __init__(
+    self,
+    frame_header = None,
+    frame_address = None,
+    protocol_header = None,
+    payload = None
+  ):
+    self.frame_header = (
+      FrameHeader()
+    if frame_header is None else
+      frame_header
+    )
+    self.frame_address = (
+      FrameAddress()
+    if frame_address is None else
+      frame_address
+    )
+    self.protocol_header = (
+      ProtocolHeader()
+    if protocol_header is None else
+      protocol_header
+    )
+    self.payload = (
+      payload_type(self.protocol_header.type)()
+    if payload is None else
+      payload
+    )
+  def serialize(self):
+    assert isinstance(
+      self.payload,
+      payload_type(self.protocol_header.type)
+    )
+    serialized_payload = self.payload.serialize()
+    self.frame_header.length = 36 + len(serialized_payload)
+    return b''.join(
+      [
+        self.frame_header.serialize(),
+        self.frame_address.serialize(),
+        self.protocol_header.serialize(),
+        serialized_payload
+      ]
+    )
+  def deserialize(self, data):
+    self.frame_header.deserialize(data[0:16])
+    self.frame_address.deserialize(data[8:24])
+    self.protocol_header.deserialize(data[24:36])
+    self.payload = payload_type(self.protocol_header.type)()
+    self.payload.deserialize(data[36:])
+
+# the bit-fields are not broken out in the dtype, the protocol field holds
+# protocol | addressable << 12 | tagged << 13 | origin << 14 as serialized
+class FrameHeader(Struct):
+  dtype = numpy.dtype(
+    {
+      'names': ['length', 'protocol', 'source'],
+      'formats': ['<u2', '<u2', '<u4'],
+      'offsets': [0, 2, 4],
+      'itemsize': 8
+    }
+  )
+  def __init__(
+    self,
+    length = 0,
+    protocol = 1024,
+    addressable = True,
+    tagged = False,
+    origin = 0,
+    source = 0
+  ):
+    self.length = length
+    self.protocol = protocol
+    self.addressable = addressable
+    self.tagged = tagged
+    self.origin = origin
+    self.source = source
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.length, 2, 'little'),
+        int.to_bytes(
+          self.protocol |
+            (int(self.addressable) << 12) |
+            (int(self.tagged) << 13) |
+            (self.origin << 14),
+          2,
+          'little'
+        ),
+        int.to_bytes(self.source, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.length = int.from_bytes(data[0:2], 'little')
+    x = int.from_bytes(data[2:4], 'little')
+    self.protocol = x & 0xfff
+    self.addressable = ((x >> 12) & 1) != 0
+    self.tagged = ((x >> 13) & 1) != 0
+    self.origin = (x >> 14) & 3
+    self.source = int.from_bytes(data[4:8], 'little')
+
+# the bit-fields are not broken out in the dtype, the flags field holds
+# res_required | ack_required << 1 as serialized
+class FrameAddress(Struct):
+  dtype = numpy.dtype(
+    {
+      'names': ['target', 'flags', 'sequence'],
+      'formats': ['S8', 'u1', 'u1'],
+      'offsets': [0, 14, 15],
+      'itemsize': 16
+    }
+  )
+  def __init__(
+    self,
+    target = bytes(8),
+    res_required = False,
+    ack_required = False,
+    sequence = 0
+  ):
+    self.target = target
+    self.res_required = res_required
+    self.ack_required = ack_required
+    self.sequence = sequence
+  def serialize(self):
+    return b''.join(
+      [
+        self.target,
+        bytes(6),
+        int.to_bytes(
+          int(self.res_required) |
+            (int(self.ack_required) << 1),
+          1,
+          'little'
+        ),
+        int.to_bytes(self.sequence, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.target = bytes(data[0:8])
+    x = int.from_bytes(data[14:15], 'little')
+    self.res_required = (x & 1) != 0
+    self.ack_required = ((x >> 1) & 1) != 0
+    self.sequence = int.from_bytes(data[15:16], 'little')
+
+class ProtocolHeader(Struct):
+  dtype = numpy.dtype(
+    {
+      'names': ['type'],
+      'formats': ['<u2'],
+      'offsets': [8],
+      'itemsize': 12
+    }
+  )
+  def __init__(
+    self,
+    _type = 0
+  ):
+    self.type = _type
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(8),
+        int.to_bytes(self.type, 2, 'little'),
+        bytes(2)
+      ]
+    )
+  def deserialize(self, data):
+    self.type = int.from_bytes(data[8:10], 'little')
+
+# returns a numpy structured dtype for a whole frame with the given payload
+# type (a Struct subclass), the length field should be set to its itemsize
+def frame_dtype(payload_type):
+  return numpy.dtype(
+    [
+      ('frame_header', FrameHeader.dtype),
+      ('frame_address', FrameAddress.dtype),
+      ('protocol_header', ProtocolHeader.dtype),
+      ('payload', payload_type.dtype)
+    ]
+  )
+
+# the remainder of the file is automatically generated from protocol.yml
+class DeviceService(Enum):
+  UDP = 1
+  names = {
+    1: 'UDP'
+  }
+
+class LightWaveform(Enum):
+  SAW = 0
+  SINE = 1
+  HALF_SINE = 2
+  TRIANGLE = 3
+  PULSE = 4
+  names = {
+    0: 'SAW',
+    1: 'SINE',
+    2: 'HALF_SINE',
+    3: 'TRIANGLE',
+    4: 'PULSE'
+  }
+
+class MultiZoneApplicationRequest(Enum):
+  NO_APPLY = 0
+  APPLY = 1
+  APPLY_ONLY = 2
+  names = {
+    0: 'NO_APPLY',
+    1: 'APPLY',
+    2: 'APPLY_ONLY'
+  }
+
+class MultiZoneEffectType(Enum):
+  OFF = 0
+  MOVE = 1
+  names = {
+    0: 'OFF',
+    1: 'MOVE'
+  }
+
+class MultiZoneExtendedApplicationRequest(Enum):
+  NO_APPLY = 0
+  APPLY = 1
+  APPLY_ONLY = 2
+  names = {
+    0: 'NO_APPLY',
+    1: 'APPLY',
+    2: 'APPLY_ONLY'
+  }
+
+class TileEffectType(Enum):
+  OFF = 0
+  MORPH = 2
+  FLAME = 3
+  names = {
+    0: 'OFF',
+    2: 'MORPH',
+    3: 'FLAME'
+  }
+
+class LightHsbk(Struct):
+  def __init__(
+    self,
+    hue = 0,
+    saturation = 0,
+    brightness = 0,
+    kelvin = 0
+  ):
+    self.hue = hue
+    self.saturation = saturation
+    self.brightness = brightness
+    self.kelvin = kelvin
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.hue, 2, 'little'),
+        int.to_bytes(self.saturation, 2, 'little'),
+        int.to_bytes(self.brightness, 2, 'little'),
+        int.to_bytes(self.kelvin, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.hue = int.from_bytes(data[0:2], 'little')
+    self.saturation = int.from_bytes(data[2:4], 'little')
+    self.brightness = int.from_bytes(data[4:6], 'little')
+    self.kelvin = int.from_bytes(data[6:8], 'little')
+
+class MultiZoneEffectParameter(Struct):
+  def __init__(
+    self,
+    parameter0 = 0,
+    parameter1 = 0,
+    parameter2 = 0,
+    parameter3 = 0,
+    parameter4 = 0,
+    parameter5 = 0,
+    parameter6 = 0,
+    parameter7 = 0
+  ):
+    self.parameter0 = parameter0
+    self.parameter1 = parameter1
+    self.parameter2 = parameter2
+    self.parameter3 = parameter3
+    self.parameter4 = parameter4
+    self.parameter5 = parameter5
+    self.parameter6 = parameter6
+    self.parameter7 = parameter7
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.parameter0, 4, 'little'),
+        int.to_bytes(self.parameter1, 4, 'little'),
+        int.to_bytes(self.parameter2, 4, 'little'),
+        int.to_bytes(self.parameter3, 4, 'little'),
+        int.to_bytes(self.parameter4, 4, 'little'),
+        int.to_bytes(self.parameter5, 4, 'little'),
+        int.to_bytes(self.parameter6, 4, 'little'),
+        int.to_bytes(self.parameter7, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.parameter0 = int.from_bytes(data[0:4], 'little')
+    self.parameter1 = int.from_bytes(data[4:8], 'little')
+    self.parameter2 = int.from_bytes(data[8:12], 'little')
+    self.parameter3 = int.from_bytes(data[12:16], 'little')
+    self.parameter4 = int.from_bytes(data[16:20], 'little')
+    self.parameter5 = int.from_bytes(data[20:24], 'little')
+    self.parameter6 = int.from_bytes(data[24:28], 'little')
+    self.parameter7 = int.from_bytes(data[28:32], 'little')
+
+class MultiZoneEffectSettings(Struct):
+  def __init__(
+    self,
+    instanceid = 0,
+    type = MultiZoneEffectType.OFF,
+    speed = 0,
+    duration = 0,
+    parameter = None
+  ):
+    self.instanceid = instanceid
+    self.type = type
+    self.speed = speed
+    self.duration = duration
+    self.parameter = MultiZoneEffectParameter() if parameter is None else parameter
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.instanceid, 4, 'little'),
+        int.to_bytes(self.type, 1, 'little'),
+        bytes(2),
+        int.to_bytes(self.speed, 4, 'little'),
+        int.to_bytes(self.duration, 8, 'little'),
+        bytes(4),
+        bytes(4),
+        self.parameter.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.instanceid = int.from_bytes(data[0:4], 'little')
+    self.type = int.from_bytes(data[4:5], 'little')
+    self.speed = int.from_bytes(data[7:11], 'little')
+    self.duration = int.from_bytes(data[11:19], 'little')
+    self.parameter.deserialize(data[27:59])
+
+class TileAccelMeas(Struct):
+  def __init__(
+    self,
+    x = 0,
+    y = 0,
+    z = 0
+  ):
+    self.x = x
+    self.y = y
+    self.z = z
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.x, 2, 'little', signed = True),
+        int.to_bytes(self.y, 2, 'little', signed = True),
+        int.to_bytes(self.z, 2, 'little', signed = True)
+      ]
+    )
+  def deserialize(self, data):
+    self.x = int.from_bytes(data[0:2], 'little', signed = True)
+    self.y = int.from_bytes(data[2:4], 'little', signed = True)
+    self.z = int.from_bytes(data[4:6], 'little', signed = True)
+
+class DeviceStateVersion(Struct):
+  def __init__(
+    self,
+    vendor = 0,
+    product = 0
+  ):
+    self.vendor = vendor
+    self.product = product
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.vendor, 4, 'little'),
+        int.to_bytes(self.product, 4, 'little'),
+        bytes(4)
+      ]
+    )
+  def deserialize(self, data):
+    self.vendor = int.from_bytes(data[0:4], 'little')
+    self.product = int.from_bytes(data[4:8], 'little')
+
+class DeviceStateHostFirmware(Struct):
+  def __init__(
+    self,
+    build = 0,
+    version_minor = 0,
+    version_major = 0
+  ):
+    self.build = build
+    self.version_minor = version_minor
+    self.version_major = version_major
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.build, 8, 'little'),
+        bytes(8),
+        int.to_bytes(self.version_minor, 2, 'little'),
+        int.to_bytes(self.version_major, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.build = int.from_bytes(data[0:8], 'little')
+    self.version_minor = int.from_bytes(data[16:18], 'little')
+    self.version_major = int.from_bytes(data[18:20], 'little')
+
+class TileStateDevice(Struct):
+  def __init__(
+    self,
+    accel_meas = None,
+    user_x = 0.,
+    user_y = 0.,
+    width = 0,
+    height = 0,
+    device_version = None,
+    firmware = None
+  ):
+    self.accel_meas = TileAccelMeas() if accel_meas is None else accel_meas
+    self.user_x = user_x
+    self.user_y = user_y
+    self.width = width
+    self.height = height
+    self.device_version = DeviceStateVersion() if device_version is None else device_version
+    self.firmware = DeviceStateHostFirmware() if firmware is None else firmware
+  def serialize(self):
+    return b''.join(
+      [
+        self.accel_meas.serialize(),
+        bytes(2),
+        struct.pack('<f', self.user_x),
+        struct.pack('<f', self.user_y),
+        int.to_bytes(self.width, 1, 'little'),
+        int.to_bytes(self.height, 1, 'little'),
+        bytes(1),
+        self.device_version.serialize(),
+        self.firmware.serialize(),
+        bytes(4)
+      ]
+    )
+  def deserialize(self, data):
+    self.accel_meas.deserialize(data[0:6])
+    self.user_x, = struct.unpack('<f', data[8:12])
+    self.user_y, = struct.unpack('<f', data[12:16])
+    self.width = int.from_bytes(data[16:17], 'little')
+    self.height = int.from_bytes(data[17:18], 'little')
+    self.device_version.deserialize(data[19:31])
+    self.firmware.deserialize(data[31:51])
+
+class TileBufferRect(Struct):
+  def __init__(
+    self,
+    x = 0,
+    y = 0,
+    width = 0
+  ):
+    self.x = x
+    self.y = y
+    self.width = width
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        int.to_bytes(self.x, 1, 'little'),
+        int.to_bytes(self.y, 1, 'little'),
+        int.to_bytes(self.width, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.x = int.from_bytes(data[1:2], 'little')
+    self.y = int.from_bytes(data[2:3], 'little')
+    self.width = int.from_bytes(data[3:4], 'little')
+
+class TileEffectParameter(Struct):
+  def __init__(
+    self,
+    parameter0 = 0,
+    parameter1 = 0,
+    parameter2 = 0,
+    parameter3 = 0,
+    parameter4 = 0,
+    parameter5 = 0,
+    parameter6 = 0,
+    parameter7 = 0
+  ):
+    self.parameter0 = parameter0
+    self.parameter1 = parameter1
+    self.parameter2 = parameter2
+    self.parameter3 = parameter3
+    self.parameter4 = parameter4
+    self.parameter5 = parameter5
+    self.parameter6 = parameter6
+    self.parameter7 = parameter7
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.parameter0, 4, 'little'),
+        int.to_bytes(self.parameter1, 4, 'little'),
+        int.to_bytes(self.parameter2, 4, 'little'),
+        int.to_bytes(self.parameter3, 4, 'little'),
+        int.to_bytes(self.parameter4, 4, 'little'),
+        int.to_bytes(self.parameter5, 4, 'little'),
+        int.to_bytes(self.parameter6, 4, 'little'),
+        int.to_bytes(self.parameter7, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.parameter0 = int.from_bytes(data[0:4], 'little')
+    self.parameter1 = int.from_bytes(data[4:8], 'little')
+    self.parameter2 = int.from_bytes(data[8:12], 'little')
+    self.parameter3 = int.from_bytes(data[12:16], 'little')
+    self.parameter4 = int.from_bytes(data[16:20], 'little')
+    self.parameter5 = int.from_bytes(data[20:24], 'little')
+    self.parameter6 = int.from_bytes(data[24:28], 'little')
+    self.parameter7 = int.from_bytes(data[28:32], 'little')
+
+class TileEffectSettings(Struct):
+  def __init__(
+    self,
+    instanceid = 0,
+    type = TileEffectType.OFF,
+    speed = 0,
+    duration = 0,
+    parameter = None,
+    palette_count = 0,
+    palette = None
+  ):
+    self.instanceid = instanceid
+    self.type = type
+    self.speed = speed
+    self.duration = duration
+    self.parameter = TileEffectParameter() if parameter is None else parameter
+    self.palette_count = palette_count
+    self.palette = [LightHsbk() for i in range(16)] if palette is None else palette
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.instanceid, 4, 'little'),
+        int.to_bytes(self.type, 1, 'little'),
+        int.to_bytes(self.speed, 4, 'little'),
+        int.to_bytes(self.duration, 8, 'little'),
+        bytes(4),
+        bytes(4),
+        self.parameter.serialize(),
+        int.to_bytes(self.palette_count, 1, 'little'),
+        b''.join([i.serialize() for i in self.palette])
+      ]
+    )
+  def deserialize(self, data):
+    self.instanceid = int.from_bytes(data[0:4], 'little')
+    self.type = int.from_bytes(data[4:5], 'little')
+    self.speed = int.from_bytes(data[5:9], 'little')
+    self.duration = int.from_bytes(data[9:17], 'little')
+    self.parameter.deserialize(data[25:57])
+    self.palette_count = int.from_bytes(data[57:58], 'little')
+    for i in range(16):
+      self.palette[i].deserialize(data[58 + i * 8:58 + i * 8 + 8])
+
+class DeviceStateService(Struct):
+  def __init__(
+    self,
+    service = DeviceService.UDP,
+    port = 0
+  ):
+    self.service = service
+    self.port = port
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.service, 1, 'little'),
+        int.to_bytes(self.port, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.service = int.from_bytes(data[0:1], 'little')
+    self.port = int.from_bytes(data[1:5], 'little')
+
+class DeviceStateHostInfo(Struct):
+  def __init__(
+    self,
+    signal = 0.,
+    tx = 0,
+    rx = 0
+  ):
+    self.signal = signal
+    self.tx = tx
+    self.rx = rx
+  def serialize(self):
+    return b''.join(
+      [
+        struct.pack('<f', self.signal),
+        int.to_bytes(self.tx, 4, 'little'),
+        int.to_bytes(self.rx, 4, 'little'),
+        bytes(2)
+      ]
+    )
+  def deserialize(self, data):
+    self.signal, = struct.unpack('<f', data[0:4])
+    self.tx = int.from_bytes(data[4:8], 'little')
+    self.rx = int.from_bytes(data[8:12], 'little')
+
+class DeviceStateWifiInfo(Struct):
+  def __init__(
+    self,
+    signal = 0.,
+    tx = 0,
+    rx = 0
+  ):
+    self.signal = signal
+    self.tx = tx
+    self.rx = rx
+  def serialize(self):
+    return b''.join(
+      [
+        struct.pack('<f', self.signal),
+        int.to_bytes(self.tx, 4, 'little'),
+        int.to_bytes(self.rx, 4, 'little'),
+        bytes(2)
+      ]
+    )
+  def deserialize(self, data):
+    self.signal, = struct.unpack('<f', data[0:4])
+    self.tx = int.from_bytes(data[4:8], 'little')
+    self.rx = int.from_bytes(data[8:12], 'little')
+
+class DeviceStateWifiFirmware(Struct):
+  def __init__(
+    self,
+    build = 0,
+    version_minor = 0,
+    version_major = 0
+  ):
+    self.build = build
+    self.version_minor = version_minor
+    self.version_major = version_major
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.build, 8, 'little'),
+        bytes(8),
+        int.to_bytes(self.version_minor, 2, 'little'),
+        int.to_bytes(self.version_major, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.build = int.from_bytes(data[0:8], 'little')
+    self.version_minor = int.from_bytes(data[16:18], 'little')
+    self.version_major = int.from_bytes(data[18:20], 'little')
+
+class DeviceSetPower(Struct):
+  def __init__(
+    self,
+    level = 0
+  ):
+    self.level = level
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.level, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.level = int.from_bytes(data[0:2], 'little')
+
+class DeviceStatePower(Struct):
+  def __init__(
+    self,
+    level = 0
+  ):
+    self.level = level
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.level, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.level = int.from_bytes(data[0:2], 'little')
+
+class DeviceSetLabel(Struct):
+  def __init__(
+    self,
+    label = bytes(32)
+  ):
+    self.label = label
+  def serialize(self):
+    return b''.join(
+      [
+        self.label
+      ]
+    )
+  def deserialize(self, data):
+    self.label = bytes(data[0:32])
+
+class DeviceStateLabel(Struct):
+  def __init__(
+    self,
+    label = bytes(32)
+  ):
+    self.label = label
+  def serialize(self):
+    return b''.join(
+      [
+        self.label
+      ]
+    )
+  def deserialize(self, data):
+    self.label = bytes(data[0:32])
+
+class DeviceStateInfo(Struct):
+  def __init__(
+    self,
+    time = 0,
+    uptime = 0,
+    downtime = 0
+  ):
+    self.time = time
+    self.uptime = uptime
+    self.downtime = downtime
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.time, 8, 'little'),
+        int.to_bytes(self.uptime, 8, 'little'),
+        int.to_bytes(self.downtime, 8, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.time = int.from_bytes(data[0:8], 'little')
+    self.uptime = int.from_bytes(data[8:16], 'little')
+    self.downtime = int.from_bytes(data[16:24], 'little')
+
+class DeviceSetLocation(Struct):
+  def __init__(
+    self,
+    location = bytes(16),
+    label = bytes(32),
+    updated_at = 0
+  ):
+    self.location = location
+    self.label = label
+    self.updated_at = updated_at
+  def serialize(self):
+    return b''.join(
+      [
+        self.location,
+        self.label,
+        int.to_bytes(self.updated_at, 8, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.location = bytes(data[0:16])
+    self.label = bytes(data[16:48])
+    self.updated_at = int.from_bytes(data[48:56], 'little')
+
+class DeviceStateLocation(Struct):
+  def __init__(
+    self,
+    location = bytes(16),
+    label = bytes(32),
+    updated_at = 0
+  ):
+    self.location = location
+    self.label = label
+    self.updated_at = updated_at
+  def serialize(self):
+    return b''.join(
+      [
+        self.location,
+        self.label,
+        int.to_bytes(self.updated_at, 8, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.location = bytes(data[0:16])
+    self.label = bytes(data[16:48])
+    self.updated_at = int.from_bytes(data[48:56], 'little')
+
+class DeviceSetGroup(Struct):
+  def __init__(
+    self,
+    group = bytes(16),
+    label = bytes(32),
+    updated_at = 0
+  ):
+    self.group = group
+    self.label = label
+    self.updated_at = updated_at
+  def serialize(self):
+    return b''.join(
+      [
+        self.group,
+        self.label,
+        int.to_bytes(self.updated_at, 8, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.group = bytes(data[0:16])
+    self.label = bytes(data[16:48])
+    self.updated_at = int.from_bytes(data[48:56], 'little')
+
+class DeviceStateGroup(Struct):
+  def __init__(
+    self,
+    group = bytes(16),
+    label = bytes(32),
+    updated_at = 0
+  ):
+    self.group = group
+    self.label = label
+    self.updated_at = updated_at
+  def serialize(self):
+    return b''.join(
+      [
+        self.group,
+        self.label,
+        int.to_bytes(self.updated_at, 8, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.group = bytes(data[0:16])
+    self.label = bytes(data[16:48])
+    self.updated_at = int.from_bytes(data[48:56], 'little')
+
+class DeviceEchoRequest(Struct):
+  def __init__(
+    self,
+    payload = bytes(64)
+  ):
+    self.payload = payload
+  def serialize(self):
+    return b''.join(
+      [
+        self.payload
+      ]
+    )
+  def deserialize(self, data):
+    self.payload = bytes(data[0:64])
+
+class DeviceEchoResponse(Struct):
+  def __init__(
+    self,
+    payload = bytes(64)
+  ):
+    self.payload = payload
+  def serialize(self):
+    return b''.join(
+      [
+        self.payload
+      ]
+    )
+  def deserialize(self, data):
+    self.payload = bytes(data[0:64])
+
+class DeviceStateUnhandled(Struct):
+  def __init__(
+    self,
+    unhandled_type = 0
+  ):
+    self.unhandled_type = unhandled_type
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.unhandled_type, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.unhandled_type = int.from_bytes(data[0:2], 'little')
+
+class LightSetColor(Struct):
+  def __init__(
+    self,
+    color = None,
+    duration = 0
+  ):
+    self.color = LightHsbk() if color is None else color
+    self.duration = duration
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        self.color.serialize(),
+        int.to_bytes(self.duration, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.color.deserialize(data[1:9])
+    self.duration = int.from_bytes(data[9:13], 'little')
+
+class LightSetWaveformOptional(Struct):
+  def __init__(
+    self,
+    transient = False,
+    color = None,
+    period = 0,
+    cycles = 0.,
+    skew_ratio = 0,
+    waveform = LightWaveform.SAW,
+    set_hue = False,
+    set_saturation = False,
+    set_brightness = False,
+    set_kelvin = False
+  ):
+    self.transient = transient
+    self.color = LightHsbk() if color is None else color
+    self.period = period
+    self.cycles = cycles
+    self.skew_ratio = skew_ratio
+    self.waveform = waveform
+    self.set_hue = set_hue
+    self.set_saturation = set_saturation
+    self.set_brightness = set_brightness
+    self.set_kelvin = set_kelvin
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        int.to_bytes(self.transient, 1, 'little'),
+        self.color.serialize(),
+        int.to_bytes(self.period, 4, 'little'),
+        struct.pack('<f', self.cycles),
+        int.to_bytes(self.skew_ratio, 2, 'little', signed = True),
+        int.to_bytes(self.waveform, 1, 'little'),
+        int.to_bytes(self.set_hue, 1, 'little'),
+        int.to_bytes(self.set_saturation, 1, 'little'),
+        int.to_bytes(self.set_brightness, 1, 'little'),
+        int.to_bytes(self.set_kelvin, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.transient = int.from_bytes(data[1:2], 'little') != 0
+    self.color.deserialize(data[2:10])
+    self.period = int.from_bytes(data[10:14], 'little')
+    self.cycles, = struct.unpack('<f', data[14:18])
+    self.skew_ratio = int.from_bytes(data[18:20], 'little', signed = True)
+    self.waveform = int.from_bytes(data[20:21], 'little')
+    self.set_hue = int.from_bytes(data[21:22], 'little') != 0
+    self.set_saturation = int.from_bytes(data[22:23], 'little') != 0
+    self.set_brightness = int.from_bytes(data[23:24], 'little') != 0
+    self.set_kelvin = int.from_bytes(data[24:25], 'little') != 0
+
+class LightSetWaveform(Struct):
+  def __init__(
+    self,
+    transient = False,
+    color = None,
+    period = 0,
+    cycles = 0.,
+    skew_ratio = 0,
+    waveform = LightWaveform.SAW
+  ):
+    self.transient = transient
+    self.color = LightHsbk() if color is None else color
+    self.period = period
+    self.cycles = cycles
+    self.skew_ratio = skew_ratio
+    self.waveform = waveform
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        int.to_bytes(self.transient, 1, 'little'),
+        self.color.serialize(),
+        int.to_bytes(self.period, 4, 'little'),
+        struct.pack('<f', self.cycles),
+        int.to_bytes(self.skew_ratio, 2, 'little', signed = True),
+        int.to_bytes(self.waveform, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.transient = int.from_bytes(data[1:2], 'little') != 0
+    self.color.deserialize(data[2:10])
+    self.period = int.from_bytes(data[10:14], 'little')
+    self.cycles, = struct.unpack('<f', data[14:18])
+    self.skew_ratio = int.from_bytes(data[18:20], 'little', signed = True)
+    self.waveform = int.from_bytes(data[20:21], 'little')
+
+class LightSetPower(Struct):
+  def __init__(
+    self,
+    level = 0,
+    duration = 0
+  ):
+    self.level = level
+    self.duration = duration
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.level, 2, 'little'),
+        int.to_bytes(self.duration, 4, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.level = int.from_bytes(data[0:2], 'little')
+    self.duration = int.from_bytes(data[2:6], 'little')
+
+class LightStatePower(Struct):
+  def __init__(
+    self,
+    level = 0
+  ):
+    self.level = level
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.level, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.level = int.from_bytes(data[0:2], 'little')
+
+class LightState(Struct):
+  def __init__(
+    self,
+    color = None,
+    power = 0,
+    label = bytes(32)
+  ):
+    self.color = LightHsbk() if color is None else color
+    self.power = power
+    self.label = label
+  def serialize(self):
+    return b''.join(
+      [
+        self.color.serialize(),
+        bytes(2),
+        int.to_bytes(self.power, 2, 'little'),
+        self.label,
+        bytes(8)
+      ]
+    )
+  def deserialize(self, data):
+    self.color.deserialize(data[0:8])
+    self.power = int.from_bytes(data[10:12], 'little')
+    self.label = bytes(data[12:44])
+
+class LightStateInfrared(Struct):
+  def __init__(
+    self,
+    brightness = 0
+  ):
+    self.brightness = brightness
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.brightness, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.brightness = int.from_bytes(data[0:2], 'little')
+
+class LightSetInfrared(Struct):
+  def __init__(
+    self,
+    brightness = 0
+  ):
+    self.brightness = brightness
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.brightness, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.brightness = int.from_bytes(data[0:2], 'little')
+
+class MultiZoneSetColorZones(Struct):
+  def __init__(
+    self,
+    start_index = 0,
+    end_index = 0,
+    color = None,
+    duration = 0,
+    apply = MultiZoneApplicationRequest.NO_APPLY
+  ):
+    self.start_index = start_index
+    self.end_index = end_index
+    self.color = LightHsbk() if color is None else color
+    self.duration = duration
+    self.apply = apply
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.start_index, 1, 'little'),
+        int.to_bytes(self.end_index, 1, 'little'),
+        self.color.serialize(),
+        int.to_bytes(self.duration, 4, 'little'),
+        int.to_bytes(self.apply, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.start_index = int.from_bytes(data[0:1], 'little')
+    self.end_index = int.from_bytes(data[1:2], 'little')
+    self.color.deserialize(data[2:10])
+    self.duration = int.from_bytes(data[10:14], 'little')
+    self.apply = int.from_bytes(data[14:15], 'little')
+
+class MultiZoneGetColorZones(Struct):
+  def __init__(
+    self,
+    start_index = 0,
+    end_index = 0
+  ):
+    self.start_index = start_index
+    self.end_index = end_index
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.start_index, 1, 'little'),
+        int.to_bytes(self.end_index, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.start_index = int.from_bytes(data[0:1], 'little')
+    self.end_index = int.from_bytes(data[1:2], 'little')
+
+class MultiZoneStateZone(Struct):
+  def __init__(
+    self,
+    count = 0,
+    index = 0,
+    color = None
+  ):
+    self.count = count
+    self.index = index
+    self.color = LightHsbk() if color is None else color
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.count, 1, 'little'),
+        int.to_bytes(self.index, 1, 'little'),
+        self.color.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.count = int.from_bytes(data[0:1], 'little')
+    self.index = int.from_bytes(data[1:2], 'little')
+    self.color.deserialize(data[2:10])
+
+class MultiZoneStateMultiZone(Struct):
+  def __init__(
+    self,
+    count = 0,
+    index = 0,
+    colors = None
+  ):
+    self.count = count
+    self.index = index
+    self.colors = [LightHsbk() for i in range(8)] if colors is None else colors
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.count, 1, 'little'),
+        int.to_bytes(self.index, 1, 'little'),
+        b''.join([i.serialize() for i in self.colors])
+      ]
+    )
+  def deserialize(self, data):
+    self.count = int.from_bytes(data[0:1], 'little')
+    self.index = int.from_bytes(data[1:2], 'little')
+    for i in range(8):
+      self.colors[i].deserialize(data[2 + i * 8:2 + i * 8 + 8])
+
+class MultiZoneSetEffect(Struct):
+  def __init__(
+    self,
+    settings = None
+  ):
+    self.settings = MultiZoneEffectSettings() if settings is None else settings
+  def serialize(self):
+    return b''.join(
+      [
+        self.settings.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.settings.deserialize(data[0:59])
+
+class MultiZoneStateEffect(Struct):
+  def __init__(
+    self,
+    settings = None
+  ):
+    self.settings = MultiZoneEffectSettings() if settings is None else settings
+  def serialize(self):
+    return b''.join(
+      [
+        self.settings.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.settings.deserialize(data[0:59])
+
+class MultiZoneExtendedSetColorZones(Struct):
+  def __init__(
+    self,
+    duration = 0,
+    apply = MultiZoneExtendedApplicationRequest.NO_APPLY,
+    index = 0,
+    colors_count = 0,
+    colors = None
+  ):
+    self.duration = duration
+    self.apply = apply
+    self.index = index
+    self.colors_count = colors_count
+    self.colors = [LightHsbk() for i in range(82)] if colors is None else colors
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.duration, 4, 'little'),
+        int.to_bytes(self.apply, 1, 'little'),
+        int.to_bytes(self.index, 2, 'little'),
+        int.to_bytes(self.colors_count, 1, 'little'),
+        b''.join([i.serialize() for i in self.colors])
+      ]
+    )
+  def deserialize(self, data):
+    self.duration = int.from_bytes(data[0:4], 'little')
+    self.apply = int.from_bytes(data[4:5], 'little')
+    self.index = int.from_bytes(data[5:7], 'little')
+    self.colors_count = int.from_bytes(data[7:8], 'little')
+    for i in range(82):
+      self.colors[i].deserialize(data[8 + i * 8:8 + i * 8 + 8])
+
+class MultiZoneExtendedStateMultiZone(Struct):
+  def __init__(
+    self,
+    count = 0,
+    index = 0,
+    colors_count = 0,
+    colors = None
+  ):
+    self.count = count
+    self.index = index
+    self.colors_count = colors_count
+    self.colors = [LightHsbk() for i in range(82)] if colors is None else colors
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.count, 2, 'little'),
+        int.to_bytes(self.index, 2, 'little'),
+        int.to_bytes(self.colors_count, 1, 'little'),
+        b''.join([i.serialize() for i in self.colors])
+      ]
+    )
+  def deserialize(self, data):
+    self.count = int.from_bytes(data[0:2], 'little')
+    self.index = int.from_bytes(data[2:4], 'little')
+    self.colors_count = int.from_bytes(data[4:5], 'little')
+    for i in range(82):
+      self.colors[i].deserialize(data[5 + i * 8:5 + i * 8 + 8])
+
+class RelayGetPower(Struct):
+  def __init__(
+    self,
+    relay_index = 0
+  ):
+    self.relay_index = relay_index
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.relay_index, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.relay_index = int.from_bytes(data[0:1], 'little')
+
+class RelaySetPower(Struct):
+  def __init__(
+    self,
+    relay_index = 0,
+    level = 0
+  ):
+    self.relay_index = relay_index
+    self.level = level
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.relay_index, 1, 'little'),
+        int.to_bytes(self.level, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.relay_index = int.from_bytes(data[0:1], 'little')
+    self.level = int.from_bytes(data[1:3], 'little')
+
+class RelayStatePower(Struct):
+  def __init__(
+    self,
+    relay_index = 0,
+    level = 0
+  ):
+    self.relay_index = relay_index
+    self.level = level
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.relay_index, 1, 'little'),
+        int.to_bytes(self.level, 2, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.relay_index = int.from_bytes(data[0:1], 'little')
+    self.level = int.from_bytes(data[1:3], 'little')
+
+class TileStateDeviceChain(Struct):
+  def __init__(
+    self,
+    start_index = 0,
+    tile_devices = None,
+    tile_devices_count = 0
+  ):
+    self.start_index = start_index
+    self.tile_devices = [TileStateDevice() for i in range(16)] if tile_devices is None else tile_devices
+    self.tile_devices_count = tile_devices_count
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.start_index, 1, 'little'),
+        b''.join([i.serialize() for i in self.tile_devices]),
+        int.to_bytes(self.tile_devices_count, 1, 'little')
+      ]
+    )
+  def deserialize(self, data):
+    self.start_index = int.from_bytes(data[0:1], 'little')
+    for i in range(16):
+      self.tile_devices[i].deserialize(data[1 + i * 55:1 + i * 55 + 55])
+    self.tile_devices_count = int.from_bytes(data[881:882], 'little')
+
+class TileSetUserPosition(Struct):
+  def __init__(
+    self,
+    tile_index = 0,
+    user_x = 0.,
+    user_y = 0.
+  ):
+    self.tile_index = tile_index
+    self.user_x = user_x
+    self.user_y = user_y
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.tile_index, 1, 'little'),
+        bytes(2),
+        struct.pack('<f', self.user_x),
+        struct.pack('<f', self.user_y)
+      ]
+    )
+  def deserialize(self, data):
+    self.tile_index = int.from_bytes(data[0:1], 'little')
+    self.user_x, = struct.unpack('<f', data[3:7])
+    self.user_y, = struct.unpack('<f', data[7:11])
+
+class TileGet64(Struct):
+  def __init__(
+    self,
+    tile_index = 0,
+    length = 0,
+    rect = None
+  ):
+    self.tile_index = tile_index
+    self.length = length
+    self.rect = TileBufferRect() if rect is None else rect
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.tile_index, 1, 'little'),
+        int.to_bytes(self.length, 1, 'little'),
+        self.rect.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.tile_index = int.from_bytes(data[0:1], 'little')
+    self.length = int.from_bytes(data[1:2], 'little')
+    self.rect.deserialize(data[2:6])
+
+class TileState64(Struct):
+  def __init__(
+    self,
+    tile_index = 0,
+    rect = None,
+    colors = None
+  ):
+    self.tile_index = tile_index
+    self.rect = TileBufferRect() if rect is None else rect
+    self.colors = [LightHsbk() for i in range(64)] if colors is None else colors
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.tile_index, 1, 'little'),
+        self.rect.serialize(),
+        b''.join([i.serialize() for i in self.colors])
+      ]
+    )
+  def deserialize(self, data):
+    self.tile_index = int.from_bytes(data[0:1], 'little')
+    self.rect.deserialize(data[1:5])
+    for i in range(64):
+      self.colors[i].deserialize(data[5 + i * 8:5 + i * 8 + 8])
+
+class TileSet64(Struct):
+  def __init__(
+    self,
+    tile_index = 0,
+    length = 0,
+    rect = None,
+    duration = 0,
+    colors = None
+  ):
+    self.tile_index = tile_index
+    self.length = length
+    self.rect = TileBufferRect() if rect is None else rect
+    self.duration = duration
+    self.colors = [LightHsbk() for i in range(64)] if colors is None else colors
+  def serialize(self):
+    return b''.join(
+      [
+        int.to_bytes(self.tile_index, 1, 'little'),
+        int.to_bytes(self.length, 1, 'little'),
+        self.rect.serialize(),
+        int.to_bytes(self.duration, 4, 'little'),
+        b''.join([i.serialize() for i in self.colors])
+      ]
+    )
+  def deserialize(self, data):
+    self.tile_index = int.from_bytes(data[0:1], 'little')
+    self.length = int.from_bytes(data[1:2], 'little')
+    self.rect.deserialize(data[2:6])
+    self.duration = int.from_bytes(data[6:10], 'little')
+    for i in range(64):
+      self.colors[i].deserialize(data[10 + i * 8:10 + i * 8 + 8])
+
+class TileGetEffect(Struct):
+  def __init__(
+    self
+  ):
+    pass
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        bytes(1)
+      ]
+    )
+  def deserialize(self, data):
+    pass
+
+class TileSetEffect(Struct):
+  def __init__(
+    self,
+    settings = None
+  ):
+    self.settings = TileEffectSettings() if settings is None else settings
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        bytes(1),
+        self.settings.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.settings.deserialize(data[2:188])
+
+class TileStateEffect(Struct):
+  def __init__(
+    self,
+    settings = None
+  ):
+    self.settings = TileEffectSettings() if settings is None else settings
+  def serialize(self):
+    return b''.join(
+      [
+        bytes(1),
+        self.settings.serialize()
+      ]
+    )
+  def deserialize(self, data):
+    self.settings.deserialize(data[1:187])
+
+class PacketType(Enum):
+  DEVICE_GET_SERVICE = 2
+  DEVICE_STATE_SERVICE = 3
+  DEVICE_GET_HOST_INFO = 12
+  DEVICE_STATE_HOST_INFO = 13
+  DEVICE_GET_HOST_FIRMWARE = 14
+  DEVICE_STATE_HOST_FIRMWARE = 15
+  DEVICE_GET_WIFI_INFO = 16
+  DEVICE_STATE_WIFI_INFO = 17
+  DEVICE_GET_WIFI_FIRMWARE = 18
+  DEVICE_STATE_WIFI_FIRMWARE = 19
+  DEVICE_GET_POWER = 20
+  DEVICE_SET_POWER = 21
+  DEVICE_STATE_POWER = 22
+  DEVICE_GET_LABEL = 23
+  DEVICE_SET_LABEL = 24
+  DEVICE_STATE_LABEL = 25
+  DEVICE_GET_VERSION = 32
+  DEVICE_STATE_VERSION = 33
+  DEVICE_GET_INFO = 34
+  DEVICE_STATE_INFO = 35
+  DEVICE_ACKNOWLEDGEMENT = 45
+  DEVICE_GET_LOCATION = 48
+  DEVICE_SET_LOCATION = 49
+  DEVICE_STATE_LOCATION = 50
+  DEVICE_GET_GROUP = 51
+  DEVICE_SET_GROUP = 52
+  DEVICE_STATE_GROUP = 53
+  DEVICE_ECHO_REQUEST = 58
+  DEVICE_ECHO_RESPONSE = 59
+  DEVICE_STATE_UNHANDLED = 223
+  LIGHT_GET = 101
+  LIGHT_SET_COLOR = 102
+  LIGHT_SET_WAVEFORM_OPTIONAL = 119
+  LIGHT_SET_WAVEFORM = 103
+  LIGHT_GET_POWER = 116
+  LIGHT_SET_POWER = 117
+  LIGHT_STATE_POWER = 118
+  LIGHT_STATE = 107
+  LIGHT_GET_INFRARED = 120
+  LIGHT_STATE_INFRARED = 121
+  LIGHT_SET_INFRARED = 122
+  MULTI_ZONE_SET_COLOR_ZONES = 501
+  MULTI_ZONE_GET_COLOR_ZONES = 502
+  MULTI_ZONE_STATE_ZONE = 503
+  MULTI_ZONE_STATE_MULTI_ZONE = 506
+  MULTI_ZONE_GET_EFFECT = 507
+  MULTI_ZONE_SET_EFFECT = 508
+  MULTI_ZONE_STATE_EFFECT = 509
+  MULTI_ZONE_EXTENDED_SET_COLOR_ZONES = 510
+  MULTI_ZONE_EXTENDED_GET_COLOR_ZONES = 511
+  MULTI_ZONE_EXTENDED_STATE_MULTI_ZONE = 512
+  RELAY_GET_POWER = 816
+  RELAY_SET_POWER = 817
+  RELAY_STATE_POWER = 818
+  TILE_GET_DEVICE_CHAIN = 701
+  TILE_STATE_DEVICE_CHAIN = 702
+  TILE_SET_USER_POSITION = 703
+  TILE_GET64 = 707
+  TILE_STATE64 = 711
+  TILE_SET64 = 715
+  TILE_GET_EFFECT = 718
+  TILE_SET_EFFECT = 719
+  TILE_STATE_EFFECT = 720
+  names = {
+    2: 'DEVICE_GET_SERVICE',
+    3: 'DEVICE_STATE_SERVICE',
+    12: 'DEVICE_GET_HOST_INFO',
+    13: 'DEVICE_STATE_HOST_INFO',
+    14: 'DEVICE_GET_HOST_FIRMWARE',
+    15: 'DEVICE_STATE_HOST_FIRMWARE',
+    16: 'DEVICE_GET_WIFI_INFO',
+    17: 'DEVICE_STATE_WIFI_INFO',
+    18: 'DEVICE_GET_WIFI_FIRMWARE',
+    19: 'DEVICE_STATE_WIFI_FIRMWARE',
+    20: 'DEVICE_GET_POWER',
+    21: 'DEVICE_SET_POWER',
+    22: 'DEVICE_STATE_POWER',
+    23: 'DEVICE_GET_LABEL',
+    24: 'DEVICE_SET_LABEL',
+    25: 'DEVICE_STATE_LABEL',
+    32: 'DEVICE_GET_VERSION',
+    33: 'DEVICE_STATE_VERSION',
+    34: 'DEVICE_GET_INFO',
+    35: 'DEVICE_STATE_INFO',
+    45: 'DEVICE_ACKNOWLEDGEMENT',
+    48: 'DEVICE_GET_LOCATION',
+    49: 'DEVICE_SET_LOCATION',
+    50: 'DEVICE_STATE_LOCATION',
+    51: 'DEVICE_GET_GROUP',
+    52: 'DEVICE_SET_GROUP',
+    53: 'DEVICE_STATE_GROUP',
+    58: 'DEVICE_ECHO_REQUEST',
+    59: 'DEVICE_ECHO_RESPONSE',
+    223: 'DEVICE_STATE_UNHANDLED',
+    101: 'LIGHT_GET',
+    102: 'LIGHT_SET_COLOR',
+    119: 'LIGHT_SET_WAVEFORM_OPTIONAL',
+    103: 'LIGHT_SET_WAVEFORM',
+    116: 'LIGHT_GET_POWER',
+    117: 'LIGHT_SET_POWER',
+    118: 'LIGHT_STATE_POWER',
+    107: 'LIGHT_STATE',
+    120: 'LIGHT_GET_INFRARED',
+    121: 'LIGHT_STATE_INFRARED',
+    122: 'LIGHT_SET_INFRARED',
+    501: 'MULTI_ZONE_SET_COLOR_ZONES',
+    502: 'MULTI_ZONE_GET_COLOR_ZONES',
+    503: 'MULTI_ZONE_STATE_ZONE',
+    506: 'MULTI_ZONE_STATE_MULTI_ZONE',
+    507: 'MULTI_ZONE_GET_EFFECT',
+    508: 'MULTI_ZONE_SET_EFFECT',
+    509: 'MULTI_ZONE_STATE_EFFECT',
+    510: 'MULTI_ZONE_EXTENDED_SET_COLOR_ZONES',
+    511: 'MULTI_ZONE_EXTENDED_GET_COLOR_ZONES',
+    512: 'MULTI_ZONE_EXTENDED_STATE_MULTI_ZONE',
+    816: 'RELAY_GET_POWER',
+    817: 'RELAY_SET_POWER',
+    818: 'RELAY_STATE_POWER',
+    701: 'TILE_GET_DEVICE_CHAIN',
+    702: 'TILE_STATE_DEVICE_CHAIN',
+    703: 'TILE_SET_USER_POSITION',
+    707: 'TILE_GET64',
+    711: 'TILE_STATE64',
+    715: 'TILE_SET64',
+    718: 'TILE_GET_EFFECT',
+    719: 'TILE_SET_EFFECT',
+    720: 'TILE_STATE_EFFECT'
+  }
+
+packet_type_to_type = {
+  PacketType.DEVICE_STATE_SERVICE: DeviceStateService,
+  PacketType.DEVICE_STATE_HOST_INFO: DeviceStateHostInfo,
+  PacketType.DEVICE_STATE_HOST_FIRMWARE: DeviceStateHostFirmware,
+  PacketType.DEVICE_STATE_WIFI_INFO: DeviceStateWifiInfo,
+  PacketType.DEVICE_STATE_WIFI_FIRMWARE: DeviceStateWifiFirmware,
+  PacketType.DEVICE_SET_POWER: DeviceSetPower,
+  PacketType.DEVICE_STATE_POWER: DeviceStatePower,
+  PacketType.DEVICE_SET_LABEL: DeviceSetLabel,
+  PacketType.DEVICE_STATE_LABEL: DeviceStateLabel,
+  PacketType.DEVICE_STATE_VERSION: DeviceStateVersion,
+  PacketType.DEVICE_STATE_INFO: DeviceStateInfo,
+  PacketType.DEVICE_SET_LOCATION: DeviceSetLocation,
+  PacketType.DEVICE_STATE_LOCATION: DeviceStateLocation,
+  PacketType.DEVICE_SET_GROUP: DeviceSetGroup,
+  PacketType.DEVICE_STATE_GROUP: DeviceStateGroup,
+  PacketType.DEVICE_ECHO_REQUEST: DeviceEchoRequest,
+  PacketType.DEVICE_ECHO_RESPONSE: DeviceEchoResponse,
+  PacketType.DEVICE_STATE_UNHANDLED: DeviceStateUnhandled,
+  PacketType.LIGHT_SET_COLOR: LightSetColor,
+  PacketType.LIGHT_SET_WAVEFORM_OPTIONAL: LightSetWaveformOptional,
+  PacketType.LIGHT_SET_WAVEFORM: LightSetWaveform,
+  PacketType.LIGHT_SET_POWER: LightSetPower,
+  PacketType.LIGHT_STATE_POWER: LightStatePower,
+  PacketType.LIGHT_STATE: LightState,
+  PacketType.LIGHT_STATE_INFRARED: LightStateInfrared,
+  PacketType.LIGHT_SET_INFRARED: LightSetInfrared,
+  PacketType.MULTI_ZONE_SET_COLOR_ZONES: MultiZoneSetColorZones,
+  PacketType.MULTI_ZONE_GET_COLOR_ZONES: MultiZoneGetColorZones,
+  PacketType.MULTI_ZONE_STATE_ZONE: MultiZoneStateZone,
+  PacketType.MULTI_ZONE_STATE_MULTI_ZONE: MultiZoneStateMultiZone,
+  PacketType.MULTI_ZONE_SET_EFFECT: MultiZoneSetEffect,
+  PacketType.MULTI_ZONE_STATE_EFFECT: MultiZoneStateEffect,
+  PacketType.MULTI_ZONE_EXTENDED_SET_COLOR_ZONES: MultiZoneExtendedSetColorZones,
+  PacketType.MULTI_ZONE_EXTENDED_STATE_MULTI_ZONE: MultiZoneExtendedStateMultiZone,
+  PacketType.RELAY_GET_POWER: RelayGetPower,
+  PacketType.RELAY_SET_POWER: RelaySetPower,
+  PacketType.RELAY_STATE_POWER: RelayStatePower,
+  PacketType.TILE_STATE_DEVICE_CHAIN: TileStateDeviceChain,
+  PacketType.TILE_SET_USER_POSITION: TileSetUserPosition,
+  PacketType.TILE_GET64: TileGet64,
+  PacketType.TILE_STATE64: TileState64,
+  PacketType.TILE_SET64: TileSet64,
+  PacketType.TILE_GET_EFFECT: TileGetEffect,
+  PacketType.TILE_SET_EFFECT: TileSetEffect,
+  PacketType.TILE_STATE_EFFECT: TileStateEffect
+}
+
+# entry is (payload type, payload size in bytes) or None if not a packet type
+dispatch = [None] * 819
+dispatch[PacketType.DEVICE_GET_SERVICE] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_SERVICE] = (DeviceStateService, 5)
+dispatch[PacketType.DEVICE_GET_HOST_INFO] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_HOST_INFO] = (DeviceStateHostInfo, 14)
+dispatch[PacketType.DEVICE_GET_HOST_FIRMWARE] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_HOST_FIRMWARE] = (DeviceStateHostFirmware, 20)
+dispatch[PacketType.DEVICE_GET_WIFI_INFO] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_WIFI_INFO] = (DeviceStateWifiInfo, 14)
+dispatch[PacketType.DEVICE_GET_WIFI_FIRMWARE] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_WIFI_FIRMWARE] = (DeviceStateWifiFirmware, 20)
+dispatch[PacketType.DEVICE_GET_POWER] = (Empty, 0)
+dispatch[PacketType.DEVICE_SET_POWER] = (DeviceSetPower, 2)
+dispatch[PacketType.DEVICE_STATE_POWER] = (DeviceStatePower, 2)
+dispatch[PacketType.DEVICE_GET_LABEL] = (Empty, 0)
+dispatch[PacketType.DEVICE_SET_LABEL] = (DeviceSetLabel, 32)
+dispatch[PacketType.DEVICE_STATE_LABEL] = (DeviceStateLabel, 32)
+dispatch[PacketType.DEVICE_GET_VERSION] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_VERSION] = (DeviceStateVersion, 12)
+dispatch[PacketType.DEVICE_GET_INFO] = (Empty, 0)
+dispatch[PacketType.DEVICE_STATE_INFO] = (DeviceStateInfo, 24)
+dispatch[PacketType.DEVICE_ACKNOWLEDGEMENT] = (Empty, 0)
+dispatch[PacketType.DEVICE_GET_LOCATION] = (Empty, 0)
+dispatch[PacketType.DEVICE_SET_LOCATION] = (DeviceSetLocation, 56)
+dispatch[PacketType.DEVICE_STATE_LOCATION] = (DeviceStateLocation, 56)
+dispatch[PacketType.DEVICE_GET_GROUP] = (Empty, 0)
+dispatch[PacketType.DEVICE_SET_GROUP] = (DeviceSetGroup, 56)
+dispatch[PacketType.DEVICE_STATE_GROUP] = (DeviceStateGroup, 56)
+dispatch[PacketType.DEVICE_ECHO_REQUEST] = (DeviceEchoRequest, 64)
+dispatch[PacketType.DEVICE_ECHO_RESPONSE] = (DeviceEchoResponse, 64)
+dispatch[PacketType.DEVICE_STATE_UNHANDLED] = (DeviceStateUnhandled, 2)
+dispatch[PacketType.LIGHT_GET] = (Empty, 0)
+dispatch[PacketType.LIGHT_SET_COLOR] = (LightSetColor, 13)
+dispatch[PacketType.LIGHT_SET_WAVEFORM_OPTIONAL] = (LightSetWaveformOptional, 25)
+dispatch[PacketType.LIGHT_SET_WAVEFORM] = (LightSetWaveform, 21)
+dispatch[PacketType.LIGHT_GET_POWER] = (Empty, 0)
+dispatch[PacketType.LIGHT_SET_POWER] = (LightSetPower, 6)
+dispatch[PacketType.LIGHT_STATE_POWER] = (LightStatePower, 2)
+dispatch[PacketType.LIGHT_STATE] = (LightState, 52)
+dispatch[PacketType.LIGHT_GET_INFRARED] = (Empty, 0)
+dispatch[PacketType.LIGHT_STATE_INFRARED] = (LightStateInfrared, 2)
+dispatch[PacketType.LIGHT_SET_INFRARED] = (LightSetInfrared, 2)
+dispatch[PacketType.MULTI_ZONE_SET_COLOR_ZONES] = (MultiZoneSetColorZones, 15)
+dispatch[PacketType.MULTI_ZONE_GET_COLOR_ZONES] = (MultiZoneGetColorZones, 2)
+dispatch[PacketType.MULTI_ZONE_STATE_ZONE] = (MultiZoneStateZone, 10)
+dispatch[PacketType.MULTI_ZONE_STATE_MULTI_ZONE] = (MultiZoneStateMultiZone, 66)
+dispatch[PacketType.MULTI_ZONE_GET_EFFECT] = (Empty, 0)
+dispatch[PacketType.MULTI_ZONE_SET_EFFECT] = (MultiZoneSetEffect, 59)
+dispatch[PacketType.MULTI_ZONE_STATE_EFFECT] = (MultiZoneStateEffect, 59)
+dispatch[PacketType.MULTI_ZONE_EXTENDED_SET_COLOR_ZONES] = (MultiZoneExtendedSetColorZones, 664)
+dispatch[PacketType.MULTI_ZONE_EXTENDED_GET_COLOR_ZONES] = (Empty, 0)
+dispatch[PacketType.MULTI_ZONE_EXTENDED_STATE_MULTI_ZONE] = (MultiZoneExtendedStateMultiZone, 661)
+dispatch[PacketType.RELAY_GET_POWER] = (RelayGetPower, 1)
+dispatch[PacketType.RELAY_SET_POWER] = (RelaySetPower, 3)
+dispatch[PacketType.RELAY_STATE_POWER] = (RelayStatePower, 3)
+dispatch[PacketType.TILE_GET_DEVICE_CHAIN] = (Empty, 0)
+dispatch[PacketType.TILE_STATE_DEVICE_CHAIN] = (TileStateDeviceChain, 882)
+dispatch[PacketType.TILE_SET_USER_POSITION] = (TileSetUserPosition, 11)
+dispatch[PacketType.TILE_GET64] = (TileGet64, 6)
+dispatch[PacketType.TILE_STATE64] = (TileState64, 517)
+dispatch[PacketType.TILE_SET64] = (TileSet64, 522)
+dispatch[PacketType.TILE_GET_EFFECT] = (TileGetEffect, 2)
+dispatch[PacketType.TILE_SET_EFFECT] = (TileSetEffect, 188)
+dispatch[PacketType.TILE_STATE_EFFECT] = (TileStateEffect, 187)
+
+LightHsbk.dtype = numpy.dtype(
+  {
+    'names': ['hue', 'saturation', 'brightness', 'kelvin'],
+    'formats': ['<u2', '<u2', '<u2', '<u2'],
+    'offsets': [0, 2, 4, 6],
+    'itemsize': 8
+  }
+)
+
+MultiZoneEffectParameter.dtype = numpy.dtype(
+  {
+    'names': ['parameter0', 'parameter1', 'parameter2', 'parameter3', 'parameter4', 'parameter5', 'parameter6', 'parameter7'],
+    'formats': ['<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4'],
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 28],
+    'itemsize': 32
+  }
+)
+
+MultiZoneEffectSettings.dtype = numpy.dtype(
+  {
+    'names': ['instanceid', 'type', 'speed', 'duration', 'parameter'],
+    'formats': ['<u4', '<u1', '<u4', '<u8', MultiZoneEffectParameter.dtype],
+    'offsets': [0, 4, 7, 11, 27],
+    'itemsize': 59
+  }
+)
+
+TileAccelMeas.dtype = numpy.dtype(
+  {
+    'names': ['x', 'y', 'z'],
+    'formats': ['<i2', '<i2', '<i2'],
+    'offsets': [0, 2, 4],
+    'itemsize': 6
+  }
+)
+
+DeviceStateVersion.dtype = numpy.dtype(
+  {
+    'names': ['vendor', 'product'],
+    'formats': ['<u4', '<u4'],
+    'offsets': [0, 4],
+    'itemsize': 12
+  }
+)
+
+DeviceStateHostFirmware.dtype = numpy.dtype(
+  {
+    'names': ['build', 'version_minor', 'version_major'],
+    'formats': ['<u8', '<u2', '<u2'],
+    'offsets': [0, 16, 18],
+    'itemsize': 20
+  }
+)
+
+TileStateDevice.dtype = numpy.dtype(
+  {
+    'names': ['accel_meas', 'user_x', 'user_y', 'width', 'height', 'device_version', 'firmware'],
+    'formats': [TileAccelMeas.dtype, '<f4', '<f4', '<u1', '<u1', DeviceStateVersion.dtype, DeviceStateHostFirmware.dtype],
+    'offsets': [0, 8, 12, 16, 17, 19, 31],
+    'itemsize': 55
+  }
+)
+
+TileBufferRect.dtype = numpy.dtype(
+  {
+    'names': ['x', 'y', 'width'],
+    'formats': ['<u1', '<u1', '<u1'],
+    'offsets': [1, 2, 3],
+    'itemsize': 4
+  }
+)
+
+TileEffectParameter.dtype = numpy.dtype(
+  {
+    'names': ['parameter0', 'parameter1', 'parameter2', 'parameter3', 'parameter4', 'parameter5', 'parameter6', 'parameter7'],
+    'formats': ['<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4'],
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 28],
+    'itemsize': 32
+  }
+)
+
+TileEffectSettings.dtype = numpy.dtype(
+  {
+    'names': ['instanceid', 'type', 'speed', 'duration', 'parameter', 'palette_count', 'palette'],
+    'formats': ['<u4', '<u1', '<u4', '<u8', TileEffectParameter.dtype, '<u1', (LightHsbk.dtype, (16,))],
+    'offsets': [0, 4, 5, 9, 25, 57, 58],
+    'itemsize': 186
+  }
+)
+
+DeviceStateService.dtype = numpy.dtype(
+  {
+    'names': ['service', 'port'],
+    'formats': ['<u1', '<u4'],
+    'offsets': [0, 1],
+    'itemsize': 5
+  }
+)
+
+DeviceStateHostInfo.dtype = numpy.dtype(
+  {
+    'names': ['signal', 'tx', 'rx'],
+    'formats': ['<f4', '<u4', '<u4'],
+    'offsets': [0, 4, 8],
+    'itemsize': 14
+  }
+)
+
+DeviceStateWifiInfo.dtype = numpy.dtype(
+  {
+    'names': ['signal', 'tx', 'rx'],
+    'formats': ['<f4', '<u4', '<u4'],
+    'offsets': [0, 4, 8],
+    'itemsize': 14
+  }
+)
+
+DeviceStateWifiFirmware.dtype = numpy.dtype(
+  {
+    'names': ['build', 'version_minor', 'version_major'],
+    'formats': ['<u8', '<u2', '<u2'],
+    'offsets': [0, 16, 18],
+    'itemsize': 20
+  }
+)
+
+DeviceSetPower.dtype = numpy.dtype(
+  {
+    'names': ['level'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+DeviceStatePower.dtype = numpy.dtype(
+  {
+    'names': ['level'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+DeviceSetLabel.dtype = numpy.dtype(
+  {
+    'names': ['label'],
+    'formats': ['S32'],
+    'offsets': [0],
+    'itemsize': 32
+  }
+)
+
+DeviceStateLabel.dtype = numpy.dtype(
+  {
+    'names': ['label'],
+    'formats': ['S32'],
+    'offsets': [0],
+    'itemsize': 32
+  }
+)
+
+DeviceStateInfo.dtype = numpy.dtype(
+  {
+    'names': ['time', 'uptime', 'downtime'],
+    'formats': ['<u8', '<u8', '<u8'],
+    'offsets': [0, 8, 16],
+    'itemsize': 24
+  }
+)
+
+DeviceSetLocation.dtype = numpy.dtype(
+  {
+    'names': ['location', 'label', 'updated_at'],
+    'formats': ['S16', 'S32', '<u8'],
+    'offsets': [0, 16, 48],
+    'itemsize': 56
+  }
+)
+
+DeviceStateLocation.dtype = numpy.dtype(
+  {
+    'names': ['location', 'label', 'updated_at'],
+    'formats': ['S16', 'S32', '<u8'],
+    'offsets': [0, 16, 48],
+    'itemsize': 56
+  }
+)
+
+DeviceSetGroup.dtype = numpy.dtype(
+  {
+    'names': ['group', 'label', 'updated_at'],
+    'formats': ['S16', 'S32', '<u8'],
+    'offsets': [0, 16, 48],
+    'itemsize': 56
+  }
+)
+
+DeviceStateGroup.dtype = numpy.dtype(
+  {
+    'names': ['group', 'label', 'updated_at'],
+    'formats': ['S16', 'S32', '<u8'],
+    'offsets': [0, 16, 48],
+    'itemsize': 56
+  }
+)
+
+DeviceEchoRequest.dtype = numpy.dtype(
+  {
+    'names': ['payload'],
+    'formats': ['S64'],
+    'offsets': [0],
+    'itemsize': 64
+  }
+)
+
+DeviceEchoResponse.dtype = numpy.dtype(
+  {
+    'names': ['payload'],
+    'formats': ['S64'],
+    'offsets': [0],
+    'itemsize': 64
+  }
+)
+
+DeviceStateUnhandled.dtype = numpy.dtype(
+  {
+    'names': ['unhandled_type'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+LightSetColor.dtype = numpy.dtype(
+  {
+    'names': ['color', 'duration'],
+    'formats': [LightHsbk.dtype, '<u4'],
+    'offsets': [1, 9],
+    'itemsize': 13
+  }
+)
+
+LightSetWaveformOptional.dtype = numpy.dtype(
+  {
+    'names': ['transient', 'color', 'period', 'cycles', 'skew_ratio', 'waveform', 'set_hue', 'set_saturation', 'set_brightness', 'set_kelvin'],
+    'formats': ['?', LightHsbk.dtype, '<u4', '<f4', '<i2', '<u1', '?', '?', '?', '?'],
+    'offsets': [1, 2, 10, 14, 18, 20, 21, 22, 23, 24],
+    'itemsize': 25
+  }
+)
+
+LightSetWaveform.dtype = numpy.dtype(
+  {
+    'names': ['transient', 'color', 'period', 'cycles', 'skew_ratio', 'waveform'],
+    'formats': ['?', LightHsbk.dtype, '<u4', '<f4', '<i2', '<u1'],
+    'offsets': [1, 2, 10, 14, 18, 20],
+    'itemsize': 21
+  }
+)
+
+LightSetPower.dtype = numpy.dtype(
+  {
+    'names': ['level', 'duration'],
+    'formats': ['<u2', '<u4'],
+    'offsets': [0, 2],
+    'itemsize': 6
+  }
+)
+
+LightStatePower.dtype = numpy.dtype(
+  {
+    'names': ['level'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+LightState.dtype = numpy.dtype(
+  {
+    'names': ['color', 'power', 'label'],
+    'formats': [LightHsbk.dtype, '<u2', 'S32'],
+    'offsets': [0, 10, 12],
+    'itemsize': 52
+  }
+)
+
+LightStateInfrared.dtype = numpy.dtype(
+  {
+    'names': ['brightness'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+LightSetInfrared.dtype = numpy.dtype(
+  {
+    'names': ['brightness'],
+    'formats': ['<u2'],
+    'offsets': [0],
+    'itemsize': 2
+  }
+)
+
+MultiZoneSetColorZones.dtype = numpy.dtype(
+  {
+    'names': ['start_index', 'end_index', 'color', 'duration', 'apply'],
+    'formats': ['<u1', '<u1', LightHsbk.dtype, '<u4', '<u1'],
+    'offsets': [0, 1, 2, 10, 14],
+    'itemsize': 15
+  }
+)
+
+MultiZoneGetColorZones.dtype = numpy.dtype(
+  {
+    'names': ['start_index', 'end_index'],
+    'formats': ['<u1', '<u1'],
+    'offsets': [0, 1],
+    'itemsize': 2
+  }
+)
+
+MultiZoneStateZone.dtype = numpy.dtype(
+  {
+    'names': ['count', 'index', 'color'],
+    'formats': ['<u1', '<u1', LightHsbk.dtype],
+    'offsets': [0, 1, 2],
+    'itemsize': 10
+  }
+)
+
+MultiZoneStateMultiZone.dtype = numpy.dtype(
+  {
+    'names': ['count', 'index', 'colors'],
+    'formats': ['<u1', '<u1', (LightHsbk.dtype, (8,))],
+    'offsets': [0, 1, 2],
+    'itemsize': 66
+  }
+)
+
+MultiZoneSetEffect.dtype = numpy.dtype(
+  {
+    'names': ['settings'],
+    'formats': [MultiZoneEffectSettings.dtype],
+    'offsets': [0],
+    'itemsize': 59
+  }
+)
+
+MultiZoneStateEffect.dtype = numpy.dtype(
+  {
+    'names': ['settings'],
+    'formats': [MultiZoneEffectSettings.dtype],
+    'offsets': [0],
+    'itemsize': 59
+  }
+)
+
+MultiZoneExtendedSetColorZones.dtype = numpy.dtype(
+  {
+    'names': ['duration', 'apply', 'index', 'colors_count', 'colors'],
+    'formats': ['<u4', '<u1', '<u2', '<u1', (LightHsbk.dtype, (82,))],
+    'offsets': [0, 4, 5, 7, 8],
+    'itemsize': 664
+  }
+)
+
+MultiZoneExtendedStateMultiZone.dtype = numpy.dtype(
+  {
+    'names': ['count', 'index', 'colors_count', 'colors'],
+    'formats': ['<u2', '<u2', '<u1', (LightHsbk.dtype, (82,))],
+    'offsets': [0, 2, 4, 5],
+    'itemsize': 661
+  }
+)
+
+RelayGetPower.dtype = numpy.dtype(
+  {
+    'names': ['relay_index'],
+    'formats': ['<u1'],
+    'offsets': [0],
+    'itemsize': 1
+  }
+)
+
+RelaySetPower.dtype = numpy.dtype(
+  {
+    'names': ['relay_index', 'level'],
+    'formats': ['<u1', '<u2'],
+    'offsets': [0, 1],
+    'itemsize': 3
+  }
+)
+
+RelayStatePower.dtype = numpy.dtype(
+  {
+    'names': ['relay_index', 'level'],
+    'formats': ['<u1', '<u2'],
+    'offsets': [0, 1],
+    'itemsize': 3
+  }
+)
+
+TileStateDeviceChain.dtype = numpy.dtype(
+  {
+    'names': ['start_index', 'tile_devices', 'tile_devices_count'],
+    'formats': ['<u1', (TileStateDevice.dtype, (16,)), '<u1'],
+    'offsets': [0, 1, 881],
+    'itemsize': 882
+  }
+)
+
+TileSetUserPosition.dtype = numpy.dtype(
+  {
+    'names': ['tile_index', 'user_x', 'user_y'],
+    'formats': ['<u1', '<f4', '<f4'],
+    'offsets': [0, 3, 7],
+    'itemsize': 11
+  }
+)
+
+TileGet64.dtype = numpy.dtype(
+  {
+    'names': ['tile_index', 'length', 'rect'],
+    'formats': ['<u1', '<u1', TileBufferRect.dtype],
+    'offsets': [0, 1, 2],
+    'itemsize': 6
+  }
+)
+
+TileState64.dtype = numpy.dtype(
+  {
+    'names': ['tile_index', 'rect', 'colors'],
+    'formats': ['<u1', TileBufferRect.dtype, (LightHsbk.dtype, (64,))],
+    'offsets': [0, 1, 5],
+    'itemsize': 517
+  }
+)
+
+TileSet64.dtype = numpy.dtype(
+  {
+    'names': ['tile_index', 'length', 'rect', 'duration', 'colors'],
+    'formats': ['<u1', '<u1', TileBufferRect.dtype, '<u4', (LightHsbk.dtype, (64,))],
+    'offsets': [0, 1, 2, 6, 10],
+    'itemsize': 522
+  }
+)
+
+TileGetEffect.dtype = numpy.dtype(
+  {
+    'names': [],
+    'formats': [],
+    'offsets': [],
+    'itemsize': 2
+  }
+)
+
+TileSetEffect.dtype = numpy.dtype(
+  {
+    'names': ['settings'],
+    'formats': [TileEffectSettings.dtype],
+    'offsets': [2],
+    'itemsize': 188
+  }
+)
+
+TileStateEffect.dtype = numpy.dtype(
+  {
+    'names': ['settings'],
+    'formats': [TileEffectSettings.dtype],
+    'offsets': [1],
+    'itemsize': 187
+  }
+)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import gc
+import protocol
+import sys
+import time
+from capture import CaptureReader, DIRECTION_RX, DIRECTION_TX
+from udp import is_response_data
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+if len(sys.argv) < 2:
+  print(f'usage: {sys.argv[0]:s} capture_in [repeats]')
+  print('capture_in = name of capture file to read (e.g. from udp.py --capture)')
+  print('repeats = number of passes over the received frames (default 100)')
+  print('runs received frames through the receive filter and then decodes')
+  print('them with Frame.deserialize, as AsyncUDP does, reports frames per')
+  print('second and memory blocks allocated per frame (that are still held')
+  print('while the decoded frame is alive)')
+  sys.exit(EXIT_FAILURE)
+capture_in = sys.argv[1]
+repeats = int(sys.argv[2]) if len(sys.argv) >= 3 else 100
+
+# group the received datagrams by packet type, and find our source from the
+# transmitted datagrams so that the receive filter passes our responses (if
+# there are none, it rejects every frame before decoding, only the filter
+# is then measured)
+source = 0
+datagrams = {}
+with open(capture_in, 'rb') as fin:
+  for timestamp, direction, addr, data in CaptureReader(fin):
+    frame = protocol.Frame()
+    frame.deserialize(data)
+    if direction == DIRECTION_TX:
+      source = frame.frame_header.source
+    elif direction == DIRECTION_RX:
+      datagrams.setdefault(frame.protocol_header.type, []).append(data)
+
+# like AsyncUDP.datagram_received(), each datagram is a memoryview that is
+# filtered before it is decoded
+def bench(datagrams):
+  views = [memoryview(data) for data in datagrams]
+  t0 = time.perf_counter()
+  for i in range(repeats):
+    for view in views:
+      if is_response_data(view, source):
+        frame = protocol.Frame()
+        frame.deserialize(view)
+  elapsed = time.perf_counter() - t0
+
+  frames = [None] * len(datagrams)
+  gc.collect()
+  blocks = sys.getallocatedblocks()
+  for i in range(len(datagrams)):
+    frame = protocol.Frame()
+    frame.deserialize(datagrams[i])
+    frames[i] = frame
+  blocks = sys.getallocatedblocks() - blocks
+  del frames
+
+  return (
+    len(datagrams) * repeats / elapsed,
+    blocks / len(datagrams)
+  )
+
+print(f'{"type":>30s} {"count":>8s} {"frames/s":>12s} {"blocks/frame":>12s}')
+all_datagrams = []
+for _type, type_datagrams in sorted(datagrams.items()):
+  fps, blocks = bench(type_datagrams)
+  print(
+    f'{protocol.PacketType.names.get(_type, str(_type)):>30s} {len(type_datagrams):8d} {fps:12.1f} {blocks:12.1f}'
+  )
+  all_datagrams.extend(type_datagrams)
+if len(all_datagrams):
+  fps, blocks = bench(all_datagrams)
+  print(f'{"ALL":>30s} {len(all_datagrams):8d} {fps:12.1f} {blocks:12.1f}')
@@ -0,0 +1,57 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# retransmission timeout estimation as for TCP (RFC 6298), the smoothed
+# round trip time and its variance are updated by each sample, and the
+# timeout is then the smoothed round trip time plus 4 times the variance
+
+RTT_ALPHA = 1. / 8.
+RTT_BETA = 1. / 4.
+RTT_K = 4.
+
+# limits of timeout in seconds, the minimum allows for device processing
+# time jitter on very close devices, the maximum limits the backoff
+RTO_MIN = .02
+RTO_MAX = 1.
+
+class RTTEstimator:
+  def __init__(self):
+    self.srtt = None # None until the first sample
+    self.rttvar = None
+    self.rto = None
+
+  # should only be called with the round trip time of a frame that was sent
+  # once, since a response to a resent frame is ambiguous (Karn's algorithm)
+  def sample(self, rtt):
+    if self.srtt is None:
+      self.srtt = rtt
+      self.rttvar = rtt * .5
+    else:
+      self.rttvar = (
+        (1. - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+      )
+      self.srtt = (1. - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+    self.rto = min(max(self.srtt + RTT_K * self.rttvar, RTO_MIN), RTO_MAX)
+
+  # returns timeout for the given try (0 for first transmission), doubling
+  # on each resend, default is the initial timeout if there are no samples
+  def timeout(self, i, default):
+    rto = default if self.rto is None else self.rto
+    return min(rto * (1 << i), RTO_MAX)
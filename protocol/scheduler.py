@@ -0,0 +1,133 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import heapq
+import itertools
+import time
+
+# timers due within this of the current time are run (as asyncio does)
+CLOCK_RESOLUTION = time.get_clock_info('monotonic').resolution
+
+# once this many timers are cancelled, and they are at least half of the
+# heap, the heap is rebuilt without them (most retransmission timers are
+# cancelled, since most frames are answered before they need resending)
+PURGE_CANCELLED = 100
+
+class Timer:
+  __slots__ = ['scheduler', 'callback', 'args']
+
+  def __init__(self, scheduler, callback, args):
+    self.scheduler = scheduler
+    self.callback = callback # None once run or cancelled
+    self.args = args
+
+  def cancel(self):
+    if self.callback is not None:
+      self.callback = None
+      self.args = None
+      self.scheduler.n_cancelled += 1
+
+# runs callbacks at deadlines on an asyncio event loop, keeping a heap of
+# (deadline, counter, Timer) and a single loop timer for the earliest one,
+# so that thousands of retransmission and rate limit deadlines cost
+# O(log n) to add, O(1) to cancel (they are skipped when they come up) and
+# nothing while they are not due, and the loop sleeps until the next one
+class Scheduler:
+  def __init__(self, loop):
+    self.loop = loop
+    self.heap = []
+    self.counter = itertools.count() # breaks ties, so Timers not compared
+    self.n_cancelled = 0
+    self.handle = None # asyncio.TimerHandle to run due timers
+    self.deadline = None # when handle is due
+
+  def time(self):
+    return self.loop.time()
+
+  def call_at(self, when, callback, *args):
+    timer = Timer(self, callback, args)
+    heapq.heappush(self.heap, (when, next(self.counter), timer))
+    if self.deadline is None or when < self.deadline:
+      self.arm(when)
+    return timer
+
+  def call_later(self, delay, callback, *args):
+    return self.call_at(self.loop.time() + delay, callback, *args)
+
+  def arm(self, when):
+    if self.handle is not None:
+      self.handle.cancel()
+    self.handle = self.loop.call_at(when, self.run)
+    self.deadline = when
+
+  def run(self):
+    self.handle = None
+    self.deadline = None
+    try:
+      self.run_due()
+    finally:
+      self.tidy()
+
+  # runs due timers, an exception from a callback is reported to the loop's
+  # exception handler (as asyncio does for its own callbacks) and does not
+  # stop the other timers, except SystemExit and KeyboardInterrupt, which
+  # propagate and leave the rest for the next run
+  def run_due(self):
+    heap = self.heap
+    end_time = self.loop.time() + CLOCK_RESOLUTION
+    while len(heap) and heap[0][0] <= end_time:
+      _, _, timer = heapq.heappop(heap)
+      callback = timer.callback
+      if callback is None:
+        self.n_cancelled -= 1
+      else:
+        args = timer.args
+        timer.callback = None
+        timer.args = None
+        try:
+          callback(*args)
+        except (SystemExit, KeyboardInterrupt):
+          raise
+        except BaseException as exception:
+          self.loop.call_exception_handler(
+            {
+              'message': f'Exception in scheduler callback {callback!r:s}',
+              'exception': exception,
+            }
+          )
+
+  # drops cancelled timers and arms the loop timer for the earliest one
+  def tidy(self):
+    heap = self.heap
+    if (
+      self.n_cancelled >= PURGE_CANCELLED and
+        self.n_cancelled * 2 >= len(heap)
+    ):
+      self.heap = [entry for entry in heap if entry[2].callback is not None]
+      heapq.heapify(self.heap)
+      heap = self.heap
+      self.n_cancelled = 0
+    else:
+      while len(heap) and heap[0][2].callback is None:
+        heapq.heappop(heap)
+        self.n_cancelled -= 1
+    # a callback may have armed the loop timer, but maybe not for the top
+    if len(heap) and (self.deadline is None or heap[0][0] < self.deadline):
+      self.arm(heap[0][0])
@@ -0,0 +1,292 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import numpy
+import os
+import threading
+import zlib
+from udp import AsyncUDP, BROADCAST_ADDR, IN_FLIGHT_WINDOW, UDPException
+
+# returns the shard (0 <= shard < n_shards) that handles the given MAC, by
+# a hash that is the same in every process (unlike Python's own hash())
+def shard_of(mac, n_shards):
+  return zlib.crc32(bytes.fromhex(mac)) % n_shards
+
+# raised for requests to a shard whose worker process has gone, a subclass
+# of UDPException so that callers handle it like any other failed request
+class ShardException(UDPException):
+  pass
+
+# runs in each worker process, executes (request_id, method, args) from the
+# connection as AsyncUDP method calls, all concurrently, and sends back
+# (request_id, exception, result) as each completes, stops on None, a
+# result or exception that cannot be pickled is sent as a ShardException
+def worker(connection, window, broadcast):
+  async def main():
+    udp = AsyncUDP(window = window, broadcast = broadcast)
+    await udp.open()
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    tasks = set()
+
+    async def call(request_id, method, args):
+      try:
+        result = getattr(udp, method)(*args)
+        if asyncio.iscoroutine(result):
+          result = await result
+      except Exception as exception:
+        response = (request_id, exception, None)
+      else:
+        response = (request_id, None, result)
+      try:
+        connection.send(response)
+      except Exception as exception:
+        connection.send(
+          (
+            request_id,
+            ShardException(f'cannot return from {method:s}: {exception!r:s}'),
+            None
+          )
+        )
+
+    def readable():
+      while connection.poll():
+        request = connection.recv()
+        if request is None:
+          stopped.set()
+          return
+        task = loop.create_task(call(*request))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    loop.add_reader(connection.fileno(), readable)
+
+    await stopped.wait()
+    loop.remove_reader(connection.fileno())
+    for task in list(tasks):
+      task.cancel()
+    udp.close()
+  asyncio.run(main())
+
+# one worker process, with the thread that receives its results, if the
+# process goes away then its outstanding requests fail with ShardException
+# and so does any further submit()
+class Shard:
+  def __init__(self, context, window, broadcast):
+    self.connection, child_connection = context.Pipe()
+    self.process = context.Process(
+      target = worker,
+      args = (child_connection, window, broadcast),
+      daemon = True
+    )
+    self.process.start()
+    child_connection.close()
+
+    self.lock = threading.Lock() # for sending, and for the tables below
+    self.request_id = 0
+    self.futures = {} # request_id -> concurrent.futures.Future
+    self.dead = False # the worker process is gone, or closed
+    self.thread = threading.Thread(target = self.receive, daemon = True)
+    self.thread.start()
+
+  def receive(self):
+    while True:
+      try:
+        request_id, exception, result = self.connection.recv()
+      except (EOFError, OSError):
+        break
+      with self.lock:
+        future = self.futures.pop(request_id)
+      if exception is not None:
+        future.set_exception(exception)
+      else:
+        future.set_result(result)
+
+    with self.lock:
+      self.dead = True
+      futures = self.futures
+      self.futures = {}
+    for future in futures.values():
+      future.set_exception(ShardException('worker process exited'))
+
+  def submit(self, method, *args):
+    future = concurrent.futures.Future()
+    with self.lock:
+      if self.dead:
+        raise ShardException('worker process exited')
+      request_id = self.request_id
+      self.request_id += 1
+      try:
+        self.connection.send((request_id, method, args))
+      except OSError:
+        # receive() fails the outstanding requests once it sees the EOF
+        raise ShardException('worker process exited')
+      self.futures[request_id] = future
+    return future
+
+  def close(self):
+    with self.lock:
+      if not self.dead:
+        try:
+          self.connection.send(None)
+        except OSError:
+          pass
+    self.process.join()
+    self.connection.close()
+    self.thread.join()
+
+# blocking interface like UDP, that spreads the devices over n_shards worker
+# processes by a hash of their MAC, each with its own AsyncUDP (hence its own
+# socket and source, and replies return to the socket that sent a request),
+# so that several cores can drive one fleet, methods taking a mac are run by
+# its shard, set_colors() is split by shard and the results merged, and
+# broadcast discovery (mac None) and set_color_broadcast() (including any
+# verify and repair) are run by shard 0, as any shard can do them
+class ShardedUDP:
+  # see AsyncUDP.__init__(), n_shards is None for one per CPU
+  def __init__(
+    self,
+    n_shards = None,
+    window = IN_FLIGHT_WINDOW,
+    broadcast = BROADCAST_ADDR
+  ):
+    if n_shards is None:
+      n_shards = os.cpu_count()
+    # spawn rather than fork, since the parent may already have threads
+    context = multiprocessing.get_context('spawn')
+    self.shards = [
+      Shard(context, window, broadcast)
+      for i in range(n_shards)
+    ]
+
+  def close(self):
+    for shard in self.shards:
+      shard.close()
+
+  def shard(self, mac):
+    return self.shards[shard_of(mac, len(self.shards))]
+
+  # returns a concurrent.futures.Future for the result of an AsyncUDP
+  # method that takes a mac as its first argument
+  def submit(self, method, mac, *args):
+    return self.shard(mac).submit(method, mac, *args)
+
+  def get_service(self, mac = None, addr = None):
+    return (
+      self.shards[0]
+    if mac is None else
+      self.shard(mac)
+    ).submit('get_service', mac, addr).result()
+
+  def get_version(self, mac, addr):
+    return self.submit('get_version', mac, addr).result()
+
+  def get_label(self, mac, addr):
+    return self.submit('get_label', mac, addr).result()
+
+  def get_group(self, mac, addr):
+    return self.submit('get_group', mac, addr).result()
+
+  def get_location(self, mac, addr):
+    return self.submit('get_location', mac, addr).result()
+
+  def get_color(self, mac, addr):
+    return self.submit('get_color', mac, addr).result()
+
+  def set_color(self, mac, addr, hsbk, duration = 0.):
+    self.submit('set_color', mac, addr, hsbk, duration).result()
+
+  # see AsyncUDP.set_colors()
+  def set_colors(self, devices, hsbk = None, duration = 0.):
+    if hsbk is None:
+      if len(devices) == 0:
+        return {}
+      results = self.set_colors(
+        list(devices.keys()),
+        numpy.stack(list(devices.values())),
+        duration
+      )
+      return dict(zip(devices.keys(), results))
+
+    # shard -> indices into devices
+    indices = {}
+    for i in range(len(devices)):
+      shard = shard_of(devices[i][0], len(self.shards))
+      indices.setdefault(shard, []).append(i)
+    futures = [
+      (
+        shard_indices,
+        self.shards[shard].submit(
+          'set_colors',
+          [devices[i] for i in shard_indices],
+          hsbk[shard_indices],
+          duration
+        )
+      )
+      for shard, shard_indices in indices.items()
+    ]
+    results = [False] * len(devices)
+    for shard_indices, future in futures:
+      for i, result in zip(shard_indices, future.result()):
+        results[i] = result
+    return results
+
+  def set_color_broadcast(
+    self,
+    hsbk,
+    duration = 0.,
+    verify = None,
+    addr = None
+  ):
+    return self.shards[0].submit(
+      'set_color_broadcast',
+      hsbk,
+      duration,
+      verify,
+      addr
+    ).result()
+
+  def set_color_zones(self, mac, addr, hsbk, duration = 0.):
+    self.submit('set_color_zones', mac, addr, hsbk, duration).result()
+
+  def set_color_zones_delta(self, mac, addr, hsbk, duration = 0.):
+    self.submit('set_color_zones_delta', mac, addr, hsbk, duration).result()
+
+  def forget_color_zones(self, mac):
+    self.submit('forget_color_zones', mac).result()
+
+  def set_tile_colors(
+    self,
+    mac,
+    addr,
+    hsbk,
+    duration = 0.,
+    ack_required = False
+  ):
+    self.submit(
+      'set_tile_colors',
+      mac,
+      addr,
+      hsbk,
+      duration,
+      ack_required
+    ).result()
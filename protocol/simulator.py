@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import protocol
+import random
+import socket
+import sys
+import time
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+# default port for discovery, the simulator cannot receive real broadcasts
+# on localhost, so clients send their DeviceGetService broadcast here
+SIMULATOR_PORT = 56700
+
+VENDOR_LIFX = 1
+
+# product numbers for the kinds of device simulated
+KIND_LIGHT = 27 # LIFX A19
+KIND_MULTIZONE = 38 # LIFX Beam
+KIND_TILE = 55 # LIFX Tile
+kinds = {
+  'light': KIND_LIGHT,
+  'multizone': KIND_MULTIZONE,
+  'tile': KIND_TILE
+}
+
+# shape of the simulated multizone and tile devices
+N_ZONES = 120 # enough to need 2 extended messages
+N_TILES = 5
+TILE_WIDTH = 8
+TILE_HEIGHT = 8
+
+# largest number of zones per response
+STATE_MULTI_ZONE_ZONES = 8
+EXTENDED_STATE_MULTI_ZONE_ZONES = 82
+
+# messages a device queues while busy, further messages are dropped
+RX_QUEUE = 16
+
+# most sockets opened by default, devices share them beyond this, so that
+# thousands of devices fit within the usual limit of 1024 open files
+MAX_DEFAULT_SOCKETS = 256
+
+# devices are put in groups of this many, and all in one location, the
+# group and location ids are made up from the index, updated_at is in
+# nanoseconds since the epoch as for real devices
+GROUP_SIZE = 8
+
+# updated_at for a group or location set at a device whose previous one
+# was updated_at old, the client's if newer, otherwise now, so that each
+# change is newer than what the device had (real devices store the
+# client's, but a simulated fleet is relabelled by clients that send 0)
+def next_updated_at(updated_at, old):
+  return (
+    updated_at
+  if updated_at > old else
+    max(time.time_ns(), old + 1)
+  )
+
+# state of one virtual device, process() handles a request and returns the
+# responses, as a list of (type, payload) with payload None if empty
+class Device:
+  def __init__(self, mac, kind, group = 0, location = 0):
+    self.mac = mac
+    self.target = (bytes.fromhex(mac) + bytes(8))[:8]
+    self.kind = kind
+    self.port = None # of the socket that the device answers from
+    self.busy = 0. # time when the device finishes earlier messages
+
+    self.color = protocol.LightHsbk(kelvin = 3500)
+    # LightSetColor durations are modelled as a linear fade (the hue the
+    # shorter way round) from fade_color at time.monotonic() fade_start
+    self.fade_color = self.color
+    self.fade_start = 0.
+    self.fade_duration = 0.
+    self.power = 0xffff
+    self.label = f'Simulated {mac:s}'.encode()
+    updated_at = time.time_ns()
+    self.group = protocol.DeviceStateGroup(
+      group = int.to_bytes(group, 16, 'little'),
+      label = (f'Group {group:d}'.encode() + bytes(32))[:32],
+      updated_at = updated_at
+    )
+    self.location = protocol.DeviceStateLocation(
+      location = int.to_bytes(location, 16, 'little'),
+      label = (f'Location {location:d}'.encode() + bytes(32))[:32],
+      updated_at = updated_at
+    )
+    self.zones = (
+      [protocol.LightHsbk(kelvin = 3500) for i in range(N_ZONES)]
+    if kind == KIND_MULTIZONE else
+      []
+    )
+    self.tiles = (
+      [
+        [protocol.LightHsbk(kelvin = 3500) for j in range(64)]
+        for i in range(N_TILES)
+      ]
+    if kind == KIND_TILE else
+      []
+    )
+
+  def process(self, frame):
+    _type = frame.protocol_header.type
+    payload = frame.payload
+    responses = []
+    if frame.frame_address.ack_required:
+      responses.append((protocol.PacketType.DEVICE_ACKNOWLEDGEMENT, None))
+
+    if _type == protocol.PacketType.DEVICE_GET_SERVICE:
+      responses.append(
+        (
+          protocol.PacketType.DEVICE_STATE_SERVICE,
+          protocol.DeviceStateService(
+            service = protocol.DeviceService.UDP,
+            port = self.port
+          )
+        )
+      )
+    elif _type == protocol.PacketType.DEVICE_GET_VERSION:
+      responses.append(
+        (
+          protocol.PacketType.DEVICE_STATE_VERSION,
+          protocol.DeviceStateVersion(
+            vendor = VENDOR_LIFX,
+            product = self.kind
+          )
+        )
+      )
+    elif _type == protocol.PacketType.DEVICE_ECHO_REQUEST:
+      responses.append(
+        (
+          protocol.PacketType.DEVICE_ECHO_RESPONSE,
+          protocol.DeviceEchoResponse(payload = payload.payload)
+        )
+      )
+    elif _type == protocol.PacketType.DEVICE_GET_LABEL:
+      responses.append(
+        (
+          protocol.PacketType.DEVICE_STATE_LABEL,
+          protocol.DeviceStateLabel(label = (self.label + bytes(32))[:32])
+        )
+      )
+    elif _type == protocol.PacketType.DEVICE_SET_LABEL:
+      self.label = payload.label.rstrip(b'\0')
+    elif _type == protocol.PacketType.DEVICE_GET_GROUP:
+      responses.append((protocol.PacketType.DEVICE_STATE_GROUP, self.group))
+    elif _type == protocol.PacketType.DEVICE_SET_GROUP:
+      self.group = protocol.DeviceStateGroup(
+        group = payload.group,
+        label = payload.label,
+        updated_at = next_updated_at(
+          payload.updated_at,
+          self.group.updated_at
+        )
+      )
+    elif _type == protocol.PacketType.DEVICE_GET_LOCATION:
+      responses.append(
+        (protocol.PacketType.DEVICE_STATE_LOCATION, self.location)
+      )
+    elif _type == protocol.PacketType.DEVICE_SET_LOCATION:
+      self.location = protocol.DeviceStateLocation(
+        location = payload.location,
+        label = payload.label,
+        updated_at = next_updated_at(
+          payload.updated_at,
+          self.location.updated_at
+        )
+      )
+    elif _type == protocol.PacketType.LIGHT_GET:
+      responses.append(self.light_state())
+    elif _type == protocol.PacketType.LIGHT_SET_COLOR:
+      now = time.monotonic()
+      self.fade_color = self.current_color(now)
+      self.fade_start = now
+      self.fade_duration = payload.duration * .001
+      self.color = payload.color
+      if frame.frame_address.res_required:
+        responses.append(self.light_state())
+    elif _type == protocol.PacketType.LIGHT_SET_WAVEFORM:
+      # waveforms are not modelled, only where they end
+      if not payload.transient:
+        self.fade_duration = 0.
+        self.color = payload.color
+    elif _type == protocol.PacketType.LIGHT_SET_WAVEFORM_OPTIONAL:
+      if not payload.transient:
+        self.fade_duration = 0.
+        self.color = protocol.LightHsbk(
+          hue = (payload.color if payload.set_hue else self.color).hue,
+          saturation = (
+            payload.color if payload.set_saturation else self.color
+          ).saturation,
+          brightness = (
+            payload.color if payload.set_brightness else self.color
+          ).brightness,
+          kelvin = (payload.color if payload.set_kelvin else self.color).kelvin
+        )
+    elif _type == protocol.PacketType.LIGHT_SET_POWER:
+      self.power = payload.level
+    elif (
+      _type == protocol.PacketType.MULTI_ZONE_SET_COLOR_ZONES and
+        self.kind == KIND_MULTIZONE
+    ):
+      # the apply field is ignored, changes are always applied at once
+      for i in range(payload.start_index, min(payload.end_index + 1, N_ZONES)):
+        self.zones[i] = payload.color
+    elif (
+      _type == protocol.PacketType.MULTI_ZONE_GET_COLOR_ZONES and
+        self.kind == KIND_MULTIZONE
+    ):
+      end_index = min(payload.end_index + 1, N_ZONES)
+      for i in range(payload.start_index, end_index, STATE_MULTI_ZONE_ZONES):
+        responses.append(
+          (
+            protocol.PacketType.MULTI_ZONE_STATE_MULTI_ZONE,
+            protocol.MultiZoneStateMultiZone(
+              count = N_ZONES,
+              index = i,
+              colors = (
+                self.zones[i:i + STATE_MULTI_ZONE_ZONES] +
+                  [protocol.LightHsbk() for j in range(STATE_MULTI_ZONE_ZONES)]
+              )[:STATE_MULTI_ZONE_ZONES]
+            )
+          )
+        )
+    elif (
+      _type == protocol.PacketType.MULTI_ZONE_EXTENDED_SET_COLOR_ZONES and
+        self.kind == KIND_MULTIZONE
+    ):
+      for i in range(payload.colors_count):
+        if payload.index + i < N_ZONES:
+          self.zones[payload.index + i] = payload.colors[i]
+    elif (
+      _type == protocol.PacketType.MULTI_ZONE_EXTENDED_GET_COLOR_ZONES and
+        self.kind == KIND_MULTIZONE
+    ):
+      for i in range(0, N_ZONES, EXTENDED_STATE_MULTI_ZONE_ZONES):
+        colors = self.zones[i:i + EXTENDED_STATE_MULTI_ZONE_ZONES]
+        responses.append(
+          (
+            protocol.PacketType.MULTI_ZONE_EXTENDED_STATE_MULTI_ZONE,
+            protocol.MultiZoneExtendedStateMultiZone(
+              count = N_ZONES,
+              index = i,
+              colors_count = len(colors),
+              colors = (
+                colors +
+                  [
+                    protocol.LightHsbk()
+                    for j in range(EXTENDED_STATE_MULTI_ZONE_ZONES)
+                  ]
+              )[:EXTENDED_STATE_MULTI_ZONE_ZONES]
+            )
+          )
+        )
+    elif (
+      _type == protocol.PacketType.TILE_GET_DEVICE_CHAIN and
+        self.kind == KIND_TILE
+    ):
+      responses.append(
+        (
+          protocol.PacketType.TILE_STATE_DEVICE_CHAIN,
+          protocol.TileStateDeviceChain(
+            tile_devices = [
+              protocol.TileStateDevice(
+                width = TILE_WIDTH,
+                height = TILE_HEIGHT
+              )
+              for i in range(16)
+            ],
+            tile_devices_count = N_TILES
+          )
+        )
+      )
+    elif _type == protocol.PacketType.TILE_SET64 and self.kind == KIND_TILE:
+      rect = payload.rect
+      for i in range(
+        payload.tile_index,
+        min(payload.tile_index + payload.length, N_TILES)
+      ):
+        for j in range(64):
+          x = rect.x + j % max(rect.width, 1)
+          y = rect.y + j // max(rect.width, 1)
+          if x < TILE_WIDTH and y < TILE_HEIGHT:
+            self.tiles[i][y * TILE_WIDTH + x] = payload.colors[j]
+    elif _type == protocol.PacketType.TILE_GET64 and self.kind == KIND_TILE:
+      for i in range(
+        payload.tile_index,
+        min(payload.tile_index + payload.length, N_TILES)
+      ):
+        responses.append(
+          (
+            protocol.PacketType.TILE_STATE64,
+            protocol.TileState64(
+              tile_index = i,
+              rect = protocol.TileBufferRect(width = TILE_WIDTH),
+              colors = self.tiles[i]
+            )
+          )
+        )
+    else:
+      responses.append(
+        (
+          protocol.PacketType.DEVICE_STATE_UNHANDLED,
+          protocol.DeviceStateUnhandled(unhandled_type = _type)
+        )
+      )
+    return responses
+
+  def current_color(self, now):
+    if now >= self.fade_start + self.fade_duration:
+      return self.color
+    fraction = (now - self.fade_start) / self.fade_duration
+    a = self.fade_color
+    b = self.color
+    hue_diff = (b.hue - a.hue + 0x8000) % 0x10000 - 0x8000
+    return protocol.LightHsbk(
+      hue = int(round(a.hue + hue_diff * fraction)) & 0xffff,
+      saturation = int(
+        round(a.saturation + (b.saturation - a.saturation) * fraction)
+      ),
+      brightness = int(
+        round(a.brightness + (b.brightness - a.brightness) * fraction)
+      ),
+      kelvin = int(round(a.kelvin + (b.kelvin - a.kelvin) * fraction))
+    )
+
+  def light_state(self):
+    return (
+      protocol.PacketType.LIGHT_STATE,
+      protocol.LightState(
+        color = self.current_color(time.monotonic()),
+        power = self.power,
+        label = (self.label + bytes(32))[:32]
+      )
+    )
+
+# one socket shared by a group of devices, requests are routed by target,
+# the first socket also receives broadcasts, which are routed to any device
+# in the simulator and answered from the device's own socket, and then a
+# request to the all-zeros target is answered by every device
+class DeviceSocket(asyncio.DatagramProtocol):
+  def __init__(self, simulator):
+    self.simulator = simulator
+    self.transport = None
+    self.devices = {} # target -> Device
+
+  def connection_made(self, transport):
+    self.transport = transport
+
+  def datagram_received(self, data, addr):
+    self.simulator.n_rx += 1
+    frame = protocol.Frame()
+    frame.deserialize(data)
+    target = frame.frame_address.target
+    if self is not self.simulator.sockets[0]:
+      device = self.devices.get(target)
+      if device is not None:
+        self.receive(device, frame, addr)
+    elif target == bytes(8):
+      for device_socket in self.simulator.sockets:
+        for device in device_socket.devices.values():
+          device_socket.receive(device, frame, addr)
+    else:
+      device_socket, device = self.simulator.targets.get(target, (None, None))
+      if device is not None:
+        device_socket.receive(device, frame, addr)
+
+  # models the loss, the device's processing rate and the network latency
+  def receive(self, device, frame, addr):
+    simulator = self.simulator
+    if random.random() < simulator.loss:
+      simulator.n_lost += 1
+      return
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+    start = max(device.busy, now)
+    if simulator.rate is not None:
+      if (start - now) * simulator.rate >= RX_QUEUE:
+        simulator.n_overflow += 1
+        return
+      device.busy = start + 1. / simulator.rate
+    delay = (
+      max(device.busy - now, 0.) +
+        simulator.latency +
+        random.random() * simulator.jitter
+    )
+    if delay > 0.:
+      loop.call_later(delay, self.respond, device, frame, addr)
+    else:
+      self.respond(device, frame, addr)
+
+  def respond(self, device, frame, addr):
+    simulator = self.simulator
+    for _type, payload in device.process(frame):
+      if random.random() < simulator.loss:
+        simulator.n_lost += 1
+        continue
+      simulator.n_tx += 1
+      self.transport.sendto(
+        protocol.Frame(
+          frame_header = protocol.FrameHeader(
+            source = frame.frame_header.source
+          ),
+          frame_address = protocol.FrameAddress(
+            target = device.target,
+            sequence = frame.frame_address.sequence
+          ),
+          protocol_header = protocol.ProtocolHeader(
+            _type = _type
+          ),
+          payload = payload
+        ).serialize(),
+        addr
+      )
+
+# runs n_devices virtual devices on localhost, kinds is a list of the kind
+# of each device (repeated if it is shorter), loss is the probability of
+# dropping each request and each response, latency is added to every round
+# trip with up to jitter more at random, rate is the messages per second
+# each device can process (None for unlimited), n_sockets is how many UDP
+# ports the devices are spread over (None for one each, as on a real LAN,
+# up to MAX_DEFAULT_SOCKETS), the first port is port (or random if 0) and
+# is the discovery address
+class Simulator:
+  def __init__(
+    self,
+    n_devices,
+    kinds = [KIND_LIGHT],
+    loss = 0.,
+    latency = 0.,
+    jitter = 0.,
+    rate = None,
+    n_sockets = None,
+    host = '127.0.0.1',
+    port = SIMULATOR_PORT
+  ):
+    self.devices = [
+      Device(f'd073d5{i:06x}', kinds[i % len(kinds)], i // GROUP_SIZE)
+      for i in range(n_devices)
+    ]
+    self.loss = loss
+    self.latency = latency
+    self.jitter = jitter
+    self.rate = rate
+    # there is always the discovery socket, even with no devices
+    self.n_sockets = (
+      min(max(n_devices, 1), MAX_DEFAULT_SOCKETS)
+    if n_sockets is None else
+      n_sockets
+    )
+    assert self.n_sockets >= 1
+    self.host = host
+    self.port = port
+    self.sockets = []
+    self.targets = {} # target -> (DeviceSocket, Device)
+
+    self.n_rx = 0
+    self.n_tx = 0
+    self.n_lost = 0
+    self.n_overflow = 0
+
+  async def open(self):
+    loop = asyncio.get_running_loop()
+    for i in range(self.n_sockets):
+      sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      sock.setblocking(0)
+      sock.bind((self.host, self.port if i == 0 else 0))
+      _, device_socket = await loop.create_datagram_endpoint(
+        lambda: DeviceSocket(self),
+        sock = sock
+      )
+      self.sockets.append(device_socket)
+    self.port = self.sockets[0].transport.get_extra_info('sockname')[1]
+    for i in range(len(self.devices)):
+      device = self.devices[i]
+      device_socket = self.sockets[i % self.n_sockets]
+      device.port = device_socket.transport.get_extra_info('sockname')[1]
+      device_socket.devices[device.target] = device
+      self.targets[device.target] = (device_socket, device)
+
+  def close(self):
+    for device_socket in self.sockets:
+      device_socket.transport.close()
+
+  # address for clients to send their DeviceGetService broadcast to
+  @property
+  def addr(self):
+    return (self.host, self.port)
+
+if __name__ == '__main__':
+  loss = 0.
+  latency = 0.
+  jitter = 0.
+  rate = None
+  n_sockets = None
+  port = SIMULATOR_PORT
+  device_kinds = [KIND_LIGHT]
+  while len(sys.argv) >= 3 and sys.argv[1][:2] == '--':
+    if sys.argv[1] == '--loss':
+      loss = float(sys.argv[2])
+    elif sys.argv[1] == '--latency':
+      latency = float(sys.argv[2])
+    elif sys.argv[1] == '--jitter':
+      jitter = float(sys.argv[2])
+    elif sys.argv[1] == '--rate':
+      rate = float(sys.argv[2])
+    elif sys.argv[1] == '--sockets':
+      n_sockets = int(sys.argv[2])
+    elif sys.argv[1] == '--port':
+      port = int(sys.argv[2])
+    elif sys.argv[1] == '--kinds':
+      device_kinds = [kinds[i] for i in sys.argv[2].split(',')]
+    else:
+      break
+    del sys.argv[1:3]
+  if len(sys.argv) < 2:
+    print(f'usage: {sys.argv[0]:s} [--loss probability] [--latency seconds] [--jitter seconds] [--rate messages_per_second] [--sockets n] [--port port] [--kinds light,multizone,tile] n_devices')
+    print('runs virtual devices on localhost, clients should broadcast to 127.0.0.1:port')
+    sys.exit(EXIT_FAILURE)
+  n_devices = int(sys.argv[1])
+  if n_sockets is not None and n_sockets < 1:
+    print('--sockets must be at least 1')
+    sys.exit(EXIT_FAILURE)
+
+  async def main():
+    simulator = Simulator(
+      n_devices,
+      device_kinds,
+      loss,
+      latency,
+      jitter,
+      rate,
+      n_sockets,
+      port = port
+    )
+    try:
+      await simulator.open()
+    except OSError as exception:
+      print(
+        f'cannot open {simulator.n_sockets:d} sockets ({exception!s:s}), use fewer --sockets or raise the open file limit'
+      )
+      sys.exit(EXIT_FAILURE)
+    print(
+      f'{n_devices:d} devices on {simulator.n_sockets:d} sockets, discovery address {simulator.host:s}:{simulator.port:d}'
+    )
+    await asyncio.Event().wait()
+  asyncio.run(main())
@@ -0,0 +1,236 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import numpy
+import protocol
+from light_hsbk import HSBK_HUE, HSBK_SAT, HSBK_BR, HSBK_KELV, N_HSBK
+from light_hsbk import HSBK_TOLERANCE, KELV_TOLERANCE
+from light_hsbk import hsbk_to_light_hsbk, light_hsbk_close
+from light_hsbk import light_hsbk_from_struct, light_hsbk_to_hsbk
+from udp import GET_COLOR_TIMEOUT, GET_COLOR_TRIES, UDPException
+from udp import encode_set_color
+
+# seconds between verification rounds, and devices checked in each round
+VERIFY_INTERVAL = 1.
+VERIFY_SAMPLE = 8
+
+# most colours on the path of a fade that a reply is compared with
+VERIFY_FADE_STEPS = 64
+
+# sends colours to many devices without ack_required or res_required, for
+# animation where waiting for acknowledgements would halve the frame rate
+# and the next frame makes any lost one obsolete, a background task checks
+# a few devices at a time with LightGet (round robin, so every device is
+# checked eventually) and resends the current colour to any that differ
+# (beyond the tolerance of light_hsbk_close(), as devices round colours),
+# a device that is fading is compared with where the fade should be when
+# it answers, so that continuous animation with a duration is verified,
+# must be used on the event loop thread of udp (an AsyncUDP), devices is a
+# list of (mac, addr) aligned with the hsbk passed to set_colors(), if
+# perceptual_filter (a perceptual.PerceptualFilter) is given then devices
+# whose new colour cannot be told apart from the last one sent are skipped
+class ColorStream:
+  def __init__(
+    self,
+    udp,
+    devices,
+    interval = VERIFY_INTERVAL,
+    sample = VERIFY_SAMPLE,
+    perceptual_filter = None
+  ):
+    self.udp = udp
+    self.devices = devices
+    self.interval = interval
+    self.sample = sample
+    self.perceptual_filter = perceptual_filter
+    self.targets = [(bytes.fromhex(mac) + bytes(8))[:8] for mac, _ in devices]
+
+    n_devices = len(devices)
+    self.hsbk = None # (n_devices, N_HSBK) last colours sent, None if none
+    # (n_devices, N_HSBK) where each device's fade to its colour starts,
+    # nan where that is not known (until a verification reply tells us)
+    self.from_hsbk = numpy.full((n_devices, N_HSBK), numpy.nan, numpy.double)
+    # for each device, time when its fade to its colour started (when the
+    # colour was sent, or when a verification reply was received), and the
+    # duration of the fade from then
+    self.sent = numpy.zeros((n_devices,), numpy.double)
+    self.duration = numpy.zeros((n_devices,), numpy.double)
+    self.versions = numpy.zeros((n_devices,), numpy.int64) # count of sends
+    self.next_device = 0 # where the next round of verification starts
+    self.task = None
+
+    self.n_verified = 0
+    self.n_repaired = 0
+    self.n_unreachable = 0
+
+  # starts the verification task
+  def start(self):
+    self.task = asyncio.get_running_loop().create_task(self.verify_loop())
+
+  def close(self):
+    if self.task is not None:
+      self.task.cancel()
+      self.task = None
+
+  # hsbk is (n_devices, N_HSBK) in the same units as AsyncUDP.set_color()
+  def set_colors(self, hsbk, duration = 0.):
+    hsbk = numpy.array(hsbk, numpy.double)
+    if self.perceptual_filter is None or self.hsbk is None:
+      indices = numpy.arange(len(self.devices))
+    else:
+      indices = numpy.flatnonzero(
+        self.perceptual_filter.visible(self.hsbk, hsbk)
+      )
+      if indices.shape[0] == 0:
+        return
+
+    targets = [self.targets[i] for i in indices]
+    sequences = [self.udp.next_sequence(target) for target in targets]
+    out_data = encode_set_color(
+      self.udp.source,
+      targets,
+      sequences,
+      hsbk[indices],
+      duration
+    )
+    for i in range(len(indices)):
+      self.udp.sendto(out_data[i], self.devices[indices[i]][1])
+
+    now = asyncio.get_running_loop().time()
+    if self.hsbk is None:
+      self.hsbk = hsbk
+    else:
+      self.from_hsbk[indices] = self.expected_hsbk(indices, now)
+      self.hsbk[indices] = hsbk[indices]
+    self.sent[indices] = now
+    self.duration[indices] = duration
+    self.versions[indices] += 1
+
+  # returns (len(indices), N_HSBK) colours that the devices should show at
+  # time t (a scalar or an array aligned with indices), devices fade
+  # linearly (the hue the shorter way round) from where they were to the
+  # colour sent, over its duration, nan if mid-fade from an unknown colour
+  def expected_hsbk(self, indices, t):
+    fraction = numpy.clip(
+      (t - self.sent[indices]) / numpy.maximum(self.duration[indices], 1e-9),
+      0.,
+      1.
+    )[:, numpy.newaxis]
+    start = self.from_hsbk[indices]
+    delta = self.hsbk[indices] - start
+    delta[:, HSBK_HUE] = (delta[:, HSBK_HUE] + 180.) % 360. - 180.
+    hsbk = numpy.where(
+      fraction < 1.,
+      start + delta * fraction,
+      self.hsbk[indices]
+    )
+    hsbk[:, HSBK_HUE] %= 360.
+    return hsbk
+
+  # device i was seen at colour light_hsbk (a protocol.LightHsbk) at time t,
+  # and will fade from there to its colour in whatever time remains
+  def restart_fade(self, i, light_hsbk, t):
+    self.from_hsbk[i] = light_hsbk_to_hsbk(light_hsbk_from_struct(light_hsbk))
+    self.duration[i] = max(self.sent[i] + self.duration[i] - t, 0.)
+    self.sent[i] = t
+
+  async def verify_loop(self):
+    while True:
+      await asyncio.sleep(self.interval)
+      await self.verify()
+
+  # checks the next sample of devices, returns when all have been checked
+  async def verify(self):
+    n_devices = len(self.devices)
+    if self.hsbk is None or n_devices == 0:
+      return
+    await asyncio.gather(
+      *[
+        self.verify_device((self.next_device + i) % n_devices)
+        for i in range(min(self.sample, n_devices))
+      ]
+    )
+    self.next_device = (self.next_device + self.sample) % n_devices
+
+  async def verify_device(self, i):
+    loop = asyncio.get_running_loop()
+    mac, addr = self.devices[i]
+    version = self.versions[i]
+    asked = loop.time()
+    try:
+      payload = await self.udp.get(
+        mac,
+        addr,
+        protocol.PacketType.LIGHT_GET,
+        protocol.PacketType.LIGHT_STATE,
+        GET_COLOR_TRIES,
+        GET_COLOR_TIMEOUT
+      )
+    except UDPException:
+      self.n_unreachable += 1
+      return
+    answered = loop.time()
+    # if a newer colour was sent meanwhile, the result is inconclusive
+    if self.versions[i] != version:
+      return
+    # the device answered at some time between asked and answered, so if
+    # it is fading then accept any colour on that part of the fade's path,
+    # taking enough steps along the path to be within the tolerance
+    path = self.expected_hsbk([i, i], numpy.array([asked, answered]))
+    if numpy.any(numpy.isnan(path)):
+      # the fade started from an unknown colour, now we know where it is
+      self.restart_fade(i, payload.color, answered)
+      return
+    self.n_verified += 1
+
+    delta = numpy.abs(path[1] - path[0])
+    delta[HSBK_HUE] = min(delta[HSBK_HUE], 360. - delta[HSBK_HUE])
+    n_steps = int(
+      min(
+        numpy.ceil(
+          max(
+            delta[HSBK_HUE] * (0xffff / 360.) / HSBK_TOLERANCE,
+            delta[HSBK_SAT] * 0xffff / HSBK_TOLERANCE,
+            delta[HSBK_BR] * 0xffff / HSBK_TOLERANCE,
+            delta[HSBK_KELV] / KELV_TOLERANCE
+          )
+        ),
+        VERIFY_FADE_STEPS - 1
+      )
+    ) + 1
+    expected = self.expected_hsbk(
+      numpy.full((n_steps,), i),
+      numpy.linspace(asked, answered, n_steps)
+    )
+    if not numpy.any(
+      light_hsbk_close(
+        hsbk_to_light_hsbk(expected),
+        light_hsbk_from_struct(payload.color)
+      )
+    ):
+      self.n_repaired += 1
+      # the device finishes any fade in the time remaining
+      self.restart_fade(i, payload.color, loop.time())
+      await self.udp.set_colors(
+        [self.devices[i]],
+        self.hsbk[i:i + 1],
+        self.duration[i]
+      )
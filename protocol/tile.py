@@ -0,0 +1,85 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy
+import protocol
+from light_hsbk import N_HSBK, hsbk_to_light_hsbk
+
+TILE_WIDTH = 8
+TILE_HEIGHT = 8
+
+class Set64Encoder:
+  # n_tiles is the number of tiles to set, starting at tile index in the
+  # device chain, and the frames are preallocated so that each encode() is
+  # a few vectorised steps, no matter how many tiles are in the chain
+  def __init__(self, n_tiles, index = 0):
+    self.n_tiles = n_tiles
+    self.index = index
+
+    self.frames = numpy.zeros(
+      (n_tiles,),
+      protocol.frame_dtype(protocol.TileSet64)
+    )
+    self.frames['frame_header']['length'] = self.frames.dtype.itemsize
+    self.frames['frame_header']['protocol'] = 1024 | (1 << 12) # addressable
+    self.frames['protocol_header']['type'] = protocol.PacketType.TILE_SET64
+
+    payload = self.frames['payload']
+    payload['tile_index'] = index + numpy.arange(n_tiles)
+    payload['length'] = 1
+    payload['rect']['width'] = TILE_WIDTH
+
+    # view of the colours with the same shape as the hsbk passed to encode(),
+    # (the field views are strided, so colours are quantised straight into
+    # the frames without going via an intermediate buffer)
+    self.colors = payload['colors'].reshape(
+      (n_tiles, TILE_HEIGHT, TILE_WIDTH)
+    )
+    assert numpy.shares_memory(self.colors, self.frames)
+
+  # hsbk is (n_tiles, TILE_HEIGHT, TILE_WIDTH, N_HSBK) in the same units as
+  # UDP.set_color(), duration is in seconds, frame i uses sequence number
+  # (sequence + i) & 0xff, returns a list of n_tiles serialized frames that
+  # are ready to send
+  def encode(
+    self,
+    source,
+    target,
+    sequence,
+    hsbk,
+    duration = 0.,
+    ack_required = False,
+    res_required = False
+  ):
+    assert hsbk.shape == (self.n_tiles, TILE_HEIGHT, TILE_WIDTH, N_HSBK)
+    self.frames['frame_header']['source'] = source
+    self.frames['frame_address']['target'] = target
+    self.frames['frame_address']['flags'] = (
+      int(res_required) | (int(ack_required) << 1)
+    )
+    self.frames['frame_address']['sequence'] = (
+      (sequence + numpy.arange(self.n_tiles)) & 0xff
+    )
+    self.frames['payload']['duration'] = int(round(duration * 1000.))
+    hsbk_to_light_hsbk(hsbk, self.colors)
+
+    data = self.frames.tobytes()
+    size = self.frames.dtype.itemsize
+    return [data[i * size:(i + 1) * size] for i in range(self.n_tiles)]
@@ -0,0 +1,228 @@
+# Copyright (c) 2021 Nick Downing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import numpy
+import protocol
+from coalesce import SEND_RATE
+from light_hsbk import HSBK_HUE, light_hsbk_to_struct
+from udp import SET_COLOR_TRIES, SET_COLOR_TIMEOUT
+
+# largest deviation from the requested curve, as a fraction of the whole
+# change, that a piecewise linear fit of the curve is allowed to make
+TRANSITION_TOLERANCE = .01
+
+# shortest segment of a piecewise linear fit, since at worst (a curve that
+# cannot be fitted in fewer segments) each segment is one message, this is
+# the same as streaming at the rate limit recommended for a device
+MIN_INTERVAL = 1. / SEND_RATE
+
+# most samples of a curve that are fitted, however long the transition, as
+# fitting is quadratic in the samples, and a few hundred are enough to find
+# the segments of any smooth curve to within TRANSITION_TOLERANCE
+TRANSITION_SAMPLES = 256
+
+# timing curves, each maps an array of the fraction of the duration elapsed
+# to the fraction of the change from start to end colour made at that time
+curves = {
+  'linear': lambda x: x,
+  'ease_in_out': lambda x: .5 - .5 * numpy.cos(numpy.pi * x),
+  'ease_out': lambda x: numpy.sin(.5 * numpy.pi * x),
+  'ease_in': lambda x: 1. - numpy.cos(.5 * numpy.pi * x)
+}
+
+# curves the device can do itself with one waveform message sent at a
+# period of twice the duration and .5 cycles, so that it stops at the peak,
+# the SINE waveform goes .5 - .5 cos(2 pi t / period) of the way to the
+# colour and the HALF_SINE waveform goes sin(pi t / period) of the way
+waveforms = {
+  'ease_in_out': protocol.LightWaveform.SINE,
+  'ease_out': protocol.LightWaveform.HALF_SINE
+}
+
+# fits a piecewise linear function to progress, an (n + 1,) array sampled at
+# equal intervals from 0 to 1, returns the list of sample indices where the
+# segments start and end, greedily making each segment as long as possible
+def fit_segments(progress, tolerance):
+  n = progress.shape[0] - 1
+  breaks = [0]
+  i = 0
+  while i < n:
+    j = i + 1
+    while j < n:
+      k = numpy.arange(i, j + 2)
+      line = progress[i] + (progress[j + 1] - progress[i]) * (
+        (k - i) / (j + 1 - i)
+      )
+      if numpy.any(numpy.abs(line - progress[k]) > tolerance):
+        break
+      j += 1
+    breaks.append(j)
+    i = j
+  return breaks
+
+# plans a transition of a device from start to end colour (each an (N_HSBK,)
+# array) over duration seconds, following curve (a key of curves, or any
+# function in the same form), returns a list of (at, _type, payload) with
+# the time in seconds from the start of the transition to send each message
+# and its packet type and payload, as few messages as possible are used:
+#   linear (or any curve fitting in one segment): LightSetColor with duration
+#   waveforms: LightSetWaveform, or LightSetWaveformOptional to leave any
+#     components that do not change alone
+#   anything else: LightSetColor with duration for each segment of a
+#     piecewise linear fit to TRANSITION_SAMPLES samples of the curve, no
+#     shorter than min_interval
+# the device fades from whatever colour it has, so if it might not be at
+# the start colour, set_start prepends a message to set it at once
+def plan_transition(
+  start,
+  end,
+  duration,
+  curve = 'linear',
+  tolerance = TRANSITION_TOLERANCE,
+  min_interval = MIN_INTERVAL,
+  set_start = False
+):
+  plan = []
+  if set_start:
+    plan.append(
+      (
+        0.,
+        protocol.PacketType.LIGHT_SET_COLOR,
+        protocol.LightSetColor(color = light_hsbk_to_struct(start))
+      )
+    )
+  if duration <= 0.:
+    plan.append(
+      (
+        0.,
+        protocol.PacketType.LIGHT_SET_COLOR,
+        protocol.LightSetColor(color = light_hsbk_to_struct(end))
+      )
+    )
+    return plan
+  if isinstance(curve, str) and curve == 'linear':
+    plan.append(
+      (
+        0.,
+        protocol.PacketType.LIGHT_SET_COLOR,
+        protocol.LightSetColor(
+          color = light_hsbk_to_struct(end),
+          duration = int(round(duration * 1000.))
+        )
+      )
+    )
+    return plan
+
+  if isinstance(curve, str) and curve in waveforms:
+    start_color = light_hsbk_to_struct(start)
+    end_color = light_hsbk_to_struct(end)
+    changed = [
+      getattr(start_color, field) != getattr(end_color, field)
+      for field in ['hue', 'saturation', 'brightness', 'kelvin']
+    ]
+    period = int(round(2. * duration * 1000.))
+    if all(changed):
+      plan.append(
+        (
+          0.,
+          protocol.PacketType.LIGHT_SET_WAVEFORM,
+          protocol.LightSetWaveform(
+            color = end_color,
+            period = period,
+            cycles = .5,
+            waveform = waveforms[curve]
+          )
+        )
+      )
+    else:
+      plan.append(
+        (
+          0.,
+          protocol.PacketType.LIGHT_SET_WAVEFORM_OPTIONAL,
+          protocol.LightSetWaveformOptional(
+            color = end_color,
+            period = period,
+            cycles = .5,
+            waveform = waveforms[curve],
+            set_hue = changed[0],
+            set_saturation = changed[1],
+            set_brightness = changed[2],
+            set_kelvin = changed[3]
+          )
+        )
+      )
+    return plan
+
+  # go the shortest way around the hue circle
+  start = numpy.array(start, numpy.double)
+  delta = numpy.array(end, numpy.double) - start
+  delta[HSBK_HUE] = (delta[HSBK_HUE] + 180.) % 360. - 180.
+
+  n = max(min(int(duration / min_interval), TRANSITION_SAMPLES), 1)
+  progress = numpy.array(
+    (curves[curve] if isinstance(curve, str) else curve)(
+      numpy.linspace(0., 1., n + 1)
+    ),
+    numpy.double
+  )
+  progress[-1] = 1.
+  breaks = fit_segments(progress, tolerance)
+  for i in range(len(breaks) - 1):
+    plan.append(
+      (
+        breaks[i] * duration / n,
+        protocol.PacketType.LIGHT_SET_COLOR,
+        protocol.LightSetColor(
+          color = light_hsbk_to_struct(
+            start + delta * progress[breaks[i + 1]]
+          ),
+          duration = int(
+            round((breaks[i + 1] - breaks[i]) * duration * 1000. / n)
+          )
+        )
+      )
+    )
+  return plan
+
+# sends the messages of a plan from plan_transition() to a device at their
+# times, each acknowledged before the next is sent, so that a late resend
+# cannot undo a later message, if a message goes out late then its duration
+# is shortened so that the transition still finishes on time, must be run
+# on the event loop thread of udp (an AsyncUDP), from UDP use udp.run(...)
+async def play_transition(
+  udp,
+  mac,
+  addr,
+  plan,
+  tries = SET_COLOR_TRIES,
+  timeout = SET_COLOR_TIMEOUT
+):
+  start_time = udp.loop.time()
+  for at, _type, payload in plan:
+    late = udp.loop.time() - start_time - at
+    if late < 0.:
+      await asyncio.sleep(-late)
+    elif _type == protocol.PacketType.LIGHT_SET_COLOR and payload.duration:
+      payload = protocol.LightSetColor(
+        color = payload.color,
+        duration = max(payload.duration - int(round(late * 1000.)), 0)
+      )
+    await udp.set(mac, addr, _type, payload, tries, timeout)
@@ -1,28 +1,67 @@
 #!/usr/bin/env python3
 
+import asyncio
+import collections
 import numpy
 import protocol
 import random
-import select
 import socket
+import struct
 import sys
-import time
+import threading
+from capture import DIRECTION_RX, DIRECTION_TX
+from light_hsbk import hsbk_to_light_hsbk, light_hsbk_close
+from light_hsbk import light_hsbk_to_struct
+from light_hsbk import light_hsbk_from_struct
+from multizone import ExtendedSetColorZonesEncoder, SetColorZonesDeltaEncoder
+from rtt import RTTEstimator
+from scheduler import Scheduler
+from tile import Set64Encoder
 
 EXIT_SUCCESS = 0
 EXIT_FAILURE = 1
 
+# the timeouts are for the first try, and later tries back off exponentially,
+# once a device's round trip time is known its estimated timeout is used
 GET_SERVICE_TRIES = 5
 GET_SERVICE_TIMEOUT = .1
 
 GET_VERSION_TRIES = 5
 GET_VERSION_TIMEOUT = .1
 
+GET_METADATA_TRIES = 5
+GET_METADATA_TIMEOUT = .1
+
 GET_COLOR_TRIES = 5
 GET_COLOR_TIMEOUT = .1
 
 SET_COLOR_TRIES = 5
 SET_COLOR_TIMEOUT = .1
 
+SET_COLORS_TRIES = 5
+SET_COLORS_TIMEOUT = .1
+
+# broadcasts cannot be acknowledged, so they are repeated this many times
+# at this interval to make it unlikely that a device misses them all
+SET_COLOR_BROADCAST_REPEATS = 2
+SET_COLOR_BROADCAST_INTERVAL = .02
+
+SET_COLOR_ZONES_TRIES = 5
+SET_COLOR_ZONES_TIMEOUT = .1
+
+SET_TILE_COLORS_TRIES = 5
+SET_TILE_COLORS_TIMEOUT = .1
+
+# default number of requests that can be awaiting a response from a device
+IN_FLIGHT_WINDOW = 4
+
+# default address for DeviceGetService broadcasts
+BROADCAST_ADDR = ('255.255.255.255', 56700)
+
+# size of the receive buffer, and most datagrams read per wakeup
+RX_BUFFER_SIZE = 0x1000
+RX_BATCH = 64
+
 HSBK_HUE = 0
 HSBK_SAT = 1
 HSBK_BR = 2
@@ -32,19 +71,292 @@ N_HSBK = 4
 class UDPException(Exception):
   pass
 
-class UDP:
-  def __init__(self):
-    self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-    self.socket.setblocking(0)
-    self.socket.bind(('0.0.0.0', 0))
+# checks common to all frames that are responses to our requests
+def is_response(frame, source):
+  return (
+    frame.frame_header.protocol == 1024 and
+      frame.frame_header.addressable and
+      frame.frame_header.source == source
+  )
+
+# same as is_response(), but for a datagram before it is deserialized, so
+# that other traffic (e.g. other clients' broadcasts) is rejected cheaply
+frame_header_struct = struct.Struct('<2xHI')
+def is_response_data(data, source):
+  if len(data) < frame_header_struct.size:
+    return False
+  _protocol, _source = frame_header_struct.unpack_from(data)
+  return (_protocol & 0x1fff) == (1024 | (1 << 12)) and _source == source
+
+# builds LightSetColor frames for many devices in one vectorised step,
+# targets and sequences are lists (or arrays) aligned with hsbk, which is
+# (n_devices, N_HSBK) in the same units as UDP.set_color(), duration is in
+# seconds, returns a list of n_devices serialized frames ready to send,
+# tagged is for broadcasts to all devices (the target must be all zeros)
+def encode_set_color(
+  source,
+  targets,
+  sequences,
+  hsbk,
+  duration = 0.,
+  ack_required = False,
+  res_required = False,
+  tagged = False
+):
+  frames = numpy.zeros(
+    (hsbk.shape[0],),
+    protocol.frame_dtype(protocol.LightSetColor)
+  )
+  frames['frame_header']['length'] = frames.dtype.itemsize
+  frames['frame_header']['protocol'] = (
+    1024 | (1 << 12) | (int(tagged) << 13) # addressable, tagged
+  )
+  frames['frame_header']['source'] = source
+  frames['frame_address']['target'] = targets
+  frames['frame_address']['flags'] = (
+    int(res_required) | (int(ack_required) << 1)
+  )
+  frames['frame_address']['sequence'] = sequences
+  frames['protocol_header']['type'] = protocol.PacketType.LIGHT_SET_COLOR
+  frames['payload']['duration'] = int(round(duration * 1000.))
+  hsbk_to_light_hsbk(hsbk, frames['payload']['color'])
+
+  data = frames.tobytes()
+  size = frames.dtype.itemsize
+  return [data[i * size:(i + 1) * size] for i in range(frames.shape[0])]
+
+# LIFX UDP client, all requests share one socket and any number of them can
+# be in flight at once, since datagram_received() is the single receiver and
+# routes each frame to the request that is waiting for it (by source, which
+# is always ours, then target and sequence), see UDP for a blocking version,
+# the socket is read directly rather than through an asyncio transport, so
+# that datagrams go into one preallocated buffer (instead of a new bytes
+# object each) and are decoded from there, handlers get decoded frames that
+# do not refer to the buffer, so it can be reused as soon as they return,
+# so it needs an event loop with add_reader(), on Windows that means an
+# asyncio.SelectorEventLoop rather than the default ProactorEventLoop
+class AsyncUDP:
+  # capture is None or a capture.CaptureWriter to record all traffic to
+  # window is the number of requests that can be in flight to each device
+  # broadcast is where to send discovery (e.g. to a simulator.Simulator)
+  def __init__(
+    self,
+    capture = None,
+    window = IN_FLIGHT_WINDOW,
+    broadcast = BROADCAST_ADDR
+  ):
+    self.socket = None
+    self.loop = None
+    self.scheduler = None # for timeouts, see scheduler.Scheduler
+    self.capture = capture
+    self.window = window
+    self.broadcast = broadcast
 
     self.source = random.randint(0, 0xffffffff)
-    self.sequence = random.randint(0, 0xff)
 
-  def get_service(self, mac = None):
+    # target -> last sequence number used, each target has its own space
+    self.sequences = {}
+    # target -> asyncio.Semaphore(window) for requests in flight to target
+    self.windows = {}
+    # target -> RTTEstimator, fed by responses to frames that were sent once
+    self.rtts = {}
+
+    # (target, sequence) -> handler(frame, addr) for requests in flight,
+    # where target is None for broadcasts which are answered by many devices
+    self.pending = {}
+
+    # zone count -> ExtendedSetColorZonesEncoder, to reuse the buffers
+    self.set_color_zones_encoders = {}
+    # target -> SetColorZonesDeltaEncoder, holding what was last sent
+    self.set_color_zones_delta_encoders = {}
+    # target -> asyncio.Lock, so that updates to a device commit in order
+    self.set_color_zones_delta_locks = {}
+    # tile count -> Set64Encoder, to reuse the buffers
+    self.set_tile_colors_encoders = {}
+
+    self.rx_buffer = bytearray(RX_BUFFER_SIZE)
+    self.rx_view = memoryview(self.rx_buffer)
+    # (data, addr) waiting for the socket to be writeable, usually empty
+    self.tx_queue = collections.deque()
+
+  # must be awaited before making any requests
+  async def open(self):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.setblocking(0)
+    sock.bind(('0.0.0.0', 0))
+    self.socket = sock
+    self.loop = asyncio.get_running_loop()
+    self.scheduler = Scheduler(self.loop)
+    self.loop.add_reader(sock.fileno(), self.read_ready)
+
+  def close(self):
+    self.loop.remove_reader(self.socket.fileno())
+    if len(self.tx_queue):
+      self.loop.remove_writer(self.socket.fileno())
+    self.socket.close()
+
+  def read_ready(self):
+    for i in range(RX_BATCH):
+      try:
+        size, addr = self.socket.recvfrom_into(self.rx_buffer)
+      except (BlockingIOError, InterruptedError):
+        break
+      except OSError:
+        break # e.g. an ICMP error, there is no need to report it
+      self.datagram_received(self.rx_view[:size], addr)
+
+  # data is bytes or a memoryview, which is only valid during the call
+  def datagram_received(self, data, addr):
+    if self.capture is not None:
+      self.capture.write(DIRECTION_RX, addr, bytes(data))
+    if not is_response_data(data, self.source):
+      return
+    frame = protocol.Frame()
+    frame.deserialize(data)
+    # since sequence spaces are per target, a device can answer a broadcast
+    # and a unicast with the same sequence number, so offer the frame to
+    # both (handlers check the response type before using it)
+    sequence = frame.frame_address.sequence
+    handler = self.pending.get((frame.frame_address.target, sequence))
+    if handler is not None:
+      handler(frame, addr)
+    handler = self.pending.get((None, sequence))
+    if handler is not None:
+      handler(frame, addr)
+
+  # a datagram that cannot be sent (e.g. network unreachable) is dropped,
+  # as if lost in the network, so that it is resent or reported as usual
+  def sendto(self, data, addr):
+    if self.capture is not None:
+      self.capture.write(DIRECTION_TX, addr, data)
+    if len(self.tx_queue) == 0:
+      try:
+        self.socket.sendto(data, addr)
+        return
+      except (BlockingIOError, InterruptedError):
+        self.loop.add_writer(self.socket.fileno(), self.write_ready)
+      except OSError:
+        return
+    self.tx_queue.append((data, addr))
+
+  def write_ready(self):
+    while len(self.tx_queue):
+      data, addr = self.tx_queue[0]
+      try:
+        self.socket.sendto(data, addr)
+      except (BlockingIOError, InterruptedError):
+        return
+      except OSError:
+        pass
+      self.tx_queue.popleft()
+    self.loop.remove_writer(self.socket.fileno())
+
+  # registers handler(frame, addr) for responses to a frame that the caller
+  # sends itself, target is 8 bytes (or None to accept any target)
+  def add_handler(self, target, sequence, handler):
+    self.pending[(target, sequence)] = handler
+
+  # handler is compared by equality, as bound methods are created each time
+  def remove_handler(self, target, sequence, handler):
+    key = (target, sequence)
+    if self.pending.get(key) == handler:
+      del self.pending[key]
+
+  # returns the first of count consecutive sequence numbers for target
+  def next_sequence(self, target, count = 1):
+    sequence = (
+      self.sequences.get(target, random.randint(0, 0xff)) + 1
+    ) & 0xff
+    self.sequences[target] = (sequence + count - 1) & 0xff
+    return sequence
+
+  def get_window(self, target):
+    window = self.windows.get(target)
+    if window is None:
+      window = asyncio.Semaphore(self.window)
+      self.windows[target] = window
+    return window
+
+  # takes a slot in the window of each of targets (which must be distinct),
+  # in a fixed order of target, so that concurrent calls with overlapping
+  # targets cannot each hold a slot that another is waiting for (with one
+  # slot of each window per call, no cycle of waits can form), returns the
+  # windows, which the caller must release
+  async def acquire_windows(self, targets):
+    windows = []
+    try:
+      for target in sorted(targets):
+        window = self.get_window(target)
+        await window.acquire()
+        windows.append(window)
+    except BaseException:
+      for window in windows:
+        window.release()
+      raise
+    return windows
+
+  def rtt(self, target):
+    rtt = self.rtts.get(target)
+    if rtt is None:
+      rtt = RTTEstimator()
+      self.rtts[target] = rtt
+    return rtt
+
+  # waits until future is done or timeout seconds have passed, returning
+  # whether it is done, unlike asyncio.wait_for() the future is not
+  # cancelled on timeout (so it can be waited for again after a resend) and
+  # the timeout is a scheduler timer rather than a task and loop timer
+  async def wait(self, future, timeout):
+    if future.done():
+      return True
+    waiter = self.loop.create_future()
+    def wake(_ = None):
+      if not waiter.done():
+        waiter.set_result(None)
+    timer = self.scheduler.call_later(timeout, wake)
+    future.add_done_callback(wake)
+    try:
+      await waiter
+    finally:
+      timer.cancel()
+      future.remove_done_callback(wake)
+    return future.done()
+
+  # sends out_data to addr up to tries times, until the handler registered
+  # under key completes future, then returns the result of the future, no
+  # more than window transactions with the same target are run at once
+  # (they are started in order, so a window much smaller than the sequence
+  # space guarantees that the (target, sequence) keys in flight are unique),
+  # timeout is the initial timeout if the target's round trip time unknown
+  async def transact(self, key, handler, future, out_data, addr, tries, timeout):
+    target, _ = key
+    async with self.get_window(target):
+      loop = asyncio.get_running_loop()
+      rtt = self.rtt(target)
+      self.pending[key] = handler
+      try:
+        for i in range(tries):
+          sent = loop.time()
+          self.sendto(out_data, addr)
+          if await self.wait(future, rtt.timeout(i, timeout)):
+            if i == 0:
+              rtt.sample(loop.time() - sent)
+            return future.result()
+      finally:
+        if self.pending.get(key) is handler:
+          del self.pending[key]
+    raise UDPException()
+
+  # returns {mac: (addr, {service: port})} for devices that respond, if mac
+  # is None this collects responses until the tries run out, otherwise it
+  # returns at the end of the try in which the given MAC responds (as a
+  # device sends one response per service, this collects all of them),
+  # addr is None to broadcast or else the address of a known device to
+  # verify it by unicast
+  async def get_service(self, mac = None, addr = None):
     target = bytes(8) if mac is None else (bytes.fromhex(mac) + bytes(8))[:8]
-    self.sequence = (self.sequence + 1) & 0xff
+    sequence = self.next_sequence(target)
     out_data = protocol.Frame(
       frame_header = protocol.FrameHeader(
         source = self.source
@@ -52,44 +364,45 @@ class UDP:
       frame_address = protocol.FrameAddress(
         target = target,
         res_required = True,
-        sequence = self.sequence
+        sequence = sequence
       ),
       protocol_header = protocol.ProtocolHeader(
         _type = protocol.PacketType.DEVICE_GET_SERVICE
       )
     ).serialize()
 
-    now = time.monotonic()
-    timeout = now
     result = {}
-    for i in range(GET_SERVICE_TRIES):
-      self.socket.sendto(out_data, ('255.255.255.255', 56700))
-
-      timeout += GET_SERVICE_TIMEOUT
-      while now < timeout:
-        r, _, _ = select.select([self.socket], [], [], timeout - now)
-        if len(r):
-          in_data, in_addr = self.socket.recvfrom(0x1000)
-          frame = protocol.Frame()
-          frame.deserialize(in_data)
-          if (
-            frame.frame_header.protocol == 1024 and
-              frame.frame_header.addressable and
-              frame.frame_header.source == self.source and
-              frame.frame_address.sequence == self.sequence and
-              frame.protocol_header.type ==
-                protocol.PacketType.DEVICE_STATE_SERVICE
-          ):
-            mac = frame.frame_address.target[:6].hex()
-            if mac not in result:
-              result[mac] = (in_addr, {})
-            result[mac][1][frame.payload.service] = frame.payload.port
-        now = time.monotonic()
+    found = self.loop.create_future()
+    def handler(frame, in_addr):
+      if frame.protocol_header.type == protocol.PacketType.DEVICE_STATE_SERVICE:
+        in_mac = frame.frame_address.target[:6].hex()
+        if in_mac not in result:
+          result[in_mac] = (in_addr, {})
+        result[in_mac][1][frame.payload.service] = frame.payload.port
+        if in_mac == mac and not found.done():
+          found.set_result(None)
+
+    # unlike other requests, this keeps collecting until the tries run out,
+    # and broadcasts are answered with each device's target so the handler
+    # must accept any target (broadcasts use their own sequence space)
+    key = (None if mac is None else target, sequence)
+    self.pending[key] = handler
+    try:
+      for i in range(GET_SERVICE_TRIES):
+        deadline = self.loop.time() + GET_SERVICE_TIMEOUT
+        self.sendto(out_data, self.broadcast if addr is None else addr)
+        if await self.wait(found, GET_SERVICE_TIMEOUT):
+          await asyncio.sleep(max(deadline - self.loop.time(), 0.))
+          break
+    finally:
+      if self.pending.get(key) is handler:
+        del self.pending[key]
     return result
 
-  def get_version(self, mac, addr):
+  # sends a request with res_required and returns the response payload
+  async def get(self, mac, addr, _type, response_type, tries, timeout):
     target = (bytes.fromhex(mac) + bytes(8))[:8]
-    self.sequence = (self.sequence + 1) & 0xff
+    sequence = self.next_sequence(target)
     out_data = protocol.Frame(
       frame_header = protocol.FrameHeader(
         source = self.source
@@ -97,93 +410,97 @@ class UDP:
       frame_address = protocol.FrameAddress(
         target = target,
         res_required = True,
-        sequence = self.sequence
+        sequence = sequence
       ),
       protocol_header = protocol.ProtocolHeader(
-        _type = protocol.PacketType.DEVICE_GET_VERSION
+        _type = _type
       )
     ).serialize()
 
-    now = time.monotonic()
-    timeout = now
-    for i in range(GET_VERSION_TRIES):
-      self.socket.sendto(out_data, addr)
-
-      timeout += GET_VERSION_TIMEOUT
-      while now < timeout:
-        r, _, _ = select.select([self.socket], [], [], timeout - now)
-        if len(r):
-          in_data, in_addr = self.socket.recvfrom(0x1000)
-          frame = protocol.Frame()
-          frame.deserialize(in_data)
-          if (
-            in_addr == addr and
-            frame.frame_header.protocol == 1024 and
-              frame.frame_header.addressable and
-              frame.frame_header.source == self.source and
-              frame.frame_address.target == target and
-              frame.frame_address.sequence == self.sequence and
-              frame.protocol_header.type ==
-                protocol.PacketType.DEVICE_STATE_VERSION
-          ):
-            return frame.payload
-        now = time.monotonic()
-    raise UDPException()
+    future = asyncio.get_running_loop().create_future()
+    def handler(frame, in_addr):
+      if (
+        in_addr == addr and
+          frame.protocol_header.type == response_type and
+          not future.done()
+      ):
+        future.set_result(frame.payload)
+    return await self.transact(
+      (target, sequence),
+      handler,
+      future,
+      out_data,
+      addr,
+      tries,
+      timeout
+    )
 
-  def get_color(self, mac, addr):
-    target = (bytes.fromhex(mac) + bytes(8))[:8]
-    self.sequence = (self.sequence + 1) & 0xff
-    out_data = protocol.Frame(
-      frame_header = protocol.FrameHeader(
-        source = self.source
-      ),
-      frame_address = protocol.FrameAddress(
-        target = target,
-        res_required = True,
-        sequence = self.sequence
-      ),
-      protocol_header = protocol.ProtocolHeader(
-        _type = protocol.PacketType.LIGHT_GET
-      )
-    ).serialize()
+  async def get_version(self, mac, addr):
+    return await self.get(
+      mac,
+      addr,
+      protocol.PacketType.DEVICE_GET_VERSION,
+      protocol.PacketType.DEVICE_STATE_VERSION,
+      GET_VERSION_TRIES,
+      GET_VERSION_TIMEOUT
+    )
 
-    now = time.monotonic()
-    timeout = now
-    for i in range(GET_COLOR_TRIES):
-      self.socket.sendto(out_data, addr)
-
-      timeout += GET_COLOR_TIMEOUT
-      while now < timeout:
-        r, _, _ = select.select([self.socket], [], [], timeout - now)
-        if len(r):
-          in_data, in_addr = self.socket.recvfrom(0x1000)
-          frame = protocol.Frame()
-          frame.deserialize(in_data)
-          if (
-            in_addr == addr and
-            frame.frame_header.protocol == 1024 and
-              frame.frame_header.addressable and
-              frame.frame_header.source == self.source and
-              frame.frame_address.target == target and
-              frame.frame_address.sequence == self.sequence and
-              frame.protocol_header.type ==
-                protocol.PacketType.LIGHT_STATE
-          ):
-            return numpy.array(
-              [
-                frame.payload.color.hue * (360. / 0xffff),
-                frame.payload.color.saturation * (1. / 0xffff),
-                frame.payload.color.brightness * (1. / 0xffff),
-                frame.payload.color.kelvin
-              ],
-              numpy.double
-            )
-        now = time.monotonic()
-    raise UDPException()
+  # returns the label as a str
+  async def get_label(self, mac, addr):
+    payload = await self.get(
+      mac,
+      addr,
+      protocol.PacketType.DEVICE_GET_LABEL,
+      protocol.PacketType.DEVICE_STATE_LABEL,
+      GET_METADATA_TRIES,
+      GET_METADATA_TIMEOUT
+    )
+    return payload.label.rstrip(b'\0').decode('utf-8', 'replace')
+
+  async def get_group(self, mac, addr):
+    return await self.get(
+      mac,
+      addr,
+      protocol.PacketType.DEVICE_GET_GROUP,
+      protocol.PacketType.DEVICE_STATE_GROUP,
+      GET_METADATA_TRIES,
+      GET_METADATA_TIMEOUT
+    )
+
+  async def get_location(self, mac, addr):
+    return await self.get(
+      mac,
+      addr,
+      protocol.PacketType.DEVICE_GET_LOCATION,
+      protocol.PacketType.DEVICE_STATE_LOCATION,
+      GET_METADATA_TRIES,
+      GET_METADATA_TIMEOUT
+    )
 
-  def set_color(self, mac, addr, hsbk):
+  async def get_color(self, mac, addr):
+    payload = await self.get(
+      mac,
+      addr,
+      protocol.PacketType.LIGHT_GET,
+      protocol.PacketType.LIGHT_STATE,
+      GET_COLOR_TRIES,
+      GET_COLOR_TIMEOUT
+    )
+    return numpy.array(
+      [
+        payload.color.hue * (360. / 0xffff),
+        payload.color.saturation * (1. / 0xffff),
+        payload.color.brightness * (1. / 0xffff),
+        payload.color.kelvin
+      ],
+      numpy.double
+    )
+
+  # sends a request with ack_required and returns when it is acknowledged,
+  # payload is a protocol.Struct subclass instance matching _type
+  async def set(self, mac, addr, _type, payload, tries, timeout):
     target = (bytes.fromhex(mac) + bytes(8))[:8]
-    self.sequence = (self.sequence + 1) & 0xff
+    sequence = self.next_sequence(target)
     out_data = protocol.Frame(
       frame_header = protocol.FrameHeader(
         source = self.source
@@ -191,53 +508,523 @@ class UDP:
       frame_address = protocol.FrameAddress(
         target = target,
         ack_required = True,
-        sequence = self.sequence
+        sequence = sequence
       ),
       protocol_header = protocol.ProtocolHeader(
-        _type = protocol.PacketType.LIGHT_SET_COLOR
+        _type = _type
+      ),
+      payload = payload
+    ).serialize()
+    await self.send_acked(addr, target, sequence, [out_data], tries, timeout)
+
+  # duration is the time in seconds for the device to fade to the colour
+  async def set_color(self, mac, addr, hsbk, duration = 0.):
+    await self.set(
+      mac,
+      addr,
+      protocol.PacketType.LIGHT_SET_COLOR,
+      protocol.LightSetColor(
+        color = light_hsbk_to_struct(hsbk),
+        duration = int(round(duration * 1000.))
       ),
-      payload = protocol.LightSetColor(
-        color = protocol.LightHsbk(
-          hue = int(round((hsbk[HSBK_HUE] % 360.) * (0xffff / 360.))),
-          saturation = int(round(hsbk[HSBK_SAT] * 0xffff)),
-          brightness = int(round(hsbk[HSBK_BR] * 0xffff)),
-          kelvin = int(round(hsbk[HSBK_KELV]))
+      SET_COLOR_TRIES,
+      SET_COLOR_TIMEOUT
+    )
+
+  # sets many devices at once, devices is a list of (mac, addr) and hsbk is
+  # (n_devices, N_HSBK), or devices is a dict of {(mac, addr): hsbk} and hsbk
+  # is None, all frames are sent up front and then only the unacknowledged
+  # ones are resent, on a timer shared by all devices, returns a list of
+  # bool aligned with devices (or a dict of {(mac, addr): bool}) to say
+  # which devices acknowledged, rather than raising UDPException, if a
+  # device appears more than once then only its last colour is sent and
+  # all of its entries get the same result
+  async def set_colors(self, devices, hsbk = None, duration = 0.):
+    if hsbk is None:
+      if len(devices) == 0:
+        return {}
+      results = await self.set_colors(
+        list(devices.keys()),
+        numpy.stack(list(devices.values())),
+        duration
+      )
+      return dict(zip(devices.keys(), results))
+    if len(devices) == 0:
+      return []
+
+    # index of the last entry for each distinct target
+    last = {
+      (bytes.fromhex(mac) + bytes(8))[:8]: i
+      for i, (mac, _) in enumerate(devices)
+    }
+    if len(last) < len(devices):
+      indices = list(last.values())
+      results = await self.set_colors(
+        [devices[i] for i in indices],
+        hsbk[indices],
+        duration
+      )
+      result = dict(zip(last.keys(), results))
+      return [
+        result[(bytes.fromhex(mac) + bytes(8))[:8]]
+        for mac, _ in devices
+      ]
+
+    targets = list(last.keys())
+    sequences = [self.next_sequence(target) for target in targets]
+    out_data = encode_set_color(
+      self.source,
+      targets,
+      sequences,
+      hsbk,
+      duration,
+      ack_required = True
+    )
+
+    # one table of (target, sequence) -> index into devices for all frames
+    # not yet acknowledged, with a single handler looking up the table
+    unacked = {
+      (targets[i], sequences[i]): i
+      for i in range(len(devices))
+    }
+    all_acked = self.loop.create_future()
+    loop = asyncio.get_running_loop()
+    rtts = [self.rtt(target) for target in targets]
+    sent = None # time of first transmission, None after that
+    def handler(frame, addr):
+      key = (frame.frame_address.target, frame.frame_address.sequence)
+      i = unacked.get(key)
+      if (
+        i is not None and
+          addr == devices[i][1] and
+          frame.protocol_header.type ==
+            protocol.PacketType.DEVICE_ACKNOWLEDGEMENT
+      ):
+        del unacked[key]
+        if sent is not None:
+          rtts[i].sample(loop.time() - sent)
+        if len(unacked) == 0:
+          all_acked.set_result(None)
+
+    # the frames count against each device's window, usually without waiting
+    windows = await self.acquire_windows(targets)
+    keys = list(unacked.keys())
+    for key in keys:
+      self.pending[key] = handler
+    try:
+      for i in range(SET_COLORS_TRIES):
+        if len(unacked) == 0:
+          break
+        sent = loop.time() if i == 0 else None
+        for j in list(unacked.values()):
+          self.sendto(out_data[j], devices[j][1])
+        # the shared timer waits for the slowest unacknowledged device
+        timeout = max(
+          [
+            rtts[j].timeout(i, SET_COLORS_TIMEOUT)
+            for j in unacked.values()
+          ]
+        )
+        await self.wait(all_acked, timeout)
+    finally:
+      for key in keys:
+        if self.pending.get(key) is handler:
+          del self.pending[key]
+      for window in windows:
+        window.release()
+
+    results = [True] * len(devices)
+    for i in unacked.values():
+      results[i] = False
+    return results
+
+  # sets every device on the network to the same colour by a tagged frame
+  # broadcast to addr (None for the broadcast address given to __init__(),
+  # or e.g. the directed broadcast address of a subnet, as the LAN protocol
+  # has no group addressing), which costs a few frames however many devices
+  # there are, but cannot be acknowledged, so if verify is a list of (mac,
+  # addr) those devices are checked by LightGet once any transition is over
+  # and any that missed the broadcast are set by set_colors(), with the same
+  # transition (so a repaired device fades like the others did, only later),
+  # returns None or a list of bool aligned with verify to say which are now
+  # in hsbk or fading to it
+  async def set_color_broadcast(
+    self,
+    hsbk,
+    duration = 0.,
+    verify = None,
+    addr = None
+  ):
+    target = bytes(8)
+    sequence = self.next_sequence(target)
+    out_data = encode_set_color(
+      self.source,
+      [target],
+      [sequence],
+      hsbk[numpy.newaxis, :],
+      duration,
+      tagged = True
+    )[0]
+    for i in range(SET_COLOR_BROADCAST_REPEATS):
+      if i:
+        await asyncio.sleep(SET_COLOR_BROADCAST_INTERVAL)
+      self.sendto(out_data, self.broadcast if addr is None else addr)
+    if verify is None:
+      return None
+
+    await asyncio.sleep(duration)
+    expected = hsbk_to_light_hsbk(hsbk)
+    async def check(mac, addr):
+      try:
+        payload = await self.get(
+          mac,
+          addr,
+          protocol.PacketType.LIGHT_GET,
+          protocol.PacketType.LIGHT_STATE,
+          GET_COLOR_TRIES,
+          GET_COLOR_TIMEOUT
         )
+      except UDPException:
+        return False
+      return bool(
+        light_hsbk_close(light_hsbk_from_struct(payload.color), expected)
       )
-    ).serialize()
+    results = await asyncio.gather(
+      *[check(mac, addr) for mac, addr in verify]
+    )
 
-    now = time.monotonic()
-    timeout = now
-    for i in range(SET_COLOR_TRIES):
-      self.socket.sendto(out_data, addr)
-
-      timeout += SET_COLOR_TIMEOUT
-      while now < timeout:
-        r, _, _ = select.select([self.socket], [], [], timeout - now)
-        if len(r):
-          in_data, in_addr = self.socket.recvfrom(0x1000)
-          frame = protocol.Frame()
-          frame.deserialize(in_data)
-          if (
-            in_addr == addr and
-            frame.frame_header.protocol == 1024 and
-              frame.frame_header.addressable and
-              frame.frame_header.source == self.source and
-              frame.frame_address.target == target and
-              frame.frame_address.sequence == self.sequence and
-              frame.protocol_header.type ==
-                protocol.PacketType.DEVICE_ACKNOWLEDGEMENT
-          ):
-            return
-        now = time.monotonic()
-    raise UDPException()
+    missed = [i for i in range(len(verify)) if not results[i]]
+    if len(missed):
+      repaired = await self.set_colors(
+        [verify[i] for i in missed],
+        numpy.tile(hsbk[numpy.newaxis, :], (len(missed), 1)),
+        duration
+      )
+      for i, result in zip(missed, repaired):
+        results[i] = result
+    return results
+
+  # hsbk is (n_zones, N_HSBK) in the same units as set_color(), and will be
+  # sent in windows of up to 82 zones, each window retried until acknowledged
+  async def set_color_zones(self, mac, addr, hsbk, duration = 0.):
+    target = (bytes.fromhex(mac) + bytes(8))[:8]
+    n_zones = hsbk.shape[0]
+    if n_zones == 0:
+      return
+    encoder = self.set_color_zones_encoders.get(n_zones)
+    if encoder is None:
+      encoder = ExtendedSetColorZonesEncoder(n_zones)
+      self.set_color_zones_encoders[n_zones] = encoder
+    sequence = self.next_sequence(target, encoder.n_frames)
+    out_data = encoder.encode(
+      self.source,
+      target,
+      sequence,
+      hsbk,
+      duration,
+      ack_required = True
+    )
+    await self.send_acked(
+      addr,
+      target,
+      sequence,
+      out_data,
+      SET_COLOR_ZONES_TRIES,
+      SET_COLOR_ZONES_TIMEOUT
+    )
+
+  # like set_color_zones() but sends only the zones that changed since the
+  # last call for this device, as ranges or as windows, whichever is fewer
+  # bytes, returns without sending if nothing changed, other messages that
+  # change the zones (e.g. set_color_zones()) are not tracked, so call
+  # forget_color_zones() after sending them, concurrent calls for the same
+  # device are sent one at a time, so that each is diffed against the last
+  async def set_color_zones_delta(self, mac, addr, hsbk, duration = 0.):
+    target = (bytes.fromhex(mac) + bytes(8))[:8]
+    lock = self.set_color_zones_delta_locks.get(target)
+    if lock is None:
+      lock = asyncio.Lock()
+      self.set_color_zones_delta_locks[target] = lock
+    async with lock:
+      await self.set_color_zones_delta_locked(target, addr, hsbk, duration)
+
+  async def set_color_zones_delta_locked(self, target, addr, hsbk, duration):
+    n_zones = hsbk.shape[0]
+    encoder = self.set_color_zones_delta_encoders.get(target)
+    if encoder is None or encoder.n_zones != n_zones:
+      encoder = SetColorZonesDeltaEncoder(n_zones)
+      self.set_color_zones_delta_encoders[target] = encoder
+    n_frames = encoder.prepare(hsbk)
+    if n_frames == 0:
+      return
+    sequence = self.next_sequence(target, n_frames)
+    out_data = encoder.encode(
+      self.source,
+      target,
+      sequence,
+      duration,
+      ack_required = True
+    )
+    colors = encoder.colors.copy()
+    try:
+      await self.send_acked(
+        addr,
+        target,
+        sequence,
+        out_data,
+        SET_COLOR_ZONES_TRIES,
+        SET_COLOR_ZONES_TIMEOUT
+      )
+    except UDPException:
+      encoder.reset()
+      raise
+    encoder.commit(colors)
+
+  # the next set_color_zones_delta() to the device will send all zones
+  def forget_color_zones(self, mac):
+    target = (bytes.fromhex(mac) + bytes(8))[:8]
+    self.set_color_zones_delta_encoders.pop(target, None)
+
+  # hsbk is (n_tiles, 8, 8, N_HSBK) in the same units as set_color(), one
+  # TileSet64 frame is sent per tile in the chain, for video the frames are
+  # sent without acknowledgement (the next video frame supersedes any loss)
+  async def set_tile_colors(
+    self,
+    mac,
+    addr,
+    hsbk,
+    duration = 0.,
+    ack_required = False
+  ):
+    target = (bytes.fromhex(mac) + bytes(8))[:8]
+    n_tiles = hsbk.shape[0]
+    encoder = self.set_tile_colors_encoders.get(n_tiles)
+    if encoder is None:
+      encoder = Set64Encoder(n_tiles)
+      self.set_tile_colors_encoders[n_tiles] = encoder
+    sequence = self.next_sequence(target, n_tiles)
+    out_data = encoder.encode(
+      self.source,
+      target,
+      sequence,
+      hsbk,
+      duration,
+      ack_required = ack_required
+    )
+
+    if ack_required:
+      await self.send_acked(
+        addr,
+        target,
+        sequence,
+        out_data,
+        SET_TILE_COLORS_TRIES,
+        SET_TILE_COLORS_TIMEOUT
+      )
+    else:
+      for i in out_data:
+        self.sendto(i, addr)
+
+  # out_data is a list of frames with consecutive sequence numbers starting
+  # at sequence, each resent on each try until acknowledged (concurrently)
+  async def send_acked(self, addr, target, sequence, out_data, tries, timeout):
+    loop = asyncio.get_running_loop()
+    transactions = []
+    for i in range(len(out_data)):
+      future = loop.create_future()
+      def handler(frame, in_addr, future = future):
+        if (
+          in_addr == addr and
+            frame.protocol_header.type ==
+              protocol.PacketType.DEVICE_ACKNOWLEDGEMENT and
+            not future.done()
+        ):
+          future.set_result(None)
+      transactions.append(
+        self.transact(
+          (target, (sequence + i) & 0xff),
+          handler,
+          future,
+          out_data[i],
+          addr,
+          tries,
+          timeout
+        )
+      )
+    await asyncio.gather(*transactions)
+
+# blocking version of AsyncUDP, which runs an AsyncUDP in an event loop on
+# a background thread, so that there is a single receiver routing responses
+# to requests and several threads can make requests at once without
+# stealing each other's responses, each method blocks until it completes
+class UDP:
+  # see AsyncUDP.__init__()
+  def __init__(
+    self,
+    capture = None,
+    window = IN_FLIGHT_WINDOW,
+    broadcast = BROADCAST_ADDR
+  ):
+    self.async_udp = AsyncUDP(capture, window, broadcast)
+    self.loop = asyncio.SelectorEventLoop() # see AsyncUDP
+    self.thread = threading.Thread(
+      target = self.loop.run_forever,
+      daemon = True
+    )
+    self.thread.start()
+    self.run(self.async_udp.open())
+
+  @property
+  def source(self):
+    return self.async_udp.source
+
+  def close(self):
+    self.loop.call_soon_threadsafe(self.async_udp.close)
+    self.loop.call_soon_threadsafe(self.loop.stop)
+    self.thread.join()
+
+  # starts a coroutine (e.g. udp.async_udp.set_color(...)) on the event loop
+  # thread and returns a concurrent.futures.Future for its result, so that
+  # a thread can pipeline several requests to a device before waiting
+  def submit(self, coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+  # runs a coroutine on the event loop thread and waits for its result
+  def run(self, coroutine):
+    return self.submit(coroutine).result()
+
+  # runs a function on the event loop thread and waits for its result
+  def call(self, function, *args):
+    async def coroutine():
+      return function(*args)
+    return self.run(coroutine())
+
+  # runs a function on the event loop thread without waiting for it
+  def call_soon(self, function, *args):
+    self.loop.call_soon_threadsafe(function, *args)
+
+  def next_sequence(self, target, count = 1):
+    return self.call(self.async_udp.next_sequence, target, count)
+
+  def sendto(self, data, addr):
+    self.loop.call_soon_threadsafe(self.async_udp.sendto, data, addr)
+
+  # see AsyncUDP.add_handler(), handler is called on the event loop thread
+  def add_handler(self, target, sequence, handler):
+    self.loop.call_soon_threadsafe(
+      self.async_udp.add_handler,
+      target,
+      sequence,
+      handler
+    )
+
+  def remove_handler(self, target, sequence, handler):
+    self.loop.call_soon_threadsafe(
+      self.async_udp.remove_handler,
+      target,
+      sequence,
+      handler
+    )
+
+  def get_service(self, mac = None, addr = None):
+    return self.run(self.async_udp.get_service(mac, addr))
+
+  def get_version(self, mac, addr):
+    return self.run(self.async_udp.get_version(mac, addr))
+
+  def get_label(self, mac, addr):
+    return self.run(self.async_udp.get_label(mac, addr))
+
+  def get_group(self, mac, addr):
+    return self.run(self.async_udp.get_group(mac, addr))
+
+  def get_location(self, mac, addr):
+    return self.run(self.async_udp.get_location(mac, addr))
+
+  def get_color(self, mac, addr):
+    return self.run(self.async_udp.get_color(mac, addr))
+
+  def set_color(self, mac, addr, hsbk, duration = 0.):
+    self.run(self.async_udp.set_color(mac, addr, hsbk, duration))
+
+  def set_colors(self, devices, hsbk = None, duration = 0.):
+    return self.run(self.async_udp.set_colors(devices, hsbk, duration))
+
+  def set_color_broadcast(
+    self,
+    hsbk,
+    duration = 0.,
+    verify = None,
+    addr = None
+  ):
+    return self.run(
+      self.async_udp.set_color_broadcast(hsbk, duration, verify, addr)
+    )
+
+  def set_color_zones(self, mac, addr, hsbk, duration = 0.):
+    self.run(self.async_udp.set_color_zones(mac, addr, hsbk, duration))
+
+  def set_color_zones_delta(self, mac, addr, hsbk, duration = 0.):
+    self.run(self.async_udp.set_color_zones_delta(mac, addr, hsbk, duration))
+
+  def forget_color_zones(self, mac):
+    self.call(self.async_udp.forget_color_zones, mac)
+
+  def set_tile_colors(
+    self,
+    mac,
+    addr,
+    hsbk,
+    duration = 0.,
+    ack_required = False
+  ):
+    self.run(
+      self.async_udp.set_tile_colors(mac, addr, hsbk, duration, ack_required)
+    )
+
+  def send_acked(self, addr, target, sequence, out_data, tries, timeout):
+    self.run(
+      self.async_udp.send_acked(
+        addr,
+        target,
+        sequence,
+        out_data,
+        tries,
+        timeout
+      )
+    )
 
 if __name__ == '__main__':
   # demo program to return version of each connected device
   # if run with no arguments it will enumerate all devices
   # if run with at least 1 argument it will enumerate only the given MAC
   # if run with 5 arguments it will also set the colour of the given MAC
+  # if run with --capture file it will also record all traffic to the file
+  # if run with --async it will query (and set) all devices concurrently
+  # if run with --cache file it will verify known devices from the file,
+  # only broadcasting if some are missing (or the file does not exist yet)
+  # if run with --broadcast host:port it will discover devices there, e.g.
+  # the discovery address printed by simulator.py
 
+  use_async = False
+  if len(sys.argv) >= 2 and sys.argv[1] == '--async':
+    use_async = True
+    del sys.argv[1:2]
+  cache = None
+  if len(sys.argv) >= 3 and sys.argv[1] == '--cache':
+    from discovery import DiscoveryCache
+    cache = DiscoveryCache(sys.argv[2])
+    del sys.argv[1:3]
+  capture = None
+  if len(sys.argv) >= 3 and sys.argv[1] == '--capture':
+    from capture import CaptureWriter
+    capture = CaptureWriter(open(sys.argv[2], 'wb'))
+    del sys.argv[1:3]
+  broadcast = BROADCAST_ADDR
+  if len(sys.argv) >= 3 and sys.argv[1] == '--broadcast':
+    host, port = sys.argv[2].split(':')
+    broadcast = (host, int(port))
+    del sys.argv[1:3]
   mac = None
   hsbk = None
   if len(sys.argv) >= 2:
@@ -246,11 +1033,44 @@ if __name__ == '__main__':
       import numpy
       hsbk = numpy.array([float(i) for i in sys.argv[2:6]], numpy.double)
 
-  udp = UDP()
-  macs = udp.get_service(mac) # may be None
-  for mac, (addr, services) in macs.items():
-    if protocol.DeviceService.UDP in services:
-      version = udp.get_version(mac, addr)
+  if use_async:
+    async def query(udp, mac, addr):
+      version = await udp.get_version(mac, addr)
       print('mac', mac, 'vendor', version.vendor, 'product', version.product)
       if hsbk is not None:
-        udp.set_color(mac, addr, hsbk)
+        await udp.set_color(mac, addr, hsbk)
+
+    async def main():
+      udp = AsyncUDP(capture, broadcast = broadcast)
+      await udp.open()
+      macs = (
+        await udp.get_service(mac) # may be None
+      if cache is None else
+        await cache.discover(udp, None if mac is None else [mac])
+      )
+      await asyncio.gather(
+        *[
+          query(udp, mac, addr)
+          for mac, (addr, services) in macs.items()
+          if protocol.DeviceService.UDP in services
+        ]
+      )
+      udp.close()
+    loop = asyncio.SelectorEventLoop() # see AsyncUDP
+    loop.run_until_complete(main())
+    loop.close()
+  else:
+    udp = UDP(capture, broadcast = broadcast)
+    macs = (
+      udp.get_service(mac) # may be None
+    if cache is None else
+      udp.run(cache.discover(udp.async_udp, None if mac is None else [mac]))
+    )
+    for mac, (addr, services) in macs.items():
+      if protocol.DeviceService.UDP in services:
+        version = udp.get_version(mac, addr)
+        print('mac', mac, 'vendor', version.vendor, 'product', version.product)
+        if hsbk is not None:
+          udp.set_color(mac, addr, hsbk)
+  if capture is not None:
+    capture.flush()
@@ -52,8 +52,12 @@ class Type:
     raise NotImplementedError
   def deserialize(self, indent, name, offset0, offset1):
     raise NotImplementedError
+  def dtype(self):
+    raise NotImplementedError
   def write(self, fout):
     pass
+  def write_dtype(self, fout, written):
+    pass
 
 # used for expansion of None items from parameter lists, e.g.:
 #   def __init__(self, mylist = None)
@@ -72,14 +76,19 @@ class TypeBool(Type):
     return f'int.to_bytes(self.{name:s}, {self.size_bytes:d}, \'little\')'
   def deserialize(self, indent, name, offset0, offset1):
     return f'{indent:s}self.{name} = int.from_bytes(data[{offset0:s}:{offset1:s}], \'little\') != 0\n'
+  def dtype(self):
+    assert self.size_bytes == 1
+    return '\'?\''
 
 class TypeInt(Type):
   def default_value(self):
     return '0'
   def serialize(self, name):
-    return f'int.to_bytes(self.{name:s}, {self.size_bytes:d}, \'little\')'
+    return f'int.to_bytes(self.{name:s}, {self.size_bytes:d}, \'little\', signed = True)'
   def deserialize(self, indent, name, offset0, offset1):
-    return f'{indent:s}self.{name} = int.from_bytes(data[{offset0:s}:{offset1:s}], \'little\', True)\n'
+    return f'{indent:s}self.{name} = int.from_bytes(data[{offset0:s}:{offset1:s}], \'little\', signed = True)\n'
+  def dtype(self):
+    return f'\'<i{self.size_bytes:d}\''
 
 class TypeUInt(Type):
   def default_value(self):
@@ -88,6 +97,8 @@ class TypeUInt(Type):
     return f'int.to_bytes(self.{name:s}, {self.size_bytes:d}, \'little\')'
   def deserialize(self, indent, name, offset0, offset1):
     return f'{indent:s}self.{name} = int.from_bytes(data[{offset0:s}:{offset1:s}], \'little\')\n'
+  def dtype(self):
+    return f'\'<u{self.size_bytes:d}\''
 
 class TypeFloat(Type):
   def default_value(self):
@@ -98,12 +109,16 @@ class TypeFloat(Type):
     assert False
   def deserialize(self, indent, name, offset0, offset1):
     if self.size_bytes == 4:
-      return f'{indent:s}self.{name} = struct.unpack(\'<f\', data[{offset0:s}:{offset1:s}])\n'
+      return f'{indent:s}self.{name}, = struct.unpack(\'<f\', data[{offset0:s}:{offset1:s}])\n'
     assert False
+  def dtype(self):
+    return f'\'<f{self.size_bytes:d}\''
 
 class TypeByte(Type):
   def default_value(self):
     return 'b\'\\0\''
+  def dtype(self):
+    return '\'S1\''
 
 class TypeEnum(TypeUInt):
   # values is a dict of {name: value} where name is string, value is int
@@ -114,19 +129,24 @@ class TypeEnum(TypeUInt):
   def default_value(self):
     return f'{self.name:s}.{list(self.values.keys())[0]}'
   def write(self, fout):
+    # names is the reverse mapping of {value: name} for logging and so on
     fout.write(
       '''class {0:s}(Enum):
-{1:s}'''.format(
+{1:s}  names = {{{2:s}
+  }}
+'''.format(
         self.name,
-        (
-          '  pass\n'
-        if len(self.values) == 0 else
-          ''.join(
-            [
-              f'  {name:s} = {value:d}\n'
-              for name, value in self.values.items()
-            ]
-          )
+        ''.join(
+          [
+            f'  {name:s} = {value:d}\n'
+            for name, value in self.values.items()
+          ]
+        ),
+        ','.join(
+          [
+            f'\n    {value:d}: \'{name:s}\''
+            for name, value in self.values.items()
+          ]
         )
       )
     )
@@ -137,9 +157,12 @@ class TypeArray(TypeMutable):
     self.dim = dim
     self.type = _type
   def default_value(self):
+    # note: each element must be a separate object if the element is mutable
     return (
       f'bytes({self.dim:d})'
     if isinstance(self.type, TypeByte) else
+      f'[{self.type.default_value():s} for i in range({self.dim:d})]'
+    if isinstance(self.type, TypeMutable) else
       f'{self.dim:d} * [{self.type.default_value():s}]'
     )
   def default_value1(self):
@@ -162,7 +185,7 @@ class TypeArray(TypeMutable):
     )
   def deserialize(self, indent, name, offset0, offset1):
     return (
-      f'{indent:s}self.{name:s} = data[{offset0:s}:{offset1:s}]\n'
+      f'{indent:s}self.{name:s} = bytes(data[{offset0:s}:{offset1:s}])\n'
     if isinstance(self.type, TypeByte) else
       '''{0:s}for i in range({1:d}):
 {2:s}'''.format(
@@ -176,6 +199,16 @@ class TypeArray(TypeMutable):
         )
       )
     )
+  def dtype(self):
+    # byte arrays become a numpy bytes field, similarly to the bytes object
+    # used by serialize() and deserialize(), other arrays become subarrays
+    return (
+      f'\'S{self.dim:d}\''
+    if isinstance(self.type, TypeByte) else
+      f'({self.type.dtype():s}, ({self.dim:d},))'
+    )
+  def write_dtype(self, fout, written):
+    self.type.write_dtype(fout, written)
 
 class TypeStruct(TypeMutable):
   # fields is a dict of {name: type} where name is string, type is Type
@@ -254,9 +287,46 @@ class TypeStruct(TypeMutable):
     return f'self.{name:s}.serialize()'
   def deserialize(self, indent, name, offset0, offset1):
     return f'{indent:s}self.{name:s}.deserialize(data[{offset0:s}:{offset1:s}])\n'
+  def dtype(self):
+    return f'{self.name:s}.dtype'
+  # the dtype is written as an assignment after all classes are defined,
+  # because a struct can contain a struct that is defined later in the file,
+  # and we must write the dtypes of any contained structs before our own
+  def write_dtype(self, fout, written):
+    if self.name in written:
+      return
+    written.add(self.name)
+    for _type in self.fields.values():
+      _type.write_dtype(fout, written)
+
+    offset = 0
+    items = []
+    for name, _type in self.fields.items():
+      if not isinstance(_type, TypeReserved):
+        items.append((name, _type.dtype(), offset))
+      offset += _type.size_bytes
+    fout.write(
+      '''
+{0:s}.dtype = numpy.dtype(
+  {{
+    'names': [{1:s}],
+    'formats': [{2:s}],
+    'offsets': [{3:s}],
+    'itemsize': {4:d}
+  }}
+)
+'''.format(
+        self.name,
+        ', '.join([f'\'{name:s}\'' for name, _, _ in items]),
+        ', '.join([dtype for _, dtype, _ in items]),
+        ', '.join([f'{offset:d}' for _, _, offset in items]),
+        self.size_bytes
+      )
+    )
 
 class TypeReserved(Type):
   # placeholder for fields that do not appear in field list but take space
+  # (they do not appear in the dtype either, but the offsets skip over them)
   def serialize(self, name):
     return f'bytes({self.size_bytes:d})'
 
@@ -334,12 +404,14 @@ for name, data in protocol['fields'].items():
 
 packet_types = {}
 packet_type_to_type = {}
+packet_type_to_size = {}
 for _, data in protocol['packets'].items():
   for packet_name, packet_data in data.items():
     enum_packet_name = camel_to_upper(packet_name)
     packet_types[enum_packet_name] = packet_data['pkt_type']
 
     size_bytes = packet_data['size_bytes']
+    packet_type_to_size[enum_packet_name] = size_bytes
 
     fields = {}
     reserved_index = 0
@@ -385,3 +457,27 @@ packet_type_to_type = {{{0:s}
     )
   )
 )
+# dense table indexed by packet type, so that the Frame codec does a single
+# list index instead of dict lookups, see payload_type() in the template
+n_dispatch = max(packet_types.values()) + 1
+sys.stdout.write(
+  '''
+# entry is (payload type, payload size in bytes) or None if not a packet type
+dispatch = [None] * {0:d}{1:s}
+'''.format(
+    n_dispatch,
+    ''.join(
+      [
+        '\ndispatch[PacketType.{0:s}] = ({1:s}, {2:d})'.format(
+          enum_packet_name,
+          packet_type_to_type.get(enum_packet_name, 'Empty'),
+          size_bytes
+        )
+        for enum_packet_name, size_bytes in packet_type_to_size.items()
+      ]
+    )
+  )
+)
+written = set()
+for _type in types.values():
+  _type.write_dtype(sys.stdout, written)